@@ -0,0 +1,216 @@
+"""
+管理画面の AI 処理（バックグラウンドジョブのハンドラ）
+
+各ルートは入力チェック・利用回数の確認と AI ポイントの確保だけを行ってジョブを積み、
+Gemini API の呼び出しと DB 更新はここでリクエストスレッドの外で行う。
+確保した AI ポイントはジョブが失敗したら依頼者に返す。
+"""
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from models import db, User, ThumbnailConfig, Memo, Category, FixedPage
+from utils.job_queue import JobError, job_handler, on_job_failed, on_job_committed
+from utils.ranking import invalidate_ranking
+from utils.storage import get_storage, list_files, upload_url
+
+
+@on_job_failed
+def _refund_job_points(job):
+    """失敗したジョブの確保済み AI ポイントを依頼者に返す（エラー保存と同じトランザクション）。"""
+    from admin.views import _refund_ai_points
+
+    if job.cost and job.user_id:
+        _refund_ai_points(job.user_id, job.cost)
+
+
+@on_job_committed
+def _invalidate_caches(job):
+    """翻訳結果の保存後にランキング（英語タイトルを含む）のキャッシュを消す。"""
+    if job.kind == 'translate':
+        invalidate_ranking()
+
+
+def fixed_images():
+    """固定ページのキービジュアルに使える画像（keyvisual.jpg はトップ用のため除く）"""
+    return [
+        f for f in list_files('fixed')[1]
+        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+        and f != 'keyvisual.jpg'
+    ]
+
+
+@job_handler('category_suggest')
+def category_suggest(job):
+    """Flask トレンドカテゴリー名＋配色提案"""
+    from google.genai.types import GenerateContentConfig
+    from utils.ai_client import generate_content
+    import json as json_lib
+
+    if not current_app.config.get('GOOGLE_API_KEY', ''):
+        raise JobError('GOOGLE_API_KEY が未設定です')
+
+    existing = Category.query.all()
+    names_str  = ', '.join(c.name for c in existing) or 'なし'
+    colors_str = ', '.join(c.color for c in existing) or 'なし'
+
+    prompt = (
+        f"あなたはFlask技術ブログのカテゴリー設計者です。\n"
+        f"以下の条件でカテゴリー名と配色を1件提案してください。\n\n"
+        f"【条件】\n"
+        f"- カテゴリー名: Flaskやバックエンド開発に関連するトレンド技術名（英数字・ハイフン・アンダースコアのみ・12文字以内）\n"
+        f"- 既存カテゴリー名（重複不可）: {names_str}\n"
+        f"- カラー: HEX形式・#666より暗い色（明度低め）\n"
+        f"- 既存カラー（{colors_str}）と視覚的に区別できる配色を選ぶこと\n\n"
+        f"【出力形式】\n"
+        f'必ず以下のJSONのみを返してください（説明不要）:\n{{"name": "カテゴリー名", "color": "#xxxxxx"}}'
+    )
+    try:
+        response = generate_content(
+            model='gemini-2.5-flash-lite',
+            contents=prompt,
+            config=GenerateContentConfig(max_output_tokens=128, temperature=0.9),
+            timeout=30,
+        )
+    except Exception as e:
+        print(f"######## カテゴリーAI提案失敗: {e} ########")
+        raise JobError('AI提案に失敗しました')
+
+    json_match = re.search(r'\{[^}]+\}', response.text.strip())
+    if not json_match:
+        raise JobError('AI応答の解析に失敗しました')
+
+    data  = json_lib.loads(json_match.group())
+    name  = re.sub(r'[^A-Za-z0-9\-_]', '', data.get('name', ''))[:12]
+    color = data.get('color', '#234466').strip()
+    if not re.match(r'^#[0-9a-fA-F]{6}$', color):
+        color = '#234466'
+    return {'name': name, 'color': color}
+
+
+@job_handler('thumb_generate')
+def thumb_generate(job):
+    """ユーザーサムネイル画像生成・保存・ユーザーへの割付"""
+    from utils.ai_thumb_generate import generate_thumb_image
+
+    image_bytes = generate_thumb_image()
+    if not image_bytes:
+        raise JobError('AI画像生成に失敗しました。APIキーまたはモデルの設定を確認してください')
+
+    # 3桁連番ファイル名を生成
+    storage = get_storage()
+    pattern = re.compile(r'^(\d{3})\.')
+    max_num = max(
+        (int(m.group(1)) for f in storage.list('user') if (m := pattern.match(f))),
+        default=0
+    )
+    filename = f"{max_num + 1:03d}.png"
+    storage.save_bytes('user', filename, image_bytes)
+
+    # ThumbnailConfig に追加（visible=True）
+    if not ThumbnailConfig.query.filter_by(filename=filename).first():
+        db.session.add(ThumbnailConfig(filename=filename, visible=True))
+
+    # ユーザーへの割付
+    user_id = job.payload.get('user_id')
+    if user_id:
+        user = db.session.get(User, user_id)
+        if user:
+            user.thumbnail = filename
+
+    return {
+        'filename': filename,
+        'url': storage.url('user', filename),
+    }
+
+
+def _score_in_context(app, args):
+    """ワーカースレッドでアプリコンテキストを張って翻訳価値スコアリングを呼ぶ。"""
+    from utils.ai_translate_score import score_translate_value
+
+    with app.app_context():
+        return score_translate_value(*args)
+
+
+@job_handler('analyze')
+def analyze(job):
+    """
+    最新5件の記事の翻訳価値スコアリング（結果は ai_score に保存）
+
+    未解析の記事の Gemini 呼び出しはスレッドプールで同時に行い、所要時間を
+    合計ではなく最も遅い1件程度に抑える。いいね数は記事行の like_count をそのまま使う。
+    """
+    latest_memos = Memo.query.order_by(Memo.created_at.desc()).limit(5).all()
+    # 旧形式（information/writing/readability）は再解析させる
+    targets = [m for m in latest_memos if not (m.ai_score and 'translate_score' in m.ai_score)]
+    scored = {}
+    if targets:
+        app = current_app._get_current_object()
+        # ワーカースレッドには ORM オブジェクトではなく値だけを渡す
+        args = [(m.title, m.content, m.like_count, m.view_count or 0) for m in targets]
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='analyze') as pool:
+            scored = dict(zip((m.id for m in targets), pool.map(lambda a: _score_in_context(app, a), args)))
+
+    results = []
+    for memo in latest_memos:
+        if memo.id not in scored:
+            scores = memo.ai_score
+        elif scored[memo.id]:
+            scores = memo.ai_score = scored[memo.id]
+        else:
+            scores = {
+                "seo": 0, "tech": 0, "structure": 0, "spread": 0,
+                "translate_score": 0, "translate_verdict": "エラー",
+                "seo_title": "", "keywords": [], "inflow": "低",
+                "translate_reason": "AI解析に失敗しました",
+            }
+
+        results.append({
+            'id': memo.id,
+            'title': memo.title[:20] + ('...' if len(memo.title) > 20 else ''),
+            'like_count': memo.like_count,
+            'view_count': memo.view_count or 0,
+            'ai_score': scores,
+        })
+    return {'data': results}
+
+
+@job_handler('translate')
+def translate(job):
+    """記事の英語翻訳（80点以上のみ）。結果は ai_score に追記して保存"""
+    from utils.ai_translate import translate_memo_to_english
+
+    memo = db.session.get(Memo, job.payload.get('memo_id'))
+    if memo is None:
+        raise JobError('記事が見つかりません', 404)
+    # 積んでから実行までの間に変わっている可能性があるため再検証
+    if not memo.ai_score or memo.ai_score.get('translate_score', 0) < 80:
+        raise JobError('翻訳スコアが80点未満のため翻訳できません', 400)
+
+    result = translate_memo_to_english(memo.title, memo.content)
+    if not result:
+        raise JobError('AI翻訳に失敗しました。APIキーと利用制限を確認してください')
+
+    updated = dict(memo.ai_score)
+    updated['translated_title'] = result['translated_title']
+    updated['translated_body']  = result['translated_body']
+    memo.ai_score = updated
+    return {
+        'translated_title': result['translated_title'],
+        'translated_body': result['translated_body'],
+    }
+
+
+@job_handler('fixed_generate')
+def fixed_generate(job):
+    """タイトルから固定ページコンテンツを生成（保存は fixed_create で行う）"""
+    from utils.ai_fixed_generate import generate_fixed_page
+
+    existing_keys = [p.key for p in FixedPage.query.all()]
+    result = generate_fixed_page(job.payload.get('title', ''), existing_keys)
+    if not result:
+        raise JobError('AI生成に失敗しました。APIキーと利用制限を確認してください')
+
+    images = fixed_images()
+    image = random.choice(images) if images else 'refactor.jpg'
+    return dict(result, image=image, image_url=upload_url('fixed', image))
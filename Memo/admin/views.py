@@ -3,14 +3,23 @@ import os
 import re
 from datetime import datetime, timezone, date, timedelta
 from functools import wraps
-from flask import Blueprint, render_template, redirect, url_for, flash, session, current_app, request
+from flask import Blueprint, render_template, redirect, url_for, flash, session, current_app, request, abort
 from flask_login import login_required, current_user
 from forms import AdminLoginForm
 from flask_wtf import FlaskForm
-from models import db, User, ThumbnailConfig, Memo, Favorite, Category, memo_categories, FixedPage, AppLog
-from werkzeug.utils import secure_filename
-from sqlalchemy import func
+from models import db, User, ThumbnailConfig, Memo, Category, memo_categories, FixedPage, AppLog, BackgroundJob
+from sqlalchemy import func, update
 from utils.mail import send_mail
+from utils.ranking import invalidate_ranking
+from utils.nav import invalidate_nav
+from utils.sitemap import invalidate_sitemap
+from utils.job_queue import enqueue
+from utils.pagination import keyset_paginate
+from utils.log_retention import rollup_level_counts
+from utils.storage import get_storage, upload_url
+from utils.thumbnails import sync_thumbnail_configs
+from utils.upload import save_upload
+from admin.jobs import fixed_images  # ジョブハンドラの登録を兼ねる
 import stripe
 import json
 from pathlib import Path
@@ -65,9 +74,10 @@ def _check_ai_rate_limit(key, limit=5):
     return True
 
 
-def _is_super_admin():
-    """スーパーアドミン判定（ポイント・時間制限なし）。"""
-    return current_user.email == current_app.config.get('MAIL_USERNAME')
+def _is_super_admin(user=None):
+    """スーパーアドミン判定（ポイント・時間制限なし）。user 省略時はログイン中のユーザー。"""
+    user = user or current_user
+    return user.email == current_app.config.get('MAIL_USERNAME')
 
 
 def _check_ai_points(cost: int):
@@ -77,12 +87,27 @@ def _check_ai_points(cost: int):
     return (current_user.admin_points or 0) >= cost
 
 
-def _consume_ai_points(cost: int):
-    """AIポイントを消費してDBに保存する。スーパーアドミンは消費しない。"""
-    if _is_super_admin():
-        return
-    current_user.admin_points = max(0, (current_user.admin_points or 0) - cost)
-    db.session.commit()
+def _reserve_ai_points(cost: int) -> bool:
+    """AIポイントをジョブ投入時に確保する（コミットは呼び出し側）。残量不足なら False。
+
+    連続して投入されても残量を超えて使えないよう、残量の条件付き UPDATE 文で減算する。
+    """
+    return db.session.execute(
+        update(User)
+        .where(User.id == current_user.id, User.admin_points >= cost)
+        .values(admin_points=User.admin_points - cost)
+        .execution_options(synchronize_session=False)
+    ).rowcount > 0
+
+
+def _refund_ai_points(user_id: int, cost: int):
+    """失敗したジョブで確保していたAIポイントを返す（コミットは呼び出し側）。"""
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(admin_points=User.admin_points + cost)
+        .execution_options(synchronize_session=False)
+    )
 
 
 def admin_required(f):
@@ -97,6 +122,33 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+
+def _enqueue_ai_job(kind: str, payload: dict, cost: int):
+    """AI 処理をバックグラウンドジョブとして積み、202（ポーリング先付き）を返す。ポイントは投入時に確保し、失敗時に返す。"""
+    from flask import jsonify
+
+    cost = 0 if _is_super_admin() else cost
+    if cost and not _reserve_ai_points(cost):
+        return jsonify(status='error', message=f'AIポイントが不足しています（必要: {cost}pt / 残: {current_user.admin_points or 0}pt）'), 429
+    job = enqueue(kind, payload, user_id=current_user.id, cost=cost)
+    return _job_response(job)
+
+
+def _job_response(job):
+    """ジョブの状態を従来の AJAX 応答と同じ形の JSON で返す（実行中は 202）。"""
+    from flask import jsonify
+
+    if job.status == 'done':
+        return jsonify(status='ok', **(job.result or {}), remaining_points=current_user.admin_points)
+    if job.status == 'error':
+        return jsonify(status='error', message=job.error), (job.result or {}).get('status_code', 500)
+    return jsonify(
+        status=job.status,
+        job_id=job.id,
+        poll_url=url_for('admin.job_status', job_id=job.id),
+    ), 202
+
+
 # マークダウンのコード取得
 BASE_DIR = Path(__file__).resolve().parent.parent
 def get_markdown_content(relative_path: str, start_marker: str = None, end_marker: str = None):
@@ -322,11 +374,10 @@ def index():
     latest_memos = Memo.query.order_by(Memo.created_at.desc()).limit(5).all()
     bar_chart_data = []
     for memo in latest_memos:
-        like_count = Favorite.query.filter_by(memo_id=memo.id).count()
         bar_chart_data.append({
             'id': memo.id,
             'title': memo.title[:20] + ('...' if len(memo.title) > 20 else ''),
-            'like_count': like_count,
+            'like_count': memo.like_count,
             'view_count': memo.view_count or 0,
             'ai_score': memo.ai_score,
         })
@@ -611,6 +662,7 @@ def category():
             new_cat = Category(name=name, color=color)
             db.session.add(new_cat)
             db.session.commit()
+            invalidate_ranking()
             flash(f'カテゴリー「{name}」を追加しました', 'secondary')
         return redirect(url_for('admin.category'))
     categories = Category.query.order_by(Category.id).all()
@@ -627,6 +679,7 @@ def category_delete(cat_id):
         return redirect(url_for('admin.category'))
     db.session.delete(cat)
     db.session.commit()
+    invalidate_ranking()
     flash(f'カテゴリー「{cat.name}」を削除しました', 'secondary')
     return redirect(url_for('admin.category'))
 
@@ -634,7 +687,7 @@ def category_delete(cat_id):
 @admin_bp.route('/category/ai_suggest', methods=['POST'])
 @admin_required
 def category_ai_suggest():
-    """AJAX: Gemini AI による Flask トレンドカテゴリー名＋配色提案"""
+    """AJAX: Gemini AI による Flask トレンドカテゴリー名＋配色提案（バックグラウンドジョブ）"""
     from flask import jsonify
 
     if not _check_ai_rate_limit('category_suggest', limit=5):
@@ -648,55 +701,7 @@ def category_ai_suggest():
     if not api_key:
         return jsonify(status='error', message='GOOGLE_API_KEY が未設定です'), 500
 
-    existing = Category.query.all()
-    existing_names  = [c.name  for c in existing]
-    existing_colors = [c.color for c in existing]
-
-    try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-        import json as json_lib
-
-        client = genai.Client(api_key=api_key)
-
-        names_str  = ', '.join(existing_names)  if existing_names  else 'なし'
-        colors_str = ', '.join(existing_colors) if existing_colors else 'なし'
-
-        prompt = (
-            f"あなたはFlask技術ブログのカテゴリー設計者です。\n"
-            f"以下の条件でカテゴリー名と配色を1件提案してください。\n\n"
-            f"【条件】\n"
-            f"- カテゴリー名: Flaskやバックエンド開発に関連するトレンド技術名（英数字・ハイフン・アンダースコアのみ・12文字以内）\n"
-            f"- 既存カテゴリー名（重複不可）: {names_str}\n"
-            f"- カラー: HEX形式・#666より暗い色（明度低め）\n"
-            f"- 既存カラー（{colors_str}）と視覚的に区別できる配色を選ぶこと\n\n"
-            f"【出力形式】\n"
-            f'必ず以下のJSONのみを返してください（説明不要）:\n{{"name": "カテゴリー名", "color": "#xxxxxx"}}'
-        )
-
-        response = client.models.generate_content(
-            model='gemini-2.5-flash-lite',
-            contents=prompt,
-            config=GenerateContentConfig(max_output_tokens=128, temperature=0.9),
-        )
-
-        text = response.text.strip()
-        json_match = re.search(r'\{[^}]+\}', text)
-        if not json_match:
-            return jsonify(status='error', message='AI応答の解析に失敗しました'), 500
-
-        data  = json_lib.loads(json_match.group())
-        name  = re.sub(r'[^A-Za-z0-9\-_]', '', data.get('name', ''))[:12]
-        color = data.get('color', '#234466').strip()
-        if not re.match(r'^#[0-9a-fA-F]{6}$', color):
-            color = '#234466'
-
-        _consume_ai_points(_AI_COST_CATEGORY)
-        return jsonify(status='ok', name=name, color=color, remaining_points=current_user.admin_points)
-
-    except Exception as e:
-        print(f"######## カテゴリーAI提案失敗: {e} ########")
-        return jsonify(status='error', message='AI提案に失敗しました'), 500
+    return _enqueue_ai_job('category_suggest', {}, _AI_COST_CATEGORY)
 
 
 @admin_bp.route('/user_thumb')
@@ -705,27 +710,8 @@ def user_thumb():
     users = User.query.order_by(User.id).all()
     form = FlaskForm()
 
-    # static/images/user/ の全ファイルをスキャン
-    EXCLUDE = {'default.png', 'images.png'}
-    user_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'user')
-    all_files = sorted([
-        f for f in os.listdir(user_img_dir)
-        if os.path.isfile(os.path.join(user_img_dir, f)) and f not in EXCLUDE
-    ])
-
-    # DB と自動同期（新ファイルは 001〜010 のみ visible=True で追加、削除済みは除去）
-    existing = {tc.filename: tc for tc in ThumbnailConfig.query.all()}
-    file_set = set(all_files)
-    for filename in all_files:
-        if filename not in existing:
-            m = re.match(r'^(\d+)\.', filename)
-            num = int(m.group(1)) if m else None
-            is_default_visible = (num is not None and 1 <= num <= 10)
-            db.session.add(ThumbnailConfig(filename=filename, visible=is_default_visible))
-    for filename, tc in existing.items():
-        if filename not in file_set:
-            db.session.delete(tc)
-    db.session.commit()
+    # DB と同期（フォルダ一覧が前回から変わったときだけ差分を反映）
+    file_set = sync_thumbnail_configs()
 
     thumb_configs = ThumbnailConfig.query.filter(
         ThumbnailConfig.filename.in_(file_set)
@@ -745,16 +731,19 @@ def user_thumb_upload():
         flash('ファイルが選択されていません', 'secondary')
         return redirect(url_for('admin.user_thumb'))
 
-    # 3桁連番ファイル名を生成（ディレクトリ内の最大番号 + 1）
-    user_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'user')
-    ext = os.path.splitext(secure_filename(file.filename))[1].lower()
-    pattern = re.compile(r'^(\d{3})\.')
-    max_num = max(
-        (int(m.group(1)) for f in os.listdir(user_img_dir) if (m := pattern.match(f))),
-        default=0
-    )
-    filename = f"{max_num + 1:03d}{ext}"
-    file.save(os.path.join(user_img_dir, filename))
+    # 3桁連番ファイル名で保存（ディレクトリ内の最大番号 + 1）。同じ画像が保存済みならそのファイルを使う
+    def next_number_name(digest, ext):
+        pattern = re.compile(r'^(\d{3})\.')
+        max_num = max(
+            (int(m.group(1)) for f in get_storage().list('user') if (m := pattern.match(f))),
+            default=0
+        )
+        return f"{max_num + 1:03d}.{ext}"
+
+    filename = save_upload(file, 'user', name=next_number_name)
+    if not filename:
+        flash('画像ファイル（JPEG / PNG / GIF）を選択してください', 'secondary')
+        return redirect(url_for('admin.user_thumb'))
 
     # ThumbnailConfig に追加（visible=True）
     if not ThumbnailConfig.query.filter_by(filename=filename).first():
@@ -790,12 +779,10 @@ def thumbnail_visibility_update():
             # 使用中ユーザーを default.png に自動リセット
             User.query.filter_by(thumbnail=tc.filename).update({'thumbnail': 'default.png'})
             # 物理ファイル削除
-            file_path = os.path.join(current_app.root_path, 'static', 'images', 'user', tc.filename)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"######## サムネイルファイル削除失敗: {e} ########")
+            try:
+                get_storage().delete('user', tc.filename)
+            except Exception as e:
+                print(f"######## サムネイルファイル削除失敗: {e} ########")
             db.session.delete(tc)
             deleted_count += 1
 
@@ -817,9 +804,8 @@ def thumbnail_visibility_update():
 @admin_bp.route('/user_thumb/ai_generate', methods=['POST'])
 @admin_required
 def user_thumb_ai_generate():
-    """AJAX: Imagen API によるユーザーサムネイル画像生成（スーパーアドミン専用・有料）"""
+    """AJAX: Imagen API によるユーザーサムネイル画像生成（スーパーアドミン専用・有料・バックグラウンドジョブ）"""
     from flask import jsonify
-    from utils.ai_thumb_generate import generate_thumb_image
 
     if not _check_ai_rate_limit('thumb_generate', limit=5):
         return jsonify(status='error', message='本日のAI生成の利用上限（5回）に達しました。明日以降にお試しください'), 429
@@ -829,50 +815,13 @@ def user_thumb_ai_generate():
         return jsonify(status='error', message=f'AIポイントが不足しています（必要: {_AI_COST_THUMB}pt / 残: {current_user.admin_points or 0}pt）'), 429
 
     data = request.get_json(silent=True) or {}
-    user_id = data.get('user_id')
-
-    image_bytes = generate_thumb_image()
-    if not image_bytes:
-        return jsonify(status='error', message='AI画像生成に失敗しました。APIキーまたはモデルの設定を確認してください'), 500
-
-    # 3桁連番ファイル名を生成
-    user_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'user')
-    pattern = re.compile(r'^(\d{3})\.')
-    max_num = max(
-        (int(m.group(1)) for f in os.listdir(user_img_dir) if (m := pattern.match(f))),
-        default=0
-    )
-    filename = f"{max_num + 1:03d}.png"
-    file_path = os.path.join(user_img_dir, filename)
-    with open(file_path, 'wb') as fp:
-        fp.write(image_bytes)
-
-    # ThumbnailConfig に追加（visible=True）
-    if not ThumbnailConfig.query.filter_by(filename=filename).first():
-        db.session.add(ThumbnailConfig(filename=filename, visible=True))
-
-    # ユーザーへの割付
-    if user_id:
-        user = User.query.get(user_id)
-        if user:
-            user.thumbnail = filename
-
-    db.session.commit()
-
-    _consume_ai_points(_AI_COST_THUMB)
-    return jsonify(
-        status='ok',
-        filename=filename,
-        url=url_for('static', filename=f'images/user/{filename}'),
-        remaining_points=current_user.admin_points,
-    )
+    return _enqueue_ai_job('thumb_generate', {'user_id': data.get('user_id')}, _AI_COST_THUMB)
 
 
 @admin_bp.route('/analyze', methods=['POST'])
 @admin_required
 def analyze():
-    """最新5件の記事を Gemini AI で翻訳価値スコアリングし、結果をDBに保存してJSONで返す"""
-    from utils.ai_translate_score import score_translate_value
+    """最新5件の記事を Gemini AI で翻訳価値スコアリングし、結果をDBに保存してJSONで返す（バックグラウンドジョブ）"""
     from flask import jsonify
 
     if not _check_ai_rate_limit('analyze', limit=5):
@@ -882,57 +831,39 @@ def analyze():
     if not _check_ai_points(_AI_COST_ANALYZE):
         return jsonify(status='error', message=f'AIポイントが不足しています（必要: {_AI_COST_ANALYZE}pt / 残: {current_user.admin_points or 0}pt）'), 429
 
-    latest_memos = Memo.query.order_by(Memo.created_at.desc()).limit(5).all()
-    results = []
-    has_error = False
+    return _enqueue_ai_job('analyze', {}, _AI_COST_ANALYZE)
 
-    for memo in latest_memos:
-        # 旧形式（information/writing/readability）は再解析させる
-        if memo.ai_score and 'translate_score' in memo.ai_score:
-            scores = memo.ai_score
-        else:
-            like_count_val = Favorite.query.filter_by(memo_id=memo.id).count()
-            scores = score_translate_value(
-                memo.title, memo.content,
-                like_count=like_count_val,
-                view_count=memo.view_count or 0,
-            )
-            if scores:
-                memo.ai_score = scores
-            else:
-                scores = {
-                    "seo": 0, "tech": 0, "structure": 0, "spread": 0,
-                    "translate_score": 0, "translate_verdict": "エラー",
-                    "seo_title": "", "keywords": [], "inflow": "低",
-                    "translate_reason": "AI解析に失敗しました",
-                }
-                has_error = True
-
-        like_count = Favorite.query.filter_by(memo_id=memo.id).count()
-        results.append({
-            'id': memo.id,
-            'title': memo.title[:20] + ('...' if len(memo.title) > 20 else ''),
-            'like_count': like_count,
-            'view_count': memo.view_count or 0,
-            'ai_score': scores,
-        })
 
-    db.session.commit()  # ai_score の更新を確実にDBへ保存（_consume_ai_points がスーパーアドミンで早期returnする場合でも保証）
-    _consume_ai_points(_AI_COST_ANALYZE)
-    return jsonify(status='ok', data=results, remaining_points=current_user.admin_points)
+@admin_bp.route('/jobs/<int:job_id>')
+@admin_required
+def job_status(job_id):
+    """AJAX: バックグラウンドジョブの状態ポーリング（依頼者本人のジョブのみ）"""
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return _job_response(job)
+
+
+@admin_bp.route('/ai_metrics')
+@admin_required
+def ai_metrics():
+    """JSON: このプロセスでの Gemini API 呼び出し回数・エラー数・応答時間（モデル別）"""
+    from flask import jsonify
+    from utils.ai_client import get_metrics
+
+    return jsonify(status='ok', pid=os.getpid(), metrics=get_metrics())
 
 
 @admin_bp.route('/marketing')
 @admin_required
 def marketing():
     """マーケティング戦略ページ：翻訳スコア済み記事一覧"""
-    memos = Memo.query.filter(Memo.ai_score.isnot(None)).all()
-    # translate_score キーを持つ記事のみ・降順ソート
-    scored = [m for m in memos if m.ai_score and 'translate_score' in m.ai_score]
-    scored.sort(key=lambda m: m.ai_score['translate_score'], reverse=True)
-    # いいね数を付与
-    for m in scored:
-        m.like_count = Favorite.query.filter_by(memo_id=m.id).count()
+    # translate_score を持つ記事のみ・降順ソート（導出カラム translate_score のインデックスを利用）
+    scored = (
+        Memo.query.filter(Memo.translate_score.isnot(None))
+        .order_by(Memo.translate_score.desc(), Memo.id)
+        .all()
+    )
     form = FlaskForm()
     return render_template('admin/marketing.j2', memos=scored, form=form)
 
@@ -940,8 +871,7 @@ def marketing():
 @admin_bp.route('/translate/<int:memo_id>', methods=['POST'])
 @admin_required
 def translate(memo_id):
-    """AJAX: Gemini AI による記事英語翻訳（80点以上のみ）"""
-    from utils.ai_translate import translate_memo_to_english
+    """AJAX: Gemini AI による記事英語翻訳（80点以上のみ・バックグラウンドジョブ）"""
     from flask import jsonify
 
     if not _check_ai_rate_limit('translate', limit=5):
@@ -957,24 +887,7 @@ def translate(memo_id):
     if not memo.ai_score or memo.ai_score.get('translate_score', 0) < 80:
         return jsonify(status='error', message='翻訳スコアが80点未満のため翻訳できません'), 400
 
-    result = translate_memo_to_english(memo.title, memo.content)
-    if not result:
-        return jsonify(status='error', message='AI翻訳に失敗しました。APIキーと利用制限を確認してください'), 500
-
-    # 翻訳結果を ai_score に追記して保存
-    updated = dict(memo.ai_score)
-    updated['translated_title'] = result['translated_title']
-    updated['translated_body']  = result['translated_body']
-    memo.ai_score = updated
-    db.session.commit()
-
-    _consume_ai_points(_AI_COST_TRANSLATE)
-    return jsonify(
-        status='ok',
-        translated_title=result['translated_title'],
-        translated_body=result['translated_body'],
-        remaining_points=current_user.admin_points,
-    )
+    return _enqueue_ai_job('translate', {'memo_id': memo.id}, _AI_COST_TRANSLATE)
 
 
 @admin_bp.route('/fixed')
@@ -983,13 +896,7 @@ def fixed():
     """固定ページ管理一覧"""
     pages = FixedPage.query.order_by(FixedPage.order).all()
     form = FlaskForm()
-    fixed_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'fixed')
-    images = sorted([
-        f for f in os.listdir(fixed_img_dir)
-        if os.path.isfile(os.path.join(fixed_img_dir, f))
-        and f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        and f != 'keyvisual.jpg'
-    ])
+    images = sorted(fixed_images())
     return render_template('admin/fixed.j2', pages=pages, form=form, images=images)
 
 
@@ -1004,6 +911,8 @@ def fixed_toggle(page_id):
         return redirect(url_for('admin.fixed'))
     page.visible = not page.visible
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     status = '表示' if page.visible else '非表示'
     flash(f'「{page.title}」を{status}に変更しました', 'secondary')
     return redirect(url_for('admin.fixed'))
@@ -1020,6 +929,8 @@ def fixed_toggle_en(page_id):
         return redirect(url_for('admin.fixed'))
     page.en_visible = not page.en_visible
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     status = 'EN表示' if page.en_visible else 'EN非表示'
     flash(f'「{page.title}」を{status}に変更しました', 'secondary')
     return redirect(url_for('admin.fixed'))
@@ -1036,6 +947,8 @@ def fixed_toggle_nav_type(page_id):
         return redirect(url_for('admin.fixed'))
     page.nav_type = 'footer' if page.nav_type == 'global' else 'global'
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     label = 'フッター' if page.nav_type == 'footer' else 'グローバルナビ'
     flash(f'「{page.title}」を{label}に変更しました', 'secondary')
     return redirect(url_for('admin.fixed'))
@@ -1053,6 +966,8 @@ def fixed_delete(page_id):
     title = page.title
     db.session.delete(page)
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     flash(f'固定ページ「{title}」をDBから削除しました（テンプレートファイルは残っています）', 'secondary')
     return redirect(url_for('admin.fixed'))
 
@@ -1075,6 +990,8 @@ def fixed_edit(page_id):
     except (ValueError, TypeError):
         pass
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     flash(f'「{page.title}」を更新しました', 'secondary')
     return redirect(url_for('admin.fixed'))
 
@@ -1093,15 +1010,16 @@ def fixed_reorder():
         if page:
             page.order = index
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
     return jsonify(status='ok')
 
 
 @admin_bp.route('/fixed/generate', methods=['POST'])
 @admin_required
 def fixed_generate():
-    """AJAX: Gemini AI による固定ページコンテンツ生成"""
+    """AJAX: Gemini AI による固定ページコンテンツ生成（バックグラウンドジョブ）"""
     from flask import jsonify
-    from utils.ai_fixed_generate import generate_fixed_page
 
     if not _check_ai_rate_limit('fixed_generate', limit=5):
         return jsonify(status='error', message='本日のAI生成の利用上限（5回）に達しました。明日以降にお試しください'), 429
@@ -1115,24 +1033,7 @@ def fixed_generate():
     if not title:
         return jsonify(status='error', message='タイトルを入力してください'), 400
 
-    existing_keys = [p.key for p in FixedPage.query.all()]
-    result = generate_fixed_page(title, existing_keys)
-    if not result:
-        return jsonify(status='error', message='AI生成に失敗しました。APIキーと利用制限を確認してください'), 500
-
-    # ランダム画像を選択
-    fixed_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'fixed')
-    images = [
-        f for f in os.listdir(fixed_img_dir)
-        if os.path.isfile(os.path.join(fixed_img_dir, f))
-        and f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        and f != 'keyvisual.jpg'
-    ]
-    import random
-    selected_image = random.choice(images) if images else 'refactor.jpg'
-
-    _consume_ai_points(_AI_COST_FIXED)
-    return jsonify(status='ok', **result, image=selected_image, remaining_points=current_user.admin_points)
+    return _enqueue_ai_job('fixed_generate', {'title': title}, _AI_COST_FIXED)
 
 
 @admin_bp.route('/fixed/random-image')
@@ -1141,15 +1042,9 @@ def fixed_random_image():
     """AJAX: ランダムに画像を返す"""
     from flask import jsonify
     import random
-    fixed_img_dir = os.path.join(current_app.root_path, 'static', 'images', 'fixed')
-    images = [
-        f for f in os.listdir(fixed_img_dir)
-        if os.path.isfile(os.path.join(fixed_img_dir, f))
-        and f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        and f != 'keyvisual.jpg'
-    ]
+    images = fixed_images()
     image = random.choice(images) if images else 'refactor.jpg'
-    return jsonify(image=image)
+    return jsonify(image=image, image_url=upload_url('fixed', image))
 
 
 @admin_bp.route('/fixed/create', methods=['POST'])
@@ -1218,6 +1113,8 @@ def fixed_create():
     )
     db.session.add(new_page)
     db.session.commit()
+    invalidate_nav()
+    invalidate_sitemap()
 
     flash(f'固定ページ「{title}」を作成しました（/fixed/{key}）', 'secondary')
     if redirect_to_memo:
@@ -1423,16 +1320,40 @@ def _parse_log_line(line):
     }
 
 
+_LOG_LEVELS = ('ERROR', 'WARNING', 'INFO')
+_LOGS_PER_PAGE = 100
+
+
 @admin_bp.route('/logs')
 @admin_required
 def logs():
-    days = int(request.args.get('days', 1))
+    """
+    ログ可視化：期間・レベル・モジュールで絞り込み、新しい順に100件ずつ表示する。
+
+    件数サマリーは GROUP BY level の集計クエリ（保持期間より前は集計テーブル）で求め、行は (created_at, id) の
+    キーセットでページングする。htmx（HX-Request）からの続き読み込みには行だけを返す。
+    """
+    days = request.args.get('days', 1, type=int)
     if days not in (1, 3, 7, 30):
         days = 1
+    level = request.args.get('level', '').upper()
+    if level not in _LOG_LEVELS:
+        level = ''
+    module = request.args.get('module', '').strip()[:100]
+    cursor = request.args.get('cursor')
 
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    rows = AppLog.query.filter(AppLog.created_at >= cutoff)\
-        .order_by(AppLog.created_at.desc()).all()
+    filters = [AppLog.created_at >= cutoff]
+    if module:
+        # "ロガー名:行番号" の前方一致（ロガー名だけでも絞り込める）
+        filters.append(AppLog.module.startswith(module, autoescape=True))
+
+    query = AppLog.query.filter(*filters)
+    if level:
+        query = query.filter(AppLog.level == level)
+    page = keyset_paginate(
+        query, [(AppLog.created_at, 'desc'), (AppLog.id, 'desc')], cursor, _LOGS_PER_PAGE,
+    )
 
     JST = timezone(timedelta(hours=9))
     def _to_jst(dt):
@@ -1447,14 +1368,37 @@ def logs():
             'module': row.module,
             'message': row.message,
         }
-        for row in rows
+        for row in page.items
     ]
+    filter_args = {'days': days, 'level': level or None, 'module': module or None}
+
+    if request.headers.get('HX-Request') and cursor:
+        return render_template('admin/_log_rows.j2', logs=entries, next_cursor=page.next_cursor,
+                               filter_args=filter_args)
 
+    counts = dict(
+        db.session.query(AppLog.level, func.count())
+        .filter(*filters)
+        .group_by(AppLog.level)
+        .all()
+    )
+    # 期間の始めまで生ログが残っていなければ、削除済みの分を集計テーブル（flask rollup-logs）から加える
+    # （保持日数の設定ではなく実際に残っている最古の行で判断する。集計済みの行と生ログは重複しない）
+    oldest = db.session.query(func.min(AppLog.created_at)).scalar()
+    if oldest is not None and oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    rolled_up = False
+    if oldest is None or oldest > cutoff:
+        for lv, n in rollup_level_counts(cutoff, module).items():
+            counts[lv] = counts.get(lv, 0) + n
+            rolled_up = True
     summary = {
-        'error':   sum(1 for e in entries if e['level'] == 'ERROR'),
-        'warning': sum(1 for e in entries if e['level'] == 'WARNING'),
-        'info':    sum(1 for e in entries if e['level'] == 'INFO'),
-        'total':   len(entries),
+        'error':   counts.get('ERROR', 0),
+        'warning': counts.get('WARNING', 0),
+        'info':    counts.get('INFO', 0),
+        'total':   sum(counts.values()),
     }
 
-    return render_template('admin/logs.j2', logs=entries, days=days, summary=summary)
+    return render_template('admin/logs.j2', logs=entries, days=days, level=level, module=module,
+                           summary=summary, next_cursor=page.next_cursor, filter_args=filter_args,
+                           rolled_up=rolled_up, raw_since=_to_jst(oldest) if oldest else None)
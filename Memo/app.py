@@ -1,11 +1,20 @@
-from flask import Flask, send_from_directory, request
+from flask import Flask, send_from_directory, request, abort
 from flask_migrate import Migrate
-from models import db, User, FixedPage
+from models import db, User
 from flask_login import LoginManager
 from flask_debugtoolbar import DebugToolbarExtension
 from werkzeug.exceptions import NotFound, InternalServerError
 from errors.views import show_404_page
 from utils.logger import init_logger
+from utils.cache import init_cache
+from utils.view_counter import init_view_counter
+from utils.nav import get_nav_pages
+from utils.search import init_search
+from utils.job_queue import init_job_queue
+from utils.http_cache import init_http_cache
+from utils.fragment_cache import init_fragment_cache
+from utils.image_variants import init_image_variants
+from utils.storage import init_storage
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
 import sqlite3
@@ -19,6 +28,8 @@ from fixed.views import fixed_bp
 from admin.views import admin_bp
 from admin.webhook import webhook_bp
 
+import os
+import click
 import stripe
 from dotenv import load_dotenv
 load_dotenv()
@@ -48,6 +59,14 @@ def create_app(config_override=None):
         DebugToolbarExtension(app)
     Migrate(app, db)
     init_logger(app)
+    init_cache(app)
+    init_view_counter(app)
+    init_search(app)
+    init_job_queue(app)
+    init_http_cache(app)
+    init_fragment_cache(app)
+    init_storage(app)
+    init_image_variants(app)
 
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -69,44 +88,21 @@ def create_app(config_override=None):
 
     @app.route('/sitemap.xml')
     def sitemap():
-        """URLマップから動的にsitemap.xmlを生成する"""
-        from flask import Response
-        from models import Memo, FixedPage
-        from datetime import datetime
-
-        site_url = app.config['SITE_URL'].rstrip('/')
-        now = datetime.utcnow().strftime('%Y-%m-%d')
-
-        urls = []
-
-        # トップページ
-        urls.append(f'<url><loc>{site_url}/</loc><changefreq>daily</changefreq><priority>1.0</priority></url>')
-
-        # 公開メモ記事
-        memos = Memo.query.order_by(Memo.created_at.desc()).all()
-        for memo in memos:
-            updated = memo.created_at.strftime('%Y-%m-%d') if memo.created_at else now
-            urls.append(
-                f'<url><loc>{site_url}/detail/{memo.id}</loc>'
-                f'<lastmod>{updated}</lastmod>'
-                f'<changefreq>weekly</changefreq><priority>0.8</priority></url>'
-            )
-
-        # 固定ページ（表示中のみ）
-        pages = FixedPage.query.filter_by(visible=True).order_by(FixedPage.order).all()
-        for page in pages:
-            urls.append(
-                f'<url><loc>{site_url}/fixed/{page.key}</loc>'
-                f'<changefreq>monthly</changefreq><priority>0.5</priority></url>'
-            )
-
-        xml = (
-            '<?xml version="1.0" encoding="UTF-8"?>\n'
-            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-            + '\n'.join(urls) +
-            '\n</urlset>'
-        )
-        return Response(xml, mimetype='application/xml')
+        """sitemap.xml をストリーミング生成する（5万URL超はサイトマップインデックス）"""
+        from utils.sitemap import sitemap_response
+        return sitemap_response('index')
+
+    @app.route('/sitemap-pages.xml')
+    def sitemap_pages():
+        """分割時のトップページ・固定ページ分のサイトマップ"""
+        from utils.sitemap import sitemap_response
+        return sitemap_response('pages') or abort(404)
+
+    @app.route('/sitemap-memos-<int:part>.xml')
+    def sitemap_memos(part):
+        """分割時の記事分のサイトマップ（5万件ずつ）"""
+        from utils.sitemap import sitemap_response
+        return sitemap_response('memos', part) or abort(404)
 
     @app.route('/robots.txt')
     def robots():
@@ -159,15 +155,13 @@ def create_app(config_override=None):
     @app.context_processor
     def inject_global_context():
         try:
-            pages = FixedPage.query.filter_by(visible=True).order_by(FixedPage.order).all()
-            GLOBAL_NAV_PAGES    = {p.key: p.title for p in pages if p.nav_type == 'global'}
-            FOOTER_NAV_PAGES    = {p.key: p.title for p in pages if p.nav_type == 'footer'}
-            EN_GLOBAL_NAV_PAGES = {p.key: (p.en_title or p.title) for p in pages if p.nav_type == 'global' and p.en_visible}
-            EN_FOOTER_NAV_PAGES = {p.key: (p.en_title or p.title) for p in pages if p.nav_type == 'footer' and p.en_visible}
+            nav_pages = get_nav_pages()
         except Exception as e:
             app.logger.warning("inject_global_context: DB取得失敗 %s", e)
-            GLOBAL_NAV_PAGES = FOOTER_NAV_PAGES = {}
-            EN_GLOBAL_NAV_PAGES = EN_FOOTER_NAV_PAGES = {}
+            nav_pages = {
+                'GLOBAL_NAV_PAGES': {}, 'FOOTER_NAV_PAGES': {},
+                'EN_GLOBAL_NAV_PAGES': {}, 'EN_FOOTER_NAV_PAGES': {},
+            }
 
         # 英語ページ判定
         is_english = request.path.startswith('/en')
@@ -180,10 +174,7 @@ def create_app(config_override=None):
             lang_switch_url = '/en' + path
 
         return dict(
-            GLOBAL_NAV_PAGES=GLOBAL_NAV_PAGES,
-            FOOTER_NAV_PAGES=FOOTER_NAV_PAGES,
-            EN_GLOBAL_NAV_PAGES=EN_GLOBAL_NAV_PAGES,
-            EN_FOOTER_NAV_PAGES=EN_FOOTER_NAV_PAGES,
+            **nav_pages,
             SITE_NAME=app.config['SITE_NAME'],
             is_english=is_english,
             lang_switch_url=lang_switch_url,
@@ -221,39 +212,136 @@ app = create_app()
 
 
 @app.cli.command('translate-memos')
-def translate_memos_command():
-    """ai_score 付き・未翻訳の Memo を全件 Gemini で英語翻訳して DB に保存する。"""
-    from models import Memo
-    from utils.ai_translate import translate_memo_to_english
-    import time
-
-    all_memos = Memo.query.all()
-    targets = [m for m in all_memos
-               if not (m.ai_score and m.ai_score.get('translated_title'))]
-
-    if not targets:
+@click.option('--concurrency', type=int, default=None, help='同時実行数（既定: AI_BATCH_CONCURRENCY）')
+@click.option('--rate', type=float, default=None, help='秒間リクエスト数の上限（既定: AI_BATCH_RATE）')
+@click.option('--batch-size', type=int, default=20, show_default=True, help='何件ごとにコミットするか')
+@click.option('--limit', type=int, default=None, help='処理件数の上限')
+@click.option('--retry-failed', is_flag=True, help='前回失敗した記事だけを再実行する')
+@click.option('--restart', is_flag=True, help='チェックポイントを破棄して最初から実行する')
+def translate_memos_command(concurrency, rate, batch_size, limit, retry_failed, restart):
+    """未翻訳の Memo を Gemini で並列に英語翻訳して DB に保存する（中断しても続きから再開）。"""
+    from utils.ai_batch import run_translate_job
+    from utils.ai_translate import request_translation
+
+    checkpoint_path = os.path.join(app.instance_path, 'translate_checkpoint.json')
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats = run_translate_job(
+        app, request_translation,
+        concurrency=concurrency or app.config['AI_BATCH_CONCURRENCY'],
+        rate=rate or app.config['AI_BATCH_RATE'],
+        batch_size=batch_size,
+        checkpoint_path=checkpoint_path,
+        limit=limit,
+        retry_failed=retry_failed,
+    )
+    if not stats.ok + stats.ng:
         print('翻訳対象なし（全件翻訳済み）')
         return
 
-    print(f'翻訳対象: {len(targets)} 件')
-    ok = ng = 0
-    for memo in targets:
-        print(f'  [{memo.id}] {memo.title[:40]} ... ', end='', flush=True)
-        result = translate_memo_to_english(memo.title, memo.content)
-        if result:
-            updated = dict(memo.ai_score) if memo.ai_score else {}
-            updated['translated_title'] = result['translated_title']
-            updated['translated_body']  = result['translated_body']
-            memo.ai_score = updated
-            db.session.commit()
-            print('OK')
-            ok += 1
-        else:
-            print('FAIL')
-            ng += 1
-        time.sleep(1)  # レートリミット対策
+    if stats.ok:
+        from utils.ranking import invalidate_ranking
+        invalidate_ranking()
+    print(f'\n{stats.report()}')
+
+
+@app.cli.command('reconcile-like-counts')
+def reconcile_like_counts_command():
+    """favorites を再集計して Memo.like_count のズレを補正する。"""
+    from utils.like_count import reconcile_like_counts
+
+    fixed = reconcile_like_counts()
+    print(f'like_count 補正: {fixed} 件')
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """全 Memo から全文検索インデックスを作り直す。"""
+    from utils.search import rebuild_search_index
 
-    print(f'\n完了: 成功 {ok} 件 / 失敗 {ng} 件')
+    count = rebuild_search_index()
+    print(f'検索インデックス再構築: {count} 件')
+
+
+@app.cli.command('purge-ai-cache')
+@click.option('--function', default=None, help='対象の関数名（省略時は全件）')
+def purge_ai_cache_command(function):
+    """Gemini API 結果キャッシュを削除する。"""
+    from utils.ai_cache import purge_ai_cache
+
+    count = purge_ai_cache(function)
+    print(f'AI結果キャッシュ削除: {count} 件')
+
+
+@app.cli.command('run-jobs')
+@click.option('--once', is_flag=True, help='待機中のジョブを1巡実行したら終了する')
+@click.option('--poll-interval', type=float, default=None, help='待機ジョブ確認の間隔（秒）')
+@click.option('--stale-seconds', type=int, default=None, help='この秒数以上 running のままのジョブを待機に戻す')
+def run_jobs_command(once, poll_interval, stale_seconds):
+    """バックグラウンドジョブを実行する専用ワーカー（JOB_QUEUE_MODE=worker 用）。"""
+    from utils.job_queue import work
+
+    print('ジョブワーカー起動')
+    work(app, poll_interval=poll_interval or app.config['JOB_POLL_INTERVAL'],
+         stale_seconds=stale_seconds or app.config['JOB_STALE_SECONDS'], once=once)
+
+
+@app.cli.command('rollup-logs')
+@click.option('--retention-days', type=int, default=None, help='生ログを残す日数（省略時は LOG_RETENTION_DAYS）')
+@click.option('--chunk-size', type=int, default=5000, help='1トランザクションで処理する行数')
+@click.option('--archive', 'archive_path', default=None, help='削除前の行を追記保存する .jsonl.gz ファイル')
+def rollup_logs_command(retention_days, chunk_size, archive_path):
+    """保持期間を過ぎた app_logs を時間別の件数に集計して削除する（cron で定期実行）。"""
+    from utils.log_retention import rollup_logs
+
+    retention_days = retention_days or app.config['LOG_RETENTION_DAYS']
+    print(f'{retention_days} 日より前のログを集計・削除します')
+    result = rollup_logs(retention_days, chunk_size=chunk_size, archive_path=archive_path)
+    print(result.report())
+
+
+@app.cli.command('build-image-variants')
+@click.option('--force', is_flag=True, help='生成済みの記事も作り直す')
+def build_image_variants_command(force):
+    """既存記事の画像から srcset 用の縮小版（WebP / AVIF）を作る。"""
+    from models import Memo
+    from utils.image_variants import build_variants
+    from utils.ranking import invalidate_ranking
+
+    # GIF はアニメーションを保つため縮小版を作らない
+    query = Memo.query.filter(Memo.image_filename.isnot(None), ~Memo.image_filename.ilike('%.gif'))
+    if not force:
+        query = query.filter(Memo.image_variants.is_(None))
+    built = {}  # 同じ画像を共有する記事（シードデータなど）は1回だけ生成する
+    count = 0
+    for memo in query.yield_per(200):
+        if memo.image_filename not in built:
+            built[memo.image_filename] = build_variants(memo.image_filename)
+        if built[memo.image_filename]:
+            memo.image_variants = built[memo.image_filename]
+            count += 1
+    db.session.commit()
+    invalidate_ranking()
+    print(f'縮小版生成: 記事 {count} 件 / 画像 {sum(1 for v in built.values() if v)} 枚')
+
+
+@app.cli.command('sync-storage')
+@click.option('--category', 'categories', multiple=True, help='対象（memo / user / fixed。省略時は全て）')
+def sync_storage_command(categories):
+    """ローカルの画像フォルダ（シード画像・プリセットを含む）をストレージバックエンドへ複製する。"""
+    from utils.storage import LocalStorage, get_storage
+
+    local, storage = LocalStorage(), get_storage()
+    if isinstance(storage, LocalStorage):
+        print('STORAGE_BACKEND=local のため複製不要です')
+        return
+    for category in categories or app.config['UPLOAD_FOLDERS']:
+        names = [name for name in local.list(category) if not storage.exists(category, name)]
+        for name in names:
+            with local.open(category, name) as fp:
+                storage.save_bytes(category, name, fp.read())
+        print(f'{category}: {len(names)} 件アップロード')
 
 
 if __name__ == '__main__':
@@ -6,7 +6,9 @@ from forms import LoginForm, SignUpForm, EditUserForm
 from flask_login import login_user, logout_user, login_required, current_user
 from authlib.integrations.flask_client import OAuth
 from werkzeug.security import generate_password_hash, check_password_hash
-from utils.upload import save_upload
+from utils.upload import save_upload, release_upload
+from utils.like_count import adjust_like_count
+from utils.ranking import invalidate_ranking
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -83,6 +85,11 @@ def logout():
     flash('ログアウトしました', 'secondary')
     return redirect(url_for('auth.login'))
 
+def _release_thumbnail(filename):
+    """自分でアップロードしたサムネイルの参照を外す（管理画面のプリセット画像は対象外）。"""
+    if filename and not ThumbnailConfig.query.filter_by(filename=filename).first():
+        release_upload('user', filename)
+
 # ユーザー編集
 @auth_bp.route('/edit', methods=['GET', 'POST'])
 @login_required
@@ -99,9 +106,12 @@ def edit():
         if form.thumbnail.data:
             file = form.thumbnail.data
             filename = save_upload(file, 'user')
-            current_user.thumbnail = filename
+            if filename:
+                _release_thumbnail(current_user.thumbnail)
+                current_user.thumbnail = filename
         # ファイルが無ければプリセット
         elif form.preset_thumbnail.data:
+            _release_thumbnail(current_user.thumbnail)
             current_user.thumbnail = form.preset_thumbnail.data
         db.session.commit()
         flash('ユーザー情報を更新しました', 'secondary')
@@ -125,8 +135,12 @@ def edit():
 def delete():
     user = current_user._get_current_object()
     logout_user()
+    # cascade で消える favorites 分の like_count を差し引く
+    adjust_like_count([f.memo_id for f in user.favorites], -1)
+    _release_thumbnail(user.thumbnail)
     db.session.delete(user)
     db.session.commit()
+    invalidate_ranking()
     flash('ユーザー情報を削除しました', 'secondary')
     return redirect(url_for('public.public_index'))
 
@@ -26,8 +26,26 @@ class Config(object):
     UPLOAD_FOLDERS = {
         'memo': 'static/images/memo',
         'user': 'static/images/user',
+        'fixed': 'static/images/fixed',
     }
 
+    # アップロード画像の保存先（local: 上記フォルダ / s3: S3 互換ストレージ。boto3 の追加インストールが必要・認証情報は AWS_* 環境変数）
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET', '')
+    STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL', '')   # R2 / MinIO などの場合
+    STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION', '')
+    STORAGE_S3_PUBLIC_URL = os.getenv('STORAGE_S3_PUBLIC_URL', '')       # 公開バケット・CDN の URL（未設定時は署名付き URL）
+    STORAGE_S3_SIGNED_URLS = os.getenv('STORAGE_S3_SIGNED_URLS', '0') == '1'
+    STORAGE_SIGNED_URL_TTL = int(os.getenv('STORAGE_SIGNED_URL_TTL', 3600))
+    # 配信時の Cache-Control（内容アドレスの画像 / それ以外）
+    STORAGE_CACHE_MAX_AGE = int(os.getenv('STORAGE_CACHE_MAX_AGE', 365 * 24 * 3600))
+    STORAGE_MUTABLE_MAX_AGE = int(os.getenv('STORAGE_MUTABLE_MAX_AGE', 3600))
+    # 画像フォルダ一覧のキャッシュ秒数（ローカルは mtime で即時に無効化される）
+    STORAGE_LIST_CACHE_TTL = int(os.getenv('STORAGE_LIST_CACHE_TTL', 300))
+    # アップロード受信時の一時ファイル置き場（未設定時は OS の一時ディレクトリ）
+    UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR', '')
+
     # ファイルアップロード最大サイズ
     MAX_CONTENT_LENGTH = int(
         os.getenv('MAX_CONTENT_LENGTH', 5 * 1024 * 1024)
@@ -36,6 +54,11 @@ class Config(object):
     # ファイルフォーマット
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+    # 記事画像の派生画像（保存時の最大幅・srcset 用の縮小幅・出力形式）
+    IMAGE_MAX_WIDTH = int(os.getenv('IMAGE_MAX_WIDTH', 1920))
+    IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')]
+    IMAGE_VARIANT_FORMATS = os.getenv('IMAGE_VARIANT_FORMATS', 'avif,webp').split(',')
+
     # 開発ツール使用時のログインリダイレクト一時停止
     DEBUG_TB_INTERCEPT_REDIRECTS = False
 
@@ -65,8 +88,81 @@ class Config(object):
     RESEND_API_KEY = os.getenv('RESEND_API_KEY', '')
     RESEND_FROM_EMAIL = os.getenv('RESEND_FROM_EMAIL', '')
 
+    # エラー通知メール（送信手段 resend / memory・まとめる秒数・1時間あたりの送信上限）
+    ERROR_MAIL_TRANSPORT = os.getenv('ERROR_MAIL_TRANSPORT', 'resend')
+    ERROR_MAIL_WINDOW = float(os.getenv('ERROR_MAIL_WINDOW', 60))
+    ERROR_MAIL_MAX_PER_HOUR = int(os.getenv('ERROR_MAIL_MAX_PER_HOUR', 6))
+
     # Gemini AI API
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
 
     # サイト公開URL（sitemap.xml / robots.txt 用）
     SITE_URL = os.getenv('SITE_URL', 'https://akaska-flask-percial2.onrender.com')
+    # sitemap.xml の状態（件数・最終更新日時）のキャッシュ秒数（Cache-Control の max-age にも使用）
+    SITEMAP_CACHE_TTL = int(os.getenv('SITEMAP_CACHE_TTL', 300))
+
+    # 未ログインユーザー向け公開ページのレスポンスキャッシュ（サーバー側の保持秒数と、対象ごとの Cache-Control max-age）
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') == '1'
+    HTTP_CACHE_TTL = int(os.getenv('HTTP_CACHE_TTL', 600))
+    HTTP_CACHE_POLICIES = {
+        'public': 60,      # トップページ・記事詳細（英語版含む）
+        'fixed': 600,      # 固定ページ
+        'robots': 86400,   # robots.txt
+    }
+    # キャッシュキーに含めるクエリパラメータ（それ以外は無視）と、プロセス内に保持する本文の件数・合計バイト数
+    HTTP_CACHE_QUERY_PARAMS = ('page', 'cursor', 'q')
+    HTTP_CACHE_MAXSIZE = int(os.getenv('HTTP_CACHE_MAXSIZE', 256))
+    HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # markdown フィルターの変換結果を保持する件数（本文の sha256 単位の LRU）
+    MARKDOWN_CACHE_SIZE = int(os.getenv('MARKDOWN_CACHE_SIZE', 256))
+
+    # テンプレートの {% cache %} ブロック（サイドバーのランキング・フッターナビ）の既定保持秒数
+    FRAGMENT_CACHE_ENABLED = os.getenv('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', 600))
+
+    # キャッシュ（未設定ならプロセス内キャッシュ。Redis URL 指定でワーカー間共有）
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+    CACHE_MAXSIZE = int(os.getenv('CACHE_MAXSIZE', 1024))
+
+    # いいねランキングTOP10 のキャッシュ有効秒数
+    RANKING_CACHE_TTL = int(os.getenv('RANKING_CACHE_TTL', 300))
+
+    # 固定ページナビのキャッシュ有効秒数（更新時は即時に無効化される）
+    NAV_CACHE_TTL = int(os.getenv('NAV_CACHE_TTL', 3600))
+
+    # カテゴリー一致オススメ記事のキャッシュ有効秒数
+    RECOMMEND_CACHE_TTL = int(os.getenv('RECOMMEND_CACHE_TTL', 600))
+
+    # 閲覧数バッファを DB に反映する間隔（秒）。0 でバックグラウンド反映を無効化
+    VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 10))
+
+    # app_logs への書き込み（キュー上限件数・まとめる件数・まとめる最大秒数。間隔 0 で同期書き込み）
+    LOG_DB_QUEUE_SIZE = int(os.getenv('LOG_DB_QUEUE_SIZE', 10000))
+    LOG_DB_BATCH_SIZE = int(os.getenv('LOG_DB_BATCH_SIZE', 100))
+    LOG_DB_FLUSH_INTERVAL = float(os.getenv('LOG_DB_FLUSH_INTERVAL', 0.5))
+
+    # app_logs の生ログを残す日数（flask rollup-logs で古い分を集計テーブルへ畳み込んで削除）
+    LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', 30))
+
+    # 記事検索バックエンド（auto: SQLite は FTS5、PostgreSQL は tsvector / fts5 / postgres / like）
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+
+    # flask translate-memos の同時実行数と秒間リクエスト数の上限
+    AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', 4))
+    AI_BATCH_RATE = float(os.getenv('AI_BATCH_RATE', 2))
+
+    # Gemini API 結果キャッシュ（有効秒数・最大件数。AI_CACHE_ENABLED=0 で無効化）
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', '1') == '1'
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 30 * 24 * 3600))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+
+    # Gemini API 呼び出しのタイムアウト秒数（既定値。処理ごとに個別指定あり）と同時接続数
+    AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', 60))
+    AI_MAX_CONNECTIONS = int(os.getenv('AI_MAX_CONNECTIONS', 10))
+
+    # 管理画面 AI 処理のバックグラウンドジョブ（thread: プロセス内スレッド / worker: flask run-jobs / eager: 即時実行）
+    JOB_QUEUE_MODE = os.getenv('JOB_QUEUE_MODE', 'thread')
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+    # この秒数以上 running のままのジョブは、ワーカー起動時に停止で取り残されたものとして待機に戻す
+    JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 600))
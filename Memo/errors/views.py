@@ -1,20 +1,10 @@
 from flask import render_template, request, current_app
 from werkzeug.exceptions import NotFound
-from models import db, Memo, Favorite
-from sqlalchemy import func
+from utils.ranking import get_top10
 
 def show_404_page(error):
     # ---- ランキング用 ----
-    raw_top10 = db.session.query(
-        Memo,
-        func.count(Favorite.id).label("like_count")
-    ).outerjoin(Favorite).group_by(Memo.id)\
-    .order_by(func.count(Favorite.id).desc()).limit(10).all()
-
-    top10 = [
-        {"memo": memo, "like_count": like_count}
-        for memo, like_count in raw_top10
-    ]
+    top10 = get_top10()
 
     msg = error.description if hasattr(error, "description") else "ページが見つかりません"
     current_app.logger.warning('404 Not Found: %s %s', request.method, request.path)
@@ -1,17 +1,25 @@
 from flask import Blueprint, request, redirect, url_for, flash, jsonify
 from models import db, Memo, Favorite
 from flask_login import login_required, current_user
+from utils.like_count import adjust_like_count
+from utils.ranking import invalidate_ranking
 
 # 第一引数がurl_for、第三引数がrender_templateで使用する接頭辞
 favorite_bp = Blueprint('favorite', __name__, url_prefix='/favorite')
 
+def _current_like_count(memo_id):
+    return db.session.query(Memo.like_count).filter_by(id=memo_id).scalar() or 0
+
 @favorite_bp.route("/add/<int:memo_id>", methods=["POST"])
 @login_required
 def add(memo_id):
     fav = Favorite(user_id=current_user.id, memo_id=memo_id)
     db.session.add(fav)
+    # favorites 追加と like_count 加算を同一トランザクションで確定
+    adjust_like_count(memo_id, 1)
     db.session.commit()
-    like_count = Favorite.query.filter_by(memo_id=memo_id).count()
+    invalidate_ranking()
+    like_count = _current_like_count(memo_id)
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return jsonify(liked=True, like_count=like_count)
     return redirect(url_for("public.public_index"))
@@ -25,8 +33,10 @@ def remove_favorite(memo_id):
     ).first()
     if favorite:
         db.session.delete(favorite)
+        adjust_like_count(memo_id, -1)
         db.session.commit()
-    like_count = Favorite.query.filter_by(memo_id=memo_id).count()
+        invalidate_ranking()
+    like_count = _current_like_count(memo_id)
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return jsonify(liked=False, like_count=like_count)
-    return redirect(url_for("public.public_index"))
\ No newline at end of file
+    return redirect(url_for("public.public_index"))
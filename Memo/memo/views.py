@@ -1,14 +1,17 @@
-import os
 import math
-import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
 from models import db, Memo, Favorite, Category
 from flask_login import login_required, current_user
 from forms import MemoForm
-from sqlalchemy import func, asc, desc, or_
+from sqlalchemy import func
 from markupsafe import Markup, escape
-from werkzeug.utils import secure_filename
-from utils.upload import save_upload
+from utils.image_variants import save_memo_image, request_variants
+from utils.upload import release_upload
+from utils.ranking import invalidate_ranking
+from utils.recommend import invalidate_recommendations
+from utils.sitemap import invalidate_sitemap
+from utils.search import search_subquery, index_memo, remove_memo
+from utils.pagination import keyset_paginate
 
 # 第一引数がurl_for、第三引数がrender_templateで使用する接頭辞
 memo_bp = Blueprint('memo', __name__, url_prefix='/memo')
@@ -30,34 +33,51 @@ def index():
     category_id = request.args.get('category_id', type=int)
     params = request.args.to_dict()
     # ---- 「base_query」条件の上積み ----
-    base_query = (db.session.query(Memo, func.count(Favorite.id).label("like_count")).outerjoin(Favorite, Memo.id == Favorite.memo_id).filter(Memo.user_id == current_user.id))
-    # ---- 検索条件 ----
+    base_query = Memo.query.filter(Memo.user_id == current_user.id)
+    # ---- 検索条件（全文検索インデックス）----
+    search = None
     if q:
-        like_expr = f"%{q}%"
-        base_query = base_query.filter(or_(Memo.title.ilike(like_expr),Memo.content.ilike(like_expr)))
+        search = search_subquery(q)
+        base_query = base_query.join(search, search.c.memo_id == Memo.id)
     # ---- カテゴリー条件 ----
     if category_id:
         base_query = (base_query.join(Memo.categories).filter(Category.id == category_id))
-    # ---- 総件数（フィルター適用後）----
-    total = base_query.group_by(Memo.id).count()
-    pages = math.ceil(total / per_page) if total else 1
-    offset = (page - 1) * per_page
-    is_paginate = total > per_page
 
-    order = request.args.get('order', 'desc')   # 日付用
+    order = request.args.get('order')           # 日付用
     likes = request.args.get('likes', None)     # いいね用（優先）
+    cursor = request.args.get('cursor')
     # ---- いいね順の決定 ----
-    if likes == 'asc':
-        order_by_clause = asc(func.count(Favorite.id))
-    elif likes == 'desc':
-        order_by_clause = desc(func.count(Favorite.id))
+    if likes in ('asc', 'desc'):
+        sort_key = (Memo.like_count, likes)
+    elif search is not None and not order:
+        # ---- 検索時に並び順の指定がなければ関連度順 ----
+        sort_key = (search.c.rank, 'asc')
     else:
         # ---- いいね順がない場合は日付順 ----
-        order_by_clause = asc(Memo.created_at) if order == 'asc' else desc(Memo.created_at)
-    #  ---- 表示用データ取得（フィルター適用済み base_query を使用）----
-    raw_memos = (base_query.group_by(Memo.id).order_by(order_by_clause).limit(per_page).offset(offset).all())
+        sort_key = (Memo.created_at, 'asc' if order == 'asc' else 'desc')
+    keys = [sort_key, (Memo.id, 'desc')]
+    #  ---- 表示用データ取得 ----
+    if cursor:
+        # カーソル指定時はキーセットページング（総件数・ページ番号は出さない）
+        result = keyset_paginate(base_query, keys, cursor, per_page)
+        total = None
+    else:
+        # 総件数はウィンドウ関数で同じクエリから取得
+        result = keyset_paginate(
+            base_query.add_columns(func.count().over().label('total')),
+            keys, None, per_page, offset=(page - 1) * per_page,
+        )
+        if result.rows:
+            total = result.rows[0].total
+        else:
+            # 範囲外のページ指定時のみ件数を別途取得
+            total = base_query.count() if page > 1 else 0
+    raw_memos = result.items
+    next_cursor = result.next_cursor
+    pages = math.ceil(total / per_page) if total else 1
+    is_paginate = total is not None and total > per_page
     memos = []
-    for memo, like_count in raw_memos:
+    for memo in raw_memos:
         memo.weekday_ja = WEEKDAYS_JA[memo.created_at.weekday()]
         # ---- 検索ワードのマーキング処理 ----
         if q:
@@ -88,7 +108,7 @@ def index():
 
         memos.append({
             "memo": memo,
-            "like_count": like_count
+            "like_count": memo.like_count
         })
     top5 = (Favorite.query.filter_by(user_id=current_user.id).filter(Favorite.rank != None).order_by(Favorite.rank.asc()).limit(5).all())
     return render_template(
@@ -101,7 +121,9 @@ def index():
         params=params,
         page=page,
         pages=pages,
-        total=total
+        total=total,
+        cursor=cursor,
+        next_cursor=next_cursor
     )
 
 @memo_bp.route('/create', methods=['GET', 'POST'])
@@ -124,14 +146,8 @@ def create():
         image_file = form.image.data
         filename = "nofile.jpg"
         if image_file and allowed_file(image_file.filename):
-            original = secure_filename(image_file.filename)
-            # 重複禁止
-            ext = original.rsplit(".", 1)[1].lower()
-            filename = f"{uuid.uuid4().hex}.{ext}"
-            upload_folder = current_app.config["UPLOAD_FOLDERS"]["memo"]
-            # 目的に応じたフォルダーパスに振り分け
-            save_path = os.path.join(upload_folder, filename)
-            image_file.save(save_path)
+            # EXIF を除いて保存（縮小版の WebP / AVIF はコミット後にジョブで生成）
+            filename = save_memo_image(image_file) or filename
         memo = Memo(
             title=form.title.data,
             content=form.content.data,
@@ -145,7 +161,12 @@ def create():
             abort(400)
         memo.categories = Category.query.filter(Category.id.in_(selected_ids)).all()
         db.session.add(memo)
+        db.session.flush()  # memo.id を確定させてから検索インデックスに登録
+        index_memo(memo)
         db.session.commit()
+        invalidate_ranking()
+        invalidate_sitemap()
+        request_variants(memo)
         flash('登録しました', 'secondary')
         return redirect(url_for('memo.index'))
     init_body = form.content.data or ''
@@ -164,15 +185,26 @@ def update(memo_id):
         memo.summary = request.form.get('summary') or None
         image_file = form.image.data
         # ファイル更新
+        image_replaced = False
         if image_file and allowed_file(image_file.filename):
-            filename = save_upload(image_file, 'memo')
-            memo.image_filename = filename
+            filename = save_memo_image(image_file)
+            if filename:
+                # 旧画像の参照を外す（同じ画像を上げ直した場合は増えた参照が戻るだけ）
+                release_upload('memo', memo.image_filename)
+                image_replaced = filename != memo.image_filename
+            if image_replaced:
+                memo.image_filename = filename
+                memo.image_variants = None
         # カテゴリー更新（重複排除）
         selected_ids = list(dict.fromkeys(request.form.getlist("categories")))
         if len(selected_ids) > 3:
             abort(400)
         memo.categories = Category.query.filter(Category.id.in_(selected_ids)).all()
+        index_memo(memo)
         db.session.commit()
+        invalidate_ranking()
+        if image_replaced:
+            request_variants(memo)
         flash('変更しました', 'secondary')
         return redirect(url_for('memo.index'))
     return render_template(
@@ -187,7 +219,12 @@ def update(memo_id):
 @login_required
 def delete(memo_id):
     memo = Memo.query.filter_by(id=memo_id, user_id=current_user.id).first_or_404()
+    remove_memo(memo.id)
+    release_upload('memo', memo.image_filename)
     db.session.delete(memo)
     db.session.commit()
+    invalidate_ranking()
+    invalidate_recommendations()
+    invalidate_sitemap()
     flash('削除しました')
     return redirect(url_for('memo.index'))
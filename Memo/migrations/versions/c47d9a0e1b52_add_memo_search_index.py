@@ -0,0 +1,49 @@
+"""add memo full-text search index
+
+Revision ID: c47d9a0e1b52
+Revises: b3c81e2f4a10
+Create Date: 2026-03-09 21:40:13.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d9a0e1b52'
+down_revision = 'b3c81e2f4a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from utils.search import tokenize
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.create_table('memo_search',
+        sa.Column('memo_id', sa.Integer(), nullable=False),
+        sa.Column('tokens', postgresql.TSVECTOR(), nullable=False),
+        sa.ForeignKeyConstraint(['memo_id'], ['memos.id'], name='fk_memo_search_memos', ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('memo_id')
+        )
+        op.create_index('ix_memo_search_tokens', 'memo_search', ['tokens'], unique=False, postgresql_using='gin')
+        insert = sa.text("INSERT INTO memo_search (memo_id, tokens) VALUES (:memo_id, to_tsvector('simple', :tokens))")
+    else:
+        op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS memo_fts USING fts5(memo_id UNINDEXED, tokens)')
+        op.execute('DELETE FROM memo_fts')
+        insert = sa.text('INSERT INTO memo_fts (memo_id, tokens) VALUES (:memo_id, :tokens)')
+
+    # 既存記事をインデックスに登録
+    for memo_id, title, content in bind.execute(sa.text('SELECT id, title, content FROM memos')).all():
+        bind.execute(insert, {'memo_id': memo_id, 'tokens': ' '.join(tokenize(f'{title}\n{content}'))})
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_memo_search_tokens', table_name='memo_search', postgresql_using='gin')
+        op.drop_table('memo_search')
+    else:
+        op.execute('DROP TABLE IF EXISTS memo_fts')
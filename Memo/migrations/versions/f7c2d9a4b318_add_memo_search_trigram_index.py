@@ -0,0 +1,54 @@
+"""add trigram index for memo search
+
+Revision ID: f7c2d9a4b318
+Revises: e5a9c3d1f826
+Create Date: 2026-03-27 10:12:45.301927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d9a4b318'
+down_revision = 'e5a9c3d1f826'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from utils.search import normalize
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.add_column('memo_search', sa.Column('body', sa.Text(), nullable=False, server_default=''))
+        update = sa.text('UPDATE memo_search SET body = :body WHERE memo_id = :memo_id')
+    else:
+        # 以前の版が検索時に作成していた語彙テーブルは不要になった
+        op.execute('DROP TABLE IF EXISTS memo_fts_vocab')
+        op.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS memo_fts_trigram '
+            "USING fts5(memo_id UNINDEXED, body, tokenize='trigram')"
+        )
+        op.execute('DELETE FROM memo_fts_trigram')
+        update = sa.text('INSERT INTO memo_fts_trigram (memo_id, body) VALUES (:memo_id, :body)')
+
+    # 既存記事の本文を登録
+    for memo_id, title, content in bind.execute(sa.text('SELECT id, title, content FROM memos')).all():
+        bind.execute(update, {'memo_id': memo_id, 'body': normalize(f'{title}\n{content}')})
+
+    if bind.dialect.name == 'postgresql':
+        op.create_index(
+            'ix_memo_search_body_trgm', 'memo_search', ['body'], unique=False,
+            postgresql_using='gin', postgresql_ops={'body': 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_memo_search_body_trgm', table_name='memo_search', postgresql_using='gin')
+        op.drop_column('memo_search', 'body')
+    else:
+        op.execute('DROP TABLE IF EXISTS memo_fts_trigram')
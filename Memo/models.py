@@ -1,9 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime, timezone
 import pytz
+from utils.markdown_render import convert_markdown
 
 db = SQLAlchemy()
 
@@ -22,11 +23,56 @@ class Memo(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_memos_users'), nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     image_filename = db.Column(db.String(255), nullable=False, default="nofile.jpg")
+    image_variants = db.Column(db.JSON, nullable=True)  # 縮小版 WebP / AVIF（utils.image_variants が生成）
     view_count = db.Column(db.Integer, nullable=False, default=0)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)  # favorites 件数の非正規化カラム
     ai_score = db.Column(db.JSON, nullable=True)
+    # ---- ai_score から導出する並び替え用カラム（ai_score 代入時に自動更新）----
+    quality_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')       # information + writing + readability
+    is_translated = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # translated_title の有無
+    translate_score = db.Column(db.Integer, nullable=True, index=True)                          # 翻訳適性スコア（未解析は NULL）
+    # ---- 事前描画した本文 HTML（content / ai_score 代入時に自動更新）----
+    content_html = db.Column(db.Text, nullable=True)
+    translated_body_html = db.Column(db.Text, nullable=True)
     user = relationship('User', back_populates='memos')
     favorites = relationship('Favorite', back_populates='memo', cascade="all, delete-orphan")
     categories = relationship("Category", secondary=memo_categories, back_populates="memos")
+    __table_args__ = (
+        # トップページの並び順（翻訳済み優先→総合スコア高順→新着順）用の複合インデックス
+        db.Index('ix_memos_quality_order', 'is_translated', 'quality_total', 'created_at', 'id'),
+    )
+
+    @validates('ai_score')
+    def _sync_quality_columns(self, key, value):
+        """ai_score の書き込みに合わせて導出カラム・英語本文の HTML を更新する。"""
+        for name, column_value in quality_columns(value).items():
+            setattr(self, name, column_value)
+        translated_body = (value or {}).get('translated_body')
+        self.translated_body_html = convert_markdown(translated_body) if translated_body else None
+        return value
+
+    @validates('content')
+    def _render_content(self, key, value):
+        """本文の書き込みに合わせて HTML を事前描画する。"""
+        self.content_html = convert_markdown(value)
+        return value
+
+
+def _score_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def quality_columns(ai_score) -> dict:
+    """ai_score（JSON）から quality_total / is_translated / translate_score の値を求める。"""
+    ai_score = ai_score or {}
+    return {
+        'quality_total': sum(_score_int(ai_score.get(k)) or 0 for k in ('information', 'writing', 'readability')),
+        'is_translated': ai_score.get('translated_title') is not None,
+        'translate_score': _score_int(ai_score.get('translate_score')),
+    }
 
 class Category(db.Model):
     __tablename__ = "categories"
@@ -80,6 +126,68 @@ class AppLog(db.Model):
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
 
+    __table_args__ = (
+        # ログ可視化：期間で絞り込みつつレベル別に集計する
+        db.Index('ix_app_logs_created_at_level', 'created_at', 'level'),
+    )
+
+
+class AppLogRollup(db.Model):
+    """保持期間を過ぎた app_logs の集計（1時間・レベル・モジュールごとの件数）"""
+    __tablename__ = 'app_log_rollups'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    hour = db.Column(db.DateTime(timezone=True), nullable=False, index=True)  # 集計単位の開始時刻（UTC・正時）
+    level = db.Column(db.String(10), nullable=False)
+    module = db.Column(db.String(100), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('hour', 'level', 'module', name='uq_app_log_rollups_hour_level_module'),)
+
+
+class AiResultCache(db.Model):
+    """Gemini API 呼び出し結果のキャッシュ（入力が同じなら再利用）"""
+    __tablename__ = 'ai_result_cache'
+    key = db.Column(db.String(64), primary_key=True)                     # sha256(関数名・モデル・プロンプト版・入力)
+    function = db.Column(db.String(50), nullable=False, index=True)
+    value = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+
+class BackgroundJob(db.Model):
+    """バックグラウンドジョブ（管理画面の AI 処理などをリクエスト外で実行）"""
+    __tablename__ = 'background_jobs'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(30), nullable=False)                       # 処理の種類（utils/job_queue.py のハンドラ名）
+    status = db.Column(db.String(10), nullable=False, default='queued')   # queued / running / done / error
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_background_jobs_users', ondelete='SET NULL'), nullable=True)
+    payload = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    cost = db.Column(db.Integer, nullable=False, default=0)               # 投入時に確保した AI ポイント（失敗時は返却）
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    user = relationship('User')
+    __table_args__ = (db.Index('ix_background_jobs_status_id', 'status', 'id'),)
+
+
+class StoredFile(db.Model):
+    """アップロード済みファイル（内容の sha256 で重複排除し、参照数が 0 になったら削除）"""
+    __tablename__ = 'stored_files'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    category = db.Column(db.String(20), nullable=False)                   # UPLOAD_FOLDERS のキー（memo / user）
+    filename = db.Column(db.String(255), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)                     # アップロードされた内容の sha256
+    content_type = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.UniqueConstraint('category', 'digest', name='uq_stored_files_category_digest'),
+        db.UniqueConstraint('category', 'filename', name='uq_stored_files_category_filename'),
+    )
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -1,9 +1,14 @@
 from flask import Blueprint, render_template, request
 from models import db, Memo, Favorite
 from flask_login import current_user
-from sqlalchemy import func, case, cast, Integer
 from datetime import date
-import markdown
+from utils.ranking import get_top10
+from utils.recommend import get_recommendations
+from utils.view_counter import count_view
+from utils.http_cache import on_cache_hit
+from utils.pagination import keyset_paginate, approximate_count
+from utils.markdown_render import render_markdown
+import math
 import random
 
 public_bp = Blueprint('public', __name__)
@@ -11,151 +16,111 @@ PER_PAGE = 6
 
 @public_bp.app_template_filter("markdown")
 def markdown_to_html(text):
-    return markdown.markdown(
-        text,
-        extensions=["fenced_code", "tables"]
-    )
+    return render_markdown(text)
+
+def _quality_keys():
+    """翻訳済み優先→総合スコア高順→新着順（同順位は ID 降順）のキーセット用ソートキーを返す"""
+    # ai_score から導出済みのカラムを使い、複合インデックス ix_memos_quality_order で並べる
+    return [(Memo.is_translated, 'desc'), (Memo.quality_total, 'desc'), (Memo.created_at, 'desc'), (Memo.id, 'desc')]
+
 
 def _quality_order_by():
     """翻訳済み優先→総合スコア高順→新着順 のソートキーを返す"""
-    # PostgreSQL JSON の ->> 演算子（テキスト取得）を op() で明示指定
-    is_translated = case(
-        (Memo.ai_score.op('->>')('translated_title').isnot(None), 1),
-        else_=0
-    )
-    total_score = (
-        func.coalesce(cast(Memo.ai_score.op('->>')('information'), Integer), 0) +
-        func.coalesce(cast(Memo.ai_score.op('->>')('writing'), Integer), 0) +
-        func.coalesce(cast(Memo.ai_score.op('->>')('readability'), Integer), 0)
+    return [expr.desc() for expr, _ in _quality_keys()]
+
+
+def _memo_listing():
+    """
+    トップページの記事一覧を取得する。
+
+    ?page=N 指定時は従来の OFFSET ページング、それ以外は ?cursor= によるキーセットページング。
+    """
+    page = request.args.get('page', type=int)
+    cursor = request.args.get('cursor')
+    total = approximate_count(Memo)
+    total_pages = max(math.ceil(total / PER_PAGE), 1)
+    if page and page > 1:
+        raw_memos = (
+            Memo.query.order_by(*_quality_order_by())
+            .offset((page - 1) * PER_PAGE).limit(PER_PAGE).all()
+        )
+        next_cursor = None
+    else:
+        result = keyset_paginate(Memo.query, _quality_keys(), cursor, PER_PAGE)
+        raw_memos = result.items
+        next_cursor = result.next_cursor
+        page = 1
+    return dict(
+        memos=[{"memo": memo, "like_count": memo.like_count} for memo in raw_memos],
+        page=page,
+        total=total,
+        total_pages=total_pages,
+        cursor=cursor,
+        next_cursor=next_cursor,
     )
-    return [is_translated.desc(), total_score.desc(), Memo.created_at.desc()]
 
 
-@public_bp.route('/')
-def public_index():
-    page = request.args.get('page', 1, type=int)
-    # ---- 一覧ページング（翻訳済み優先→スコア高順→新着順）----
-    pagination = db.session.query(Memo, func.count(Favorite.id).label('like_count')).outerjoin(Favorite, Memo.id == Favorite.memo_id).group_by(Memo.id).order_by(*_quality_order_by()).paginate(page=page, per_page=PER_PAGE)
-    raw_memos = pagination.items
-    total_pages = pagination.pages
+def _favorite_memo_ids():
+    if not current_user.is_authenticated:
+        return []
+    return [f.memo_id for f in Favorite.query.filter_by(user_id=current_user.id)]
+
+
+def _render_index():
+    listing = _memo_listing()
+    favorite_memo_ids = _favorite_memo_ids()
+    # ---- htmx の「もっと見る」からの要求にはカード部分のみ返す ----
+    if request.headers.get('HX-Request') and listing['cursor']:
+        return render_template('public/_memo_cards.j2', favorite_memo_ids=favorite_memo_ids, **listing)
     today_seed = date.today().isoformat()
     random.seed(today_seed)
-    memos = [{"memo": memo, "like_count": like_count} for memo, like_count in raw_memos]
-    # ---- ログインユーザーのいいね済みID ----
-    favorite_memo_ids = []
-    if current_user.is_authenticated:
-        favorite_memo_ids = [
-            f.memo_id for f in Favorite.query.filter_by(user_id=current_user.id)
-        ]
+    memos = listing['memos']
     # ---- ランキング用 ----
-    raw_top10 = db.session.query(
-        Memo,
-        func.count(Favorite.id).label("like_count")
-    ).outerjoin(Favorite).group_by(Memo.id).order_by(func.count(Favorite.id).desc()).limit(10).all()
-    top10 = [
-        {"memo": memo, "like_count": like_count}
-        for memo, like_count in raw_top10
-    ]
-    rand1 = None
-    if memos:
-        rand1 = random.choice(memos)
+    top10 = get_top10()
+    rand1 = random.choice(memos) if memos else None
     # ---- カテゴリ一致オススメ ----
-    recommended = []
-    if current_user.is_authenticated:
-        # 自身の投稿取得
-        my_memos = Memo.query.filter_by(user_id=current_user.id).all()
-        if my_memos:
-            # 自身のカテゴリーID集合
-            my_category_ids = {
-                category.id
-                for memo in my_memos
-                for category in memo.categories
-            }
-            if my_category_ids:
-                # 他者投稿取得
-                other_memos = Memo.query.filter(Memo.user_id != current_user.id).all()
-                scored = []
-                for memo in other_memos:
-                    memo_category_ids = {c.id for c in memo.categories}
-                    match_count = len(my_category_ids & memo_category_ids)
-                    if match_count > 0:
-                        scored.append((memo, match_count))
-                # 一致数降順
-                scored.sort(key=lambda x: x[1], reverse=True)
-                recommended = [m for m, _ in scored[:3]]
-    return render_template('public/index.j2', 
-        memos=memos,
-        page=page,
-        total_pages=total_pages, 
-        favorite_memo_ids=favorite_memo_ids, 
+    recommended = get_recommendations(current_user.id) if current_user.is_authenticated else []
+    return render_template('public/index.j2',
+        favorite_memo_ids=favorite_memo_ids,
         top10=top10,
         rand1=rand1,
-        recommended=recommended
+        recommended=recommended,
+        **listing
     )
 
+
+@public_bp.route('/')
+def public_index():
+    return _render_index()
+
 @public_bp.route('/en/')
 def public_index_en():
     """英語版トップページ（is_english=True はcontext_processorで自動付与）"""
-    page = request.args.get('page', 1, type=int)
-    pagination = db.session.query(Memo, func.count(Favorite.id).label('like_count')).outerjoin(Favorite, Memo.id == Favorite.memo_id).group_by(Memo.id).order_by(*_quality_order_by()).paginate(page=page, per_page=PER_PAGE)
-    raw_memos = pagination.items
-    total_pages = pagination.pages
-    today_seed = date.today().isoformat()
-    random.seed(today_seed)
-    memos = [{"memo": memo, "like_count": like_count} for memo, like_count in raw_memos]
-    favorite_memo_ids = []
-    if current_user.is_authenticated:
-        favorite_memo_ids = [f.memo_id for f in Favorite.query.filter_by(user_id=current_user.id)]
-    raw_top10 = db.session.query(Memo, func.count(Favorite.id).label("like_count")).outerjoin(Favorite).group_by(Memo.id).order_by(func.count(Favorite.id).desc()).limit(10).all()
-    top10 = [{"memo": memo, "like_count": like_count} for memo, like_count in raw_top10]
-    rand1 = random.choice(memos) if memos else None
-    recommended = []
-    if current_user.is_authenticated:
-        my_memos = Memo.query.filter_by(user_id=current_user.id).all()
-        if my_memos:
-            my_category_ids = {category.id for memo in my_memos for category in memo.categories}
-            if my_category_ids:
-                other_memos = Memo.query.filter(Memo.user_id != current_user.id).all()
-                scored = []
-                for memo in other_memos:
-                    match_count = len(my_category_ids & {c.id for c in memo.categories})
-                    if match_count > 0:
-                        scored.append((memo, match_count))
-                scored.sort(key=lambda x: x[1], reverse=True)
-                recommended = [m for m, _ in scored[:3]]
-    return render_template('public/index.j2',
-        memos=memos, page=page, total_pages=total_pages,
-        favorite_memo_ids=favorite_memo_ids, top10=top10,
-        rand1=rand1, recommended=recommended
-    )
+    return _render_index()
+
+
+@on_cache_hit('public.detail', 'public.detail_en')
+def _count_cached_view(view_args):
+    """キャッシュ済みの記事詳細を返したときも閲覧数を数える。"""
+    count_view(view_args['memo_id'])
 
 
 @public_bp.route('/en/detail/<int:memo_id>')
 def detail_en(memo_id):
     """英語版記事詳細ページ"""
     memo = Memo.query.get_or_404(memo_id)
-    memo.view_count = (memo.view_count or 0) + 1
-    db.session.commit()
-    like_count = Favorite.query.filter_by(memo_id=memo_id).count()
-    raw_top10 = db.session.query(Memo, func.count(Favorite.id).label("like_count")).outerjoin(Favorite).group_by(Memo.id).order_by(func.count(Favorite.id).desc()).limit(10).all()
-    top10 = [{"memo": memo, "like_count": like_count} for memo, like_count in raw_top10]
+    count_view(memo.id)
+    like_count = memo.like_count
+    top10 = get_top10()
     return render_template('public/detail.j2', memo=memo, top10=top10, like_count=like_count)
 
 
 @public_bp.route('/detail/<int:memo_id>')
 def detail(memo_id):
     memo = Memo.query.get_or_404(memo_id)
-    memo.view_count = (memo.view_count or 0) + 1
-    db.session.commit()
-    like_count = Favorite.query.filter_by(memo_id=memo_id).count()
-    raw_top10 = db.session.query(
-        Memo,
-        func.count(Favorite.id).label("like_count")
-    ).outerjoin(Favorite).group_by(Memo.id).order_by(func.count(Favorite.id).desc()).limit(10).all()
-    top10 = [
-        {"memo": memo, "like_count": like_count}
-        for memo, like_count in raw_top10
-    ]
+    count_view(memo.id)
+    like_count = memo.like_count
+    top10 = get_top10()
     return render_template(
         'public/detail.j2',
         memo=memo,
@@ -8,6 +8,8 @@ from sqlalchemy import text
 from models import User, Memo, Favorite, Category, FixedPage
 from factories.user_factory import UserFactory
 from factories.body_factory import BodyFactory
+from utils.like_count import reconcile_like_counts
+from utils.search import rebuild_search_index
 import pytz
 
 app.app_context().push()
@@ -253,6 +255,11 @@ def seed_data():
 
         db.session.commit()
 
+        # 投入した favorites から like_count を集計
+        reconcile_like_counts()
+        # 全文検索インデックスを作成
+        rebuild_search_index()
+
         print("ダミーデータ投入完了！")
 
 
@@ -314,6 +314,30 @@ function updateAdminPoints(remaining) {
     }
 }
 
+/* =========================
+    管理画面 AI 処理（バックグラウンドジョブ）
+    202 + job_id が返ったら完了までポーリングし、最終結果を通常の Response として返す
+========================== */
+async function adminJobFetch(url, options, interval = 1500) {
+    const res = await fetch(url, options);
+    if (res.status !== 202) return res;
+
+    let json = await res.json().catch(() => ({}));
+    let status = 202;
+    while (json.poll_url && (json.status === "queued" || json.status === "running")) {
+        await new Promise((resolve) => setTimeout(resolve, interval));
+        const poll = await fetch(json.poll_url, {
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+        });
+        status = poll.status;
+        json = await poll.json().catch(() => ({}));
+    }
+    return new Response(JSON.stringify(json), {
+        status,
+        headers: { "Content-Type": "application/json" },
+    });
+}
+
 /* =========================
     グローバルクリック一元管理
 ========================== */
@@ -415,7 +439,7 @@ document.addEventListener("DOMContentLoaded", () => {
         errorEl?.classList.add("d-none");
 
         try {
-            const res = await fetch("/admin/category/ai_suggest", {
+            const res = await adminJobFetch("/admin/category/ai_suggest", {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
@@ -470,7 +494,7 @@ document.addEventListener("DOMContentLoaded", () => {
         errorEl?.classList.add("d-none");
 
         try {
-            const res = await fetch("/admin/user_thumb/ai_generate", {
+            const res = await adminJobFetch("/admin/user_thumb/ai_generate", {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
@@ -950,7 +974,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 const csrfToken =
                     document.querySelector('input[name="csrf_token"]')
                         ?.value || "";
-                const res = await fetch("/admin/analyze", {
+                const res = await adminJobFetch("/admin/analyze", {
                     method: "POST",
                     headers: {
                         "X-Requested-With": "XMLHttpRequest",
@@ -1025,8 +1049,8 @@ document.addEventListener("click", (e) => {
     if (!genBtn) return;
 
     // 画像プレビューを更新するヘルパー
-    function setGenImage(filename) {
-        document.getElementById("fixed-gen-img").src = "/static/images/fixed/" + filename;
+    function setGenImage(filename, url) {
+        document.getElementById("fixed-gen-img").src = url;
         document.getElementById("fixed-gen-img-name").textContent = filename;
         document.getElementById("fc-image").value = filename;
     }
@@ -1048,7 +1072,7 @@ document.addEventListener("click", (e) => {
         genBtn.disabled = true;
 
         try {
-            const resp = await fetch("/admin/fixed/generate", {
+            const resp = await adminJobFetch("/admin/fixed/generate", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ title }),
@@ -1074,7 +1098,7 @@ document.addEventListener("click", (e) => {
             document.getElementById("fc-title").value = title;
             document.getElementById("fc-summary").value = data.summary;
             document.getElementById("fc-content").value = data.content;
-            setGenImage(data.image);
+            setGenImage(data.image, data.image_url);
 
             document.getElementById("fixed-gen-preview").classList.remove("d-none");
             updateAdminPoints(data.remaining_points);
@@ -1101,7 +1125,7 @@ document.addEventListener("click", (e) => {
         try {
             const resp = await fetch("/admin/fixed/random-image");
             const data = await resp.json();
-            setGenImage(data.image);
+            setGenImage(data.image, data.image_url);
         } catch (err) {
             console.error("画像取得エラー", err);
         } finally {
@@ -1181,7 +1205,7 @@ document.addEventListener("click", (e) => {
             const csrfToken = document.querySelector('input[name="csrf_token"]')?.value || "";
 
             try {
-                const res = await fetch("/admin/translate/" + memoId, {
+                const res = await adminJobFetch("/admin/translate/" + memoId, {
                     method: "POST",
                     headers: {
                         "X-Requested-With": "XMLHttpRequest",
@@ -1471,29 +1495,6 @@ document.addEventListener("click", (e) => {
         }
     });
 
-    /* =========================
-      ログ可視化 - レベルフィルター
-    ========================== */
-    const logFilterButtons = document.querySelectorAll('[id^="logFilter"]');
-    if (logFilterButtons.length) {
-        logFilterButtons.forEach(btn => {
-            btn.addEventListener('click', () => {
-                // アクティブ切り替え
-                logFilterButtons.forEach(b => b.classList.remove('active'));
-                btn.classList.add('active');
-
-                const level = btn.dataset.level || null; // ALL の場合は null
-                document.querySelectorAll('#logTable .log-row').forEach(row => {
-                    if (!level || row.dataset.level === level) {
-                        row.classList.remove('d-none');
-                    } else {
-                        row.classList.add('d-none');
-                    }
-                });
-            });
-        });
-    }
-
     // サービス構成図モーダル：描画後にコンテナ幅へスケール調整
     const serviceModal = document.getElementById('modal_service');
     if (serviceModal) {
@@ -1,6 +1,11 @@
 import pytest
 from app import create_app
+from datetime import datetime, timedelta, timezone
 from models import db as _db, User, Category
+from utils.cache import get_cache
+from utils.http_cache import get_page_cache
+from utils.view_counter import flush_view_counts
+from utils.search import rebuild_search_index
 
 TEST_CONFIG = {
     'TESTING': True,
@@ -11,6 +16,9 @@ TEST_CONFIG = {
     'STRIPE_SECRET_KEY': '',
     'GOOGLE_CLIENT_ID': 'dummy',
     'GOOGLE_CLIENT_SECRET': 'dummy',
+    'VIEW_COUNT_FLUSH_INTERVAL': 0,
+    'LOG_DB_FLUSH_INTERVAL': 0,
+    'JOB_QUEUE_MODE': 'eager',
 }
 
 
@@ -26,13 +34,17 @@ def app():
 
 @pytest.fixture(autouse=True)
 def db_rollback(app):
-    """各テスト後に DB をロールバックしてデータをリセットする。"""
+    """各テスト後に DB をロールバックしてデータ・キャッシュをリセットする。"""
     with app.app_context():
         yield
         _db.session.rollback()
+        flush_view_counts()
         for table in reversed(_db.metadata.sorted_tables):
             _db.session.execute(table.delete())
         _db.session.commit()
+        rebuild_search_index()
+        get_cache().clear()
+        get_page_cache().clear()
 
 
 @pytest.fixture
@@ -81,6 +93,20 @@ def auth_client(app, client, test_user):
     return client
 
 
+@pytest.fixture
+def admin_client(app, auth_client, test_user):
+    """管理者としてログイン済み（AIポイント10pt・有効期限内）のテストクライアント。"""
+    # リクエストとテスト本体は同じアプリコンテキスト（セッション）を共有するため、その場で更新する
+    user = _db.session.get(User, test_user.id)
+    user.is_admin = True
+    user.admin_points = 10
+    user.subscription_expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    _db.session.commit()
+    with auth_client.session_transaction() as sess:
+        sess['is_admin_authenticated'] = True
+    return auth_client
+
+
 @pytest.fixture
 def test_category(app):
     """テスト用カテゴリーを作成して返す。"""
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from models import db, AppLog
+
+
+def _add_logs(count, level='INFO', module='app:10', minutes_ago=0):
+    now = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    db.session.add_all([
+        AppLog(level=level, module=module, message=f'{level} {i}', created_at=now - timedelta(seconds=i))
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+class TestAdminLogs:
+    def test_summary_and_pagination(self, app, admin_client):
+        """件数は期間内の全件を集計し、行は100件ずつキーセットで続きを読み込む。"""
+        _add_logs(120)
+        _add_logs(3, level='ERROR', module='admin.views:99')
+        _add_logs(5, level='WARNING', minutes_ago=2 * 24 * 60)  # 1日より前
+
+        res = admin_client.get('/admin/logs')
+        html = res.get_data(as_text=True)
+        assert res.status_code == 200
+        assert html.count('class="log-row') == 100
+        assert 'hx-trigger="revealed"' in html
+
+        res = admin_client.get('/admin/logs?days=3')
+        assert '>5</div>' in res.get_data(as_text=True)  # WARNING の件数
+
+        first = admin_client.get('/admin/logs').get_data(as_text=True)
+        cursor = first.split('cursor=')[1].split('&')[0].split('"')[0]
+        more = admin_client.get(f'/admin/logs?cursor={cursor}', headers={'HX-Request': 'true'})
+        rows = more.get_data(as_text=True)
+        assert rows.count('class="log-row') == 23
+        assert 'hx-trigger' not in rows
+        assert '<html' not in rows
+
+    def test_level_and_module_filter(self, app, admin_client):
+        """レベル・モジュール（前方一致）で絞り込める。"""
+        _add_logs(4)
+        _add_logs(2, level='ERROR', module='admin.views:99')
+        _add_logs(1, level='ERROR', module='app:5')
+
+        html = admin_client.get('/admin/logs?level=ERROR').get_data(as_text=True)
+        assert html.count('class="log-row') == 3
+        html = admin_client.get('/admin/logs?module=admin.views').get_data(as_text=True)
+        assert html.count('class="log-row') == 2
+
+
+class TestLogRetention:
+    def test_rollup_deletes_old_rows_in_chunks(self, app, admin_client, tmp_path):
+        """保持期間より古い行は時間別の件数に畳み込んで削除し、ダッシュボードの件数には残る。"""
+        import gzip
+        from models import AppLogRollup
+        from utils.log_retention import rollup_logs
+
+        _add_logs(5, level='ERROR', minutes_ago=10 * 24 * 60)
+        _add_logs(2, level='INFO', minutes_ago=10 * 24 * 60)
+        _add_logs(3, level='INFO')
+
+        archive = tmp_path / 'logs.jsonl.gz'
+        result = rollup_logs(7, chunk_size=3, archive_path=str(archive), log=lambda msg: None)
+        assert result.deleted == 7
+        assert result.archived == 7
+        assert result.reclaimed_bytes > 0
+        assert AppLog.query.count() == 3
+        assert sum(r.count for r in AppLogRollup.query) == 7
+        with gzip.open(archive, 'rt', encoding='utf-8') as f:
+            assert len(f.readlines()) == 7
+        assert rollup_logs(7, log=lambda msg: None).deleted == 0  # 再実行しても二重に数えない
+
+        # 設定の保持日数（既定 30 日）ではなく、実際に畳み込まれた範囲で集計テーブルを使う
+        html = admin_client.get('/admin/logs?days=30').get_data(as_text=True)
+        assert html.count('class="log-row') == 3
+        assert 'ALL <span class="badge bg-secondary ms-1">10</span>' in html
+        assert '件数のみ保存' in html
+        html = admin_client.get('/admin/logs?days=7').get_data(as_text=True)
+        assert 'ALL <span class="badge bg-secondary ms-1">3</span>' in html
@@ -0,0 +1,53 @@
+import json
+import time
+from models import db, Memo
+from utils.ai_batch import TokenBucket, retry_after, run_translate_job
+
+
+class RateLimited(Exception):
+    code = 429
+    details = {'error': {'details': [{'retryDelay': '0s'}]}}
+
+
+class TestTranslateJob:
+    def test_translates_in_batches_and_resumes_from_checkpoint(self, app, test_user, tmp_path):
+        """429 はリトライされ、失敗分はチェックポイントに残り、再実行では続きから処理する。"""
+        with app.app_context():
+            for i in range(5):
+                db.session.add(Memo(title=f'翻訳{i}', content='本文', user_id=test_user.id))
+            db.session.commit()
+            calls = []
+
+            def translate(title, content):
+                calls.append(title)
+                if title == '翻訳1' and calls.count(title) == 1:
+                    raise RateLimited()
+                if title == '翻訳3':
+                    return None
+                return {'translated_title': f'EN {title}', 'translated_body': 'body'}
+
+            checkpoint = tmp_path / 'checkpoint.json'
+            stats = run_translate_job(app, translate, concurrency=2, rate=100, batch_size=2,
+                                      checkpoint_path=str(checkpoint), log=lambda *_: None)
+            assert (stats.ok, stats.ng, stats.rate_limited) == (4, 1, 1)
+            saved = json.loads(checkpoint.read_text())
+            failed_id = Memo.query.filter_by(title='翻訳3').one().id
+            assert saved['failed'] == [failed_id]
+            assert Memo.query.filter_by(is_translated=True).count() == 4
+
+            # 続きからの再実行では対象なし、--retry-failed では失敗分のみ
+            assert run_translate_job(app, translate, checkpoint_path=str(checkpoint)).ok == 0
+            calls.clear()
+            run_translate_job(app, translate, checkpoint_path=str(checkpoint),
+                              retry_failed=True, log=lambda *_: None)
+            assert calls == ['翻訳3']
+
+    def test_retry_after_and_bucket_pause(self):
+        """429 以外は None、Retry-After 相当の秒数だけバケットが止まる。"""
+        assert retry_after(ValueError()) is None
+        assert retry_after(RateLimited()) == 0.0
+        bucket = TokenBucket(rate=1000, capacity=1)
+        bucket.pause(0.05)
+        started = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - started >= 0.04
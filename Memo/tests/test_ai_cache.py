@@ -0,0 +1,65 @@
+from models import AiResultCache
+from utils.ai_cache import ai_cached, purge_ai_cache
+
+
+class TestAiCache:
+    def test_same_input_reuses_result(self, app):
+        """同じ入力では AI 関数を呼ばずに保存済みの結果を返し、None はキャッシュしない。"""
+        calls = []
+
+        @ai_cached('fake_score', 'fake-model', 1)
+        def fake_score(title, content):
+            calls.append(title)
+            return None if title == 'エラー' else {'score': len(content)}
+
+        with app.app_context():
+            assert fake_score('記事', '本文') == {'score': 2}
+            assert fake_score('記事', '本文') == {'score': 2}
+            assert fake_score('記事', '本文を変更') == {'score': 5}
+            assert fake_score('エラー', '本文') is None
+            assert fake_score('エラー', '本文') is None
+            assert calls == ['記事', '記事', 'エラー', 'エラー']
+            assert AiResultCache.query.count() == 2
+
+            assert purge_ai_cache('fake_score') == 2
+            fake_score('記事', '本文')
+            assert calls[-1] == '記事'
+
+    def test_prompt_version_and_max_entries(self, app):
+        """プロンプト版が変わると別キーになり、上限件数を超えた分は古い順に削除される。"""
+        calls = []
+
+        def make(version):
+            @ai_cached('fake_translate', 'fake-model', version)
+            def fake_translate(title):
+                calls.append((version, title))
+                return {'title': title}
+            return fake_translate
+
+        with app.app_context():
+            app.config['AI_CACHE_MAX_ENTRIES'] = 2
+            try:
+                make(1)('a')
+                make(2)('a')
+                assert calls == [(1, 'a'), (2, 'a')]
+                make(2)('b')
+                make(2)('c')
+                assert AiResultCache.query.count() == 2
+            finally:
+                app.config['AI_CACHE_MAX_ENTRIES'] = 5000
+
+    def test_fixed_page_generation_is_not_cached(self, app, monkeypatch):
+        """固定ページ生成は同じ入力でも毎回 AI を呼び、再生成で別の文章を返せる。"""
+        from types import SimpleNamespace
+        import utils.ai_fixed_generate as fixed_module
+
+        replies = iter(['一回目', '二回目'])
+        monkeypatch.setitem(app.config, 'GOOGLE_API_KEY', 'dummy')
+        monkeypatch.setattr(fixed_module, 'generate_content', lambda **kwargs: SimpleNamespace(
+            text=f'{{"key": "about", "content": "{next(replies)}", "summary": "要約"}}'
+        ))
+
+        with app.app_context():
+            assert fixed_module.generate_fixed_page('概要', [])['content'] == '一回目'
+            assert fixed_module.generate_fixed_page('概要', [])['content'] == '二回目'
+            assert AiResultCache.query.count() == 0
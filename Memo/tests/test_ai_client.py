@@ -0,0 +1,34 @@
+import pytest
+from utils import ai_client
+
+
+class TestAiClient:
+    def test_client_is_shared_and_calls_are_measured(self, app, monkeypatch):
+        """クライアントはプロセス内で使い回され、呼び出しごとにタイムアウト指定と集計が行われる。"""
+        original = app.config.get('GOOGLE_API_KEY', '')
+        app.config['GOOGLE_API_KEY'] = 'dummy-key'
+        try:
+            with app.app_context():
+                client = ai_client.get_client()
+                assert ai_client.get_client() is client
+
+                seen = []
+
+                def fake_generate(model, contents, config):
+                    seen.append(config.http_options.timeout)
+                    if contents == 'fail':
+                        raise RuntimeError('boom')
+                    return 'response'
+
+                monkeypatch.setattr(client.models, 'generate_content', fake_generate)
+                before = ai_client.get_metrics().get('test-model', {'calls': 0, 'errors': 0})
+                assert ai_client.generate_content('test-model', 'ok', timeout=5) == 'response'
+                with pytest.raises(RuntimeError):
+                    ai_client.generate_content('test-model', 'fail', timeout=5)
+
+                assert seen == [5000, 5000]
+                metrics = ai_client.get_metrics()['test-model']
+                assert metrics['calls'] - before['calls'] == 2
+                assert metrics['errors'] - before['errors'] == 1
+        finally:
+            app.config['GOOGLE_API_KEY'] = original
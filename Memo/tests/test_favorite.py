@@ -0,0 +1,42 @@
+from models import db, Memo, Favorite
+from utils.like_count import reconcile_like_counts
+
+
+def _create_memo(user_id, title='いいね対象'):
+    memo = Memo(title=title, content='本文', user_id=user_id)
+    db.session.add(memo)
+    db.session.commit()
+    return memo.id
+
+
+class TestLikeCount:
+    def test_add_increments_like_count(self, app, auth_client, other_user):
+        """いいね追加で Memo.like_count が 1 増える。"""
+        with app.app_context():
+            memo_id = _create_memo(other_user.id)
+
+        res = auth_client.post(f'/favorite/add/{memo_id}', headers={'X-Requested-With': 'XMLHttpRequest'})
+        assert res.get_json() == {'liked': True, 'like_count': 1}
+
+        with app.app_context():
+            assert db.session.get(Memo, memo_id).like_count == 1
+
+    def test_remove_decrements_like_count(self, app, auth_client, other_user):
+        """いいね解除で Memo.like_count が 1 減る。"""
+        with app.app_context():
+            memo_id = _create_memo(other_user.id)
+
+        auth_client.post(f'/favorite/add/{memo_id}')
+        res = auth_client.post(f'/favorite/remove/{memo_id}', headers={'X-Requested-With': 'XMLHttpRequest'})
+        assert res.get_json() == {'liked': False, 'like_count': 0}
+
+    def test_reconcile_fixes_drift(self, app, test_user, other_user):
+        """reconcile_like_counts が favorites の実件数に補正する。"""
+        with app.app_context():
+            memo_id = _create_memo(other_user.id)
+            db.session.add(Favorite(user_id=test_user.id, memo_id=memo_id))
+            db.session.get(Memo, memo_id).like_count = 5
+            db.session.commit()
+
+            assert reconcile_like_counts() == 1
+            assert db.session.get(Memo, memo_id).like_count == 1
@@ -0,0 +1,28 @@
+from flask import render_template_string
+from utils.fragment_cache import invalidate_fragments
+
+
+class TestFragmentCache:
+    TEMPLATE = "{% cache 'frag', 60, tags=['ranking'] %}{{ lang }}:{{ calls.append(1) or calls|length }}{% endcache %}"
+
+    def test_cached_per_language_and_invalidated_by_tag(self, app):
+        """同じ言語では描画を省略し、言語ごとに別キーで保存、タグ指定で無効化される。"""
+        calls = []
+        with app.test_request_context():
+            assert render_template_string(self.TEMPLATE, lang='ja', calls=calls) == 'ja:1'
+            assert render_template_string(self.TEMPLATE, lang='ja', calls=calls) == 'ja:1'
+            assert render_template_string(self.TEMPLATE, lang='en', calls=calls, is_english=True) == 'en:2'
+
+            invalidate_fragments('nav')
+            assert render_template_string(self.TEMPLATE, lang='ja', calls=calls) == 'ja:1'
+
+            invalidate_fragments('ranking')
+            assert render_template_string(self.TEMPLATE, lang='ja', calls=calls) == 'ja:3'
+
+    def test_disabled(self, app, monkeypatch):
+        calls = []
+        monkeypatch.setitem(app.config, 'FRAGMENT_CACHE_ENABLED', False)
+        with app.test_request_context():
+            render_template_string(self.TEMPLATE, lang='ja', calls=calls)
+            render_template_string(self.TEMPLATE, lang='ja', calls=calls)
+        assert len(calls) == 2
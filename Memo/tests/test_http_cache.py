@@ -0,0 +1,77 @@
+from models import db, Memo
+from utils.view_counter import flush_view_counts
+
+
+class TestHttpCache:
+    def test_anonymous_pages_are_cached_and_revalidated(self, client, test_user, monkeypatch):
+        """未ログインの公開ページはキャッシュから返し、ETag 一致なら 304。記事の追加で無効化される。"""
+        import public.views as public_views
+
+        calls = []
+        original = public_views.get_top10
+        monkeypatch.setattr(public_views, 'get_top10', lambda: calls.append(1) or original())
+
+        db.session.add(Memo(title='最初の記事', content='本文', user_id=test_user.id))
+        db.session.commit()
+
+        first = client.get('/')
+        assert first.status_code == 200
+        assert first.headers['ETag'].startswith('W/')
+        assert 'public' in first.headers['Cache-Control']
+        assert 'max-age=60' in first.headers['Cache-Control']
+        assert 'Cookie' in first.headers['Vary']
+
+        second = client.get('/')
+        assert second.get_data() == first.get_data()
+        assert len(calls) == 1
+
+        assert client.get('/', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+        db.session.add(Memo(title='新しい記事', content='本文', user_id=test_user.id))
+        db.session.commit()
+        assert '新しい記事' in client.get('/').get_data(as_text=True)
+        assert len(calls) == 2
+
+    def test_logged_in_and_cached_detail(self, auth_client, client, test_user):
+        """ログイン中はキャッシュしない。キャッシュから返した記事詳細も閲覧数を数える。"""
+        memo = Memo(title='記事', content='本文', user_id=test_user.id)
+        db.session.add(memo)
+        db.session.commit()
+
+        res = auth_client.get(f'/detail/{memo.id}')
+        assert 'ETag' not in res.headers
+
+        auth_client.get('/auth/logout')
+        client.get(f'/detail/{memo.id}')
+        client.get(f'/detail/{memo.id}')
+        assert flush_view_counts() == 3
+
+    def test_key_ignores_unknown_query_and_pages_use_own_store(self, app, client, test_user):
+        """描画に使わないクエリ文字列は同じエントリを使い、本文は共有キャッシュに入れない。"""
+        from utils.cache import get_cache
+        from utils.http_cache import get_page_cache
+
+        db.session.add(Memo(title='記事', content='本文', user_id=test_user.id))
+        db.session.commit()
+
+        etag = client.get('/').headers['ETag']
+        assert client.get('/?utm_source=x&x=1').headers['ETag'] == etag
+        assert len(get_page_cache()._data) == 1
+        assert not any(key.startswith('http:page:') for key in get_cache()._data)
+
+        client.get('/?page=2')
+        assert len(get_page_cache()._data) == 2
+
+    def test_page_store_is_bounded_by_bytes(self):
+        """合計サイズが上限を超えたら古い本文から追い出す。"""
+        from utils.cache import MemoryCache
+
+        store = MemoryCache(maxsize=100, maxbytes=10, sizeof=len)
+        store.set('a', b'12345')
+        store.set('b', b'12345')
+        store.set('c', b'123')
+        assert store.get('a') is None
+        assert store.get('b') == b'12345'
+        store.set('huge', b'x' * 11)
+        assert store.get('huge') is None
+        assert store.get('c') == b'123'
@@ -0,0 +1,77 @@
+import io
+import os
+from PIL import Image
+from models import db, Memo
+from utils.image_variants import build_variants, image_sources, variant_formats
+
+
+def _jpeg_with_exif(width=800, height=600) -> io.BytesIO:
+    img = Image.new('RGB', (width, height), (200, 80, 40))
+    exif = Image.Exif()
+    exif[0x0110] = 'TestCamera'  # Model
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', exif=exif)
+    buf.seek(0)
+    return buf
+
+
+class TestImageVariants:
+    def test_upload_strips_exif_and_builds_variants(self, app, auth_client, test_user, tmp_path, monkeypatch):
+        """投稿画像は EXIF を除いて保存され、元画像より小さい幅の縮小版が形式ごとに作られる。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'memo', str(tmp_path))
+
+        res = auth_client.post('/memo/create', data={
+            'title': '画像付き',
+            'content': '本文',
+            'image': (_jpeg_with_exif(), 'photo.jpg'),
+        }, content_type='multipart/form-data')
+        assert res.status_code == 302
+
+        memo = Memo.query.filter_by(title='画像付き').one()
+        db.session.refresh(memo)
+        with Image.open(tmp_path / memo.image_filename) as saved:
+            assert not saved.getexif()
+
+        variants = memo.image_variants
+        assert (variants['width'], variants['height']) == (800, 600)
+        assert set(variants['sources']) == set(variant_formats())
+        for fmt, entries in variants['sources'].items():
+            assert [w for w, _ in entries] == [320, 640, 800]
+            assert all(os.path.exists(tmp_path / name) for _, name in entries)
+
+        with app.test_request_context():
+            sources = dict(image_sources(variants))
+        assert '-320.webp 320w' in sources['image/webp']
+        assert auth_client.get('/').status_code == 200
+
+    def test_gif_keeps_animation(self, app, auth_client, test_user, tmp_path, monkeypatch):
+        """GIF はそのまま保存し、1コマだけの縮小版は作らない。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'memo', str(tmp_path))
+        frames = [Image.new('P', (400, 300), i) for i in range(3)]
+        buf = io.BytesIO()
+        frames[0].save(buf, 'GIF', save_all=True, append_images=frames[1:])
+        buf.seek(0)
+
+        auth_client.post('/memo/create', data={
+            'title': 'アニメーション', 'content': '本文', 'image': (buf, 'anim.gif'),
+        }, content_type='multipart/form-data')
+
+        memo = Memo.query.filter_by(title='アニメーション').one()
+        assert memo.image_filename.endswith('.gif')
+        assert memo.image_variants is None
+        assert build_variants(memo.image_filename) is None
+        assert os.listdir(tmp_path) == [memo.image_filename]
+
+    def test_unreadable_image_is_not_saved(self, app, auth_client, test_user, tmp_path, monkeypatch):
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'memo', str(tmp_path))
+
+        auth_client.post('/memo/create', data={
+            'title': '壊れた画像',
+            'content': '本文',
+            'image': (io.BytesIO(b'not an image'), 'broken.png'),
+        }, content_type='multipart/form-data')
+
+        memo = Memo.query.filter_by(title='壊れた画像').one()
+        assert memo.image_filename == 'nofile.jpg'
+        assert memo.image_variants is None
+        assert os.listdir(tmp_path) == []
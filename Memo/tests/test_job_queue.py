@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+from models import db, BackgroundJob, User
+from utils.job_queue import JobWorker, enqueue, run_pending
+
+
+class TestJobQueue:
+    def test_fixed_generate_runs_as_job_and_consumes_points(self, app, admin_client, test_user, monkeypatch):
+        """AI 処理はジョブとして実行され、成功時のみ依頼者の AI ポイントが消費される。"""
+        import utils.ai_fixed_generate as fixed_module
+
+        monkeypatch.setattr(fixed_module, 'generate_fixed_page', lambda title, keys: {
+            'key': 'about', 'title': title, 'content': '本文',
+        })
+        client = admin_client
+
+        res = client.post('/admin/fixed/generate', json={'title': 'このサイトについて'})
+        assert res.status_code == 200
+        assert res.json['status'] == 'ok'
+        assert res.json['key'] == 'about'
+        assert res.json['remaining_points'] == 8
+
+        job = BackgroundJob.query.one()
+        assert job.kind == 'fixed_generate'
+        assert job.status == 'done'
+        assert client.get(f'/admin/jobs/{job.id}').json['status'] == 'ok'
+
+        monkeypatch.setattr(fixed_module, 'generate_fixed_page', lambda title, keys: None)
+        res = client.post('/admin/fixed/generate', json={'title': '失敗'})
+        assert res.status_code == 500
+        assert res.json['status'] == 'error'
+        db.session.expire_all()
+        assert db.session.get(User, test_user.id).admin_points == 8
+
+    def test_points_are_reserved_at_enqueue_and_refunded_on_failure(self, app, admin_client, test_user, monkeypatch):
+        """積んだ時点でポイントを確保し、残量を超えては積めない。失敗したジョブの分は返す。"""
+        import admin.views as admin_views
+        import utils.ai_fixed_generate as fixed_module
+
+        monkeypatch.setitem(app.config, 'JOB_QUEUE_MODE', 'worker')
+        # 並行リクエストで事前チェックをすり抜けた状態
+        monkeypatch.setattr(admin_views, '_check_ai_points', lambda cost: True)
+        db.session.get(User, test_user.id).admin_points = 3
+        db.session.commit()
+
+        assert admin_client.post('/admin/fixed/generate', json={'title': 'A'}).status_code == 202
+        res = admin_client.post('/admin/fixed/generate', json={'title': 'B'})
+        assert res.status_code == 429
+        assert BackgroundJob.query.count() == 1
+        db.session.expire_all()
+        assert db.session.get(User, test_user.id).admin_points == 1
+
+        monkeypatch.setattr(fixed_module, 'generate_fixed_page', lambda title, keys: None)
+        assert run_pending() == 1
+        db.session.expire_all()
+        assert BackgroundJob.query.one().status == 'error'
+        assert db.session.get(User, test_user.id).admin_points == 3
+
+    def test_job_status_only_for_owner(self, app, admin_client, test_user, other_user):
+        """他人のジョブはポーリングできない。"""
+        client = admin_client
+        job = BackgroundJob(kind='analyze', user_id=other_user.id)
+        db.session.add(job)
+        db.session.commit()
+        assert client.get(f'/admin/jobs/{job.id}').status_code == 404
+
+    def test_worker_mode_queues_until_run(self, app, test_user):
+        """worker モードでは積むだけで、run_pending で実行される。未登録の種別はエラーになる。"""
+        app.config['JOB_QUEUE_MODE'] = 'worker'
+        try:
+            job = enqueue('unknown_kind', {'x': 1}, user_id=test_user.id)
+            assert job.status == 'queued'
+            assert run_pending() == 1
+            db.session.refresh(job)
+            assert job.status == 'error'
+            assert job.result == {'status_code': 500}
+            assert run_pending() == 0
+        finally:
+            app.config['JOB_QUEUE_MODE'] = 'eager'
+
+    def test_thread_worker_recovers_jobs_on_start(self, app, test_user):
+        """thread モードのワーカーは起動時に取り残された running を戻し、待機中のジョブを enqueue なしで実行する。"""
+        stale = BackgroundJob(kind='unknown_kind', user_id=test_user.id, status='running',
+                              started_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        queued = BackgroundJob(kind='unknown_kind', user_id=test_user.id, status='queued')
+        db.session.add_all([stale, queued])
+        db.session.commit()
+
+        worker = JobWorker(app, stale_seconds=600)
+        worker._wake.wait = lambda timeout: worker._stop.set()  # 1巡で終了させる
+        worker._run()
+
+        db.session.expire_all()
+        assert {job.status for job in BackgroundJob.query.all()} == {'error'}
+
+    def test_thread_worker_starts_on_first_request(self, app, client, monkeypatch):
+        """thread モードではリクエスト時にワーカーを起動する（eager / worker モードでは起動しない）。"""
+        worker = app.extensions['job_worker']
+        started = []
+        monkeypatch.setattr(worker, '_ensure_thread', lambda: started.append(True))
+
+        client.get('/')
+        assert started == []
+
+        monkeypatch.setitem(app.config, 'JOB_QUEUE_MODE', 'thread')
+        client.get('/')
+        assert started == [True]
+
+    def test_analyze_scores_in_parallel(self, app, admin_client, test_user, monkeypatch):
+        """未解析の記事はスレッドプールで同時にスコアリングされ、失敗分は保存されない。"""
+        import threading
+        import time
+        from models import Memo
+        import utils.ai_translate_score as score_module
+
+        for i in range(4):
+            db.session.add(Memo(title=f'記事{i}', content='本文', user_id=test_user.id))
+        db.session.commit()
+
+        threads = set()
+
+        def fake_score(title, content, like_count=0, view_count=0):
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return None if title == '記事0' else {'translate_score': 90, 'seo': 30}
+
+        monkeypatch.setattr(score_module, 'score_translate_value', fake_score)
+        client = admin_client
+
+        res = client.post('/admin/analyze')
+        assert res.json['status'] == 'ok'
+        assert len(threads) == 4
+        verdicts = {row['title']: row['ai_score']['translate_score'] for row in res.json['data']}
+        assert verdicts == {'記事0': 0, '記事1': 90, '記事2': 90, '記事3': 90}
+        db.session.expire_all()
+        assert Memo.query.filter_by(title='記事0').one().ai_score is None
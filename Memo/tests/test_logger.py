@@ -2,6 +2,8 @@ import logging
 import os
 import pytest
 from app import create_app
+from models import AppLog
+from utils.logger import DBLogHandler, MemoryTransport, ResendErrorHandler
 
 
 def test_log_file_created_on_startup(tmp_path):
@@ -47,3 +49,68 @@ def test_500_error_returns_500_status(client):
     """存在しないルートへのアクセスで404が返ること（500ハンドラーの確認は手動）。"""
     response = client.get('/nonexistent-url-xyz')
     assert response.status_code == 404
+
+
+def test_db_log_handler_batches_and_flushes_on_close(app):
+    """DBLogHandler はバックグラウンドでまとめて書き込み、close 時に残りを書き込むこと。"""
+    handler = DBLogHandler(app, capacity=100, batch_size=3, flush_interval=0.05)
+    logger = logging.getLogger('test.dblog.batch')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        for i in range(7):
+            logger.info('message %d', i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    messages = [row.message for row in AppLog.query.order_by(AppLog.id)]
+    assert messages == [f'message {i}' for i in range(7)]
+
+
+def test_db_log_handler_drops_when_queue_full(app):
+    """キューが満杯なら破棄して数え、次の書き込みで破棄件数を WARNING として記録すること。"""
+    handler = DBLogHandler(app, capacity=2, flush_interval=10)
+    handler._pid = os.getpid()  # 書き込みスレッドを起動させずにキューを溜める
+    logger = logging.getLogger('test.dblog.drop')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        for i in range(5):
+            logger.info('message %d', i)
+    finally:
+        logger.removeHandler(handler)
+    assert handler.dropped == 3
+
+    handler._write([handler.queue.get_nowait(), handler.queue.get_nowait()])
+    rows = AppLog.query.order_by(AppLog.id).all()
+    assert [r.level for r in rows] == ['INFO', 'INFO', 'WARNING']
+    assert '3 件' in rows[-1].message
+    handler.close()
+
+
+def test_error_mail_groups_identical_errors_into_digest(app):
+    """同じエラーはまとめて1通のダイジェストになり、送信上限に達したら送らずに集計を続けること。"""
+    transport = MemoryTransport()
+    handler = ResendErrorHandler(app, transport=transport, window=3600, max_per_hour=1)
+    logger = logging.getLogger('test.errormail')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for i in range(30):
+            logger.error('DB接続失敗: %d', i)
+        logger.error('別のエラー')
+        assert transport.outbox == []  # emit では送信しない
+
+        assert handler.flush() is True
+        assert len(transport.outbox) == 1
+        mail = transport.outbox[0]
+        assert '31 件（2 種類）' in mail['subject']
+        assert '■ 30 件' in mail['text']
+
+        logger.error('別のエラー')
+        assert handler.flush() is False  # 1時間1通の上限
+        assert len(transport.outbox) == 1
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+        handler._stop.set()
@@ -73,3 +73,73 @@ class TestMemoCRUD:
         with app.app_context():
             after = Memo.query.count()
             assert after == before - 1
+
+
+class TestMemoSearch:
+    def _create(self, app, auth_client, title, content):
+        auth_client.post('/memo/create', data={'title': title, 'content': content})
+        with app.app_context():
+            return Memo.query.filter_by(title=title).one().id
+
+    def test_search_japanese_bigram(self, app, auth_client, test_user):
+        """日本語の部分一致検索でヒットした記事だけが表示される。"""
+        hit_id = self._create(app, auth_client, 'ルーティング入門', 'Blueprint で URL を分割する')
+        miss_id = self._create(app, auth_client, 'テンプレート継承', 'Jinja2 の extends を使う')
+
+        res = auth_client.get('/memo/?q=ルーティング')
+        assert f'/memo/update/{hit_id}'.encode() in res.data
+        assert f'/memo/update/{miss_id}'.encode() not in res.data
+
+    def test_search_word_prefix_and_update_sync(self, app, auth_client, test_user):
+        """英単語の前方一致でヒットし、更新後の本文で検索インデックスが置き換わる。"""
+        memo_id = self._create(app, auth_client, 'メモ', 'Blueprint の使い方')
+        assert f'/memo/update/{memo_id}'.encode() in auth_client.get('/memo/?q=blue').data
+
+        auth_client.post(f'/memo/update/{memo_id}', data={'title': 'メモ', 'content': 'SQLAlchemy の使い方'})
+        assert f'/memo/update/{memo_id}'.encode() not in auth_client.get('/memo/?q=blueprint').data
+        assert f'/memo/update/{memo_id}'.encode() in auth_client.get('/memo/?q=sqlalchemy').data
+
+    def test_search_single_kanji_and_word_fragment(self, app, auth_client, test_user):
+        """日本語 1 文字・英単語の途中の文字列でも従来の部分一致と同じくヒットする。"""
+        cat_id = self._create(app, auth_client, '猫の写真', '東京で撮影')
+        py_id = self._create(app, auth_client, '入門', 'python の基本')
+
+        assert f'/memo/update/{cat_id}'.encode() in auth_client.get('/memo/?q=猫').data
+        assert f'/memo/update/{cat_id}'.encode() in auth_client.get('/memo/?q=京').data
+        res = auth_client.get('/memo/?q=ython')
+        assert f'/memo/update/{py_id}'.encode() in res.data
+        assert f'/memo/update/{cat_id}'.encode() not in res.data
+
+    def test_search_word_fragment_uses_trigram_index(self, app, auth_client, test_user, monkeypatch):
+        """英単語の途中の文字列は trigram インデックスで引き、ILIKE の全件走査に切り替えない。"""
+        from utils.search import LikeSearchBackend
+
+        app_id = self._create(app, auth_client, 'デプロイ手順', 'my_flask_app を起動する')
+        other_id = self._create(app, auth_client, 'デプロイ手順2', 'django を起動する')
+
+        def no_like(self, q):
+            raise AssertionError('LIKE 検索に切り替わった')
+
+        monkeypatch.setattr(LikeSearchBackend, 'matches', no_like)
+        res = auth_client.get('/memo/?q=flask デプロイ')
+        assert f'/memo/update/{app_id}'.encode() in res.data
+        assert f'/memo/update/{other_id}'.encode() not in res.data
+
+
+class TestMemoCursorPaging:
+    def test_next_link_continues_with_cursor(self, app, auth_client, test_user):
+        """一覧の「次へ」はカーソルで続きの記事を表示する。"""
+        import re
+        from html import unescape
+        with app.app_context():
+            for i in range(12):
+                db.session.add(Memo(title=f'一覧{i}', content='本文', user_id=test_user.id))
+            db.session.commit()
+            ids = [m.id for m in Memo.query.order_by(Memo.created_at.desc(), Memo.id.desc())]
+
+        html = auth_client.get('/memo/').get_data(as_text=True)
+        next_url = unescape(re.search(r'href="(/memo/\?cursor=[^"]+)"', html).group(1))
+        html = auth_client.get(next_url).get_data(as_text=True)
+        assert f'/memo/update/{ids[10]}' in html
+        assert f'/memo/update/{ids[11]}' in html
+        assert f'/memo/update/{ids[9]}"' not in html
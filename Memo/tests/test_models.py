@@ -61,6 +61,36 @@ class TestMemoModel:
             assert saved.title == 'テストタイトル'
 
 
+    def test_quality_columns_follow_ai_score(self, app, test_user):
+        """ai_score の代入で quality_total / is_translated / translate_score が更新される。"""
+        with app.app_context():
+            memo = Memo(title='スコア', content='本文', user_id=test_user.id,
+                        ai_score={'information': 3, 'writing': '4', 'readability': 5})
+            db.session.add(memo)
+            db.session.commit()
+            assert (memo.quality_total, memo.is_translated, memo.translate_score) == (12, False, None)
+
+            memo.ai_score = dict(memo.ai_score, translated_title='Score', translate_score=85)
+            db.session.commit()
+            db.session.refresh(memo)
+            assert (memo.quality_total, memo.is_translated, memo.translate_score) == (12, True, 85)
+
+    def test_rendered_html_follows_content_and_translation(self, app, test_user):
+        """本文・英語本文の代入で事前描画 HTML が更新される。"""
+        with app.app_context():
+            memo = Memo(title='描画', content='# 見出し', user_id=test_user.id)
+            db.session.add(memo)
+            db.session.commit()
+            assert memo.content_html == '<h1>見出し</h1>'
+            assert memo.translated_body_html is None
+
+            memo.content = '| a |\n|---|\n| 1 |'
+            memo.ai_score = {'translated_body': '```\ncode\n```'}
+            db.session.commit()
+            assert '<table>' in memo.content_html
+            assert '<code>code' in memo.translated_body_html
+
+
 class TestCategoryModel:
     def test_category_name_unique(self, app):
         """同名カテゴリーの2件目は IntegrityError になる。"""
@@ -33,3 +33,173 @@ class TestPublicPages:
         """存在しないパスが 404 を返す。"""
         res = client.get('/nonexistent-path-xyz')
         assert res.status_code == 404
+
+
+class TestRanking:
+    def test_top10_is_cached_until_invalidated(self, app, test_user):
+        """ランキングはキャッシュされ、invalidate_ranking で再集計される。"""
+        from utils.ranking import get_top10, invalidate_ranking
+        with app.test_request_context():
+            user = db.session.get(User, test_user.id)
+            db.session.add(Memo(title='ランキング1', content='本文', user_id=user.id))
+            db.session.commit()
+            assert [r['memo']['title'] for r in get_top10()] == ['ランキング1']
+
+            db.session.add(Memo(title='ランキング2', content='本文', user_id=user.id, like_count=3))
+            db.session.commit()
+            assert len(get_top10()) == 1
+
+            invalidate_ranking()
+            assert [r['memo']['title'] for r in get_top10()] == ['ランキング2', 'ランキング1']
+
+    def test_like_invalidates_ranking(self, app, auth_client, other_user):
+        """いいね追加でランキングキャッシュが破棄される。"""
+        from utils.ranking import get_top10
+        with app.test_request_context():
+            memo = Memo(title='いいね対象', content='本文', user_id=other_user.id)
+            db.session.add(memo)
+            db.session.commit()
+            memo_id = memo.id
+            assert get_top10()[0]['like_count'] == 0
+
+        auth_client.post(f'/favorite/add/{memo_id}')
+
+        with app.test_request_context():
+            assert get_top10()[0]['like_count'] == 1
+
+
+class TestRecommend:
+    def test_recommendations_ranked_by_category_overlap(self, app, test_user, other_user):
+        """他者記事がカテゴリー一致数の多い順に返り、自分の記事と一致なし記事は除外される。"""
+        from models import Category
+        from utils.recommend import get_recommendations
+        with app.test_request_context():
+            cat_a = Category(name='CatA', color='#111111')
+            cat_b = Category(name='CatB', color='#222222')
+            cat_c = Category(name='CatC', color='#333333')
+            db.session.add_all([cat_a, cat_b, cat_c])
+            db.session.add(Memo(title='自分', content='本文', user_id=test_user.id, categories=[cat_a, cat_b]))
+            db.session.add(Memo(title='一致1', content='本文', user_id=other_user.id, categories=[cat_a]))
+            db.session.add(Memo(title='一致2', content='本文', user_id=other_user.id, categories=[cat_a, cat_b]))
+            db.session.add(Memo(title='一致なし', content='本文', user_id=other_user.id, categories=[cat_c]))
+            db.session.commit()
+
+            titles = [m['title'] for m in get_recommendations(test_user.id)]
+            assert titles == ['一致2', '一致1']
+
+    def test_top_page_with_recommendations_returns_200(self, app, auth_client, test_user, other_user, test_category):
+        """オススメ記事があるログイン状態のトップページが 200 を返す。"""
+        from models import Category
+        with app.app_context():
+            cat = db.session.get(Category, test_category.id)
+            db.session.add(Memo(title='自分', content='本文', user_id=test_user.id, categories=[cat]))
+            db.session.add(Memo(title='他者', content='本文', user_id=other_user.id, categories=[cat]))
+            db.session.commit()
+
+        res = auth_client.get('/')
+        assert res.status_code == 200
+        assert '他者'.encode() in res.data
+
+
+class TestViewCount:
+    def test_detail_view_is_buffered_then_flushed(self, app, client, test_user):
+        """詳細ページの閲覧数はバッファされ、flush で DB にまとめて加算される。"""
+        from utils.view_counter import flush_view_counts
+        with app.app_context():
+            memo = Memo(title='閲覧数', content='本文', user_id=test_user.id, view_count=5)
+            db.session.add(memo)
+            db.session.commit()
+            memo_id = memo.id
+
+        client.get(f'/detail/{memo_id}')
+        client.get(f'/en/detail/{memo_id}')
+
+        with app.app_context():
+            assert db.session.get(Memo, memo_id).view_count == 5
+            assert flush_view_counts() == 2
+            db.session.expire_all()
+            assert db.session.get(Memo, memo_id).view_count == 7
+
+
+class TestNavCache:
+    def test_nav_pages_cached_until_version_bumped(self, app):
+        """ナビ辞書はキャッシュされ、invalidate_nav でバージョンが進むと再構築される。"""
+        from models import FixedPage
+        from utils.nav import get_nav_pages, invalidate_nav
+        with app.test_request_context():
+            assert get_nav_pages()['GLOBAL_NAV_PAGES'] == {}
+
+        with app.test_request_context():
+            db.session.add(FixedPage(key='help', title='ヘルプ', en_title='Help'))
+            db.session.commit()
+            assert get_nav_pages()['GLOBAL_NAV_PAGES'] == {}
+            invalidate_nav()
+            assert get_nav_pages()['GLOBAL_NAV_PAGES'] == {'help': 'ヘルプ'}
+            assert get_nav_pages()['EN_GLOBAL_NAV_PAGES'] == {'help': 'Help'}
+
+
+class TestKeysetPagination:
+    def test_cursor_pages_follow_quality_order_without_gaps(self, app, test_user):
+        """カーソルで辿った結果が OFFSET での並び順と一致し、重複・欠落がない。"""
+        from datetime import datetime
+        from public.views import _quality_keys, _quality_order_by
+        from utils.pagination import keyset_paginate
+        with app.app_context():
+            created = datetime(2024, 1, 1)
+            for i in range(7):
+                score = {'information': i % 3, 'writing': 1, 'readability': 1}
+                if i % 2:
+                    score['translated_title'] = f'Title {i}'
+                db.session.add(Memo(title=f'記事{i}', content='本文', user_id=test_user.id,
+                                    ai_score=score, created_at=created))
+            db.session.commit()
+            expected = [m.id for m in Memo.query.order_by(*_quality_order_by(), Memo.id.desc())]
+
+            with app.test_request_context():
+                seen, cursor = [], None
+                while True:
+                    page = keyset_paginate(Memo.query, _quality_keys(), cursor, 3)
+                    seen.extend(m.id for m in page.items)
+                    if not page.has_next:
+                        break
+                    cursor = page.next_cursor
+            assert seen == expected
+
+    def test_load_more_returns_card_partial(self, app, client, test_user):
+        """htmx の「もっと見る」要求にはカード部分のみ返す。改ざんカーソルは先頭扱い。"""
+        with app.app_context():
+            for i in range(8):
+                db.session.add(Memo(title=f'続き記事{i}', content='本文', user_id=test_user.id))
+            db.session.commit()
+
+        res = client.get('/')
+        html = res.get_data(as_text=True)
+        assert 'hx-get="/?cursor=' in html
+        cursor = html.split('hx-get="/?cursor=')[1].split('"')[0]
+
+        res = client.get(f'/?cursor={cursor}', headers={'HX-Request': 'true'})
+        partial = res.get_data(as_text=True)
+        assert res.status_code == 200
+        assert '<html' not in partial
+        assert partial.count('card-hover-item') == 2
+
+        res = client.get('/?cursor=broken', headers={'HX-Request': 'true'})
+        assert res.status_code == 200
+
+
+class TestMarkdownRender:
+    def test_render_markdown_lru(self, app):
+        """同じ本文はキャッシュから返し、件数上限を超えた分は古い順に捨てる。"""
+        from utils import markdown_render
+
+        markdown_render.clear_markdown_cache()
+        app.config['MARKDOWN_CACHE_SIZE'] = 2
+        try:
+            assert markdown_render.render_markdown('**a**') == '<p><strong>a</strong></p>'
+            assert markdown_render.render_markdown('**a**') == '<p><strong>a</strong></p>'
+            markdown_render.render_markdown('b')
+            markdown_render.render_markdown('c')
+            assert len(markdown_render._cache) == 2
+        finally:
+            app.config['MARKDOWN_CACHE_SIZE'] = 256
+            markdown_render.clear_markdown_cache()
@@ -0,0 +1,60 @@
+from models import db, Memo, FixedPage
+from utils import sitemap as sitemap_module
+
+
+def _add_memos(user, count):
+    db.session.add_all([Memo(title=f'記事{i}', content='本文', user_id=user.id) for i in range(count)])
+    db.session.commit()
+
+
+class TestSitemap:
+    def test_sitemap_streams_urls_with_etag(self, client, test_user):
+        """記事・固定ページの URL を出力し、ETag 一致なら 304 を返す。"""
+        _add_memos(test_user, 3)
+        db.session.add(FixedPage(key='about', title='About', visible=True))
+        db.session.commit()
+
+        res = client.get('/sitemap.xml')
+        xml = res.get_data(as_text=True)
+        assert res.status_code == 200
+        assert res.mimetype == 'application/xml'
+        assert xml.count('/detail/') == 3
+        assert '/fixed/about' in xml
+        assert xml.endswith('</urlset>')
+        assert res.headers['ETag']
+        assert res.headers['Last-Modified']
+
+        res = client.get('/sitemap.xml', headers={'If-None-Match': res.headers['ETag']})
+        assert res.status_code == 304
+        assert res.get_data() == b''
+
+    def test_sitemap_index_when_over_limit(self, client, test_user, monkeypatch):
+        """URL 数が上限を超えたらサイトマップインデックスにして分割する。"""
+        monkeypatch.setattr(sitemap_module, 'SITEMAP_MAX_URLS', 2)
+        _add_memos(test_user, 5)
+
+        xml = client.get('/sitemap.xml').get_data(as_text=True)
+        assert '<sitemapindex' in xml
+        assert xml.count('sitemap-memos-') == 3
+
+        parts = [client.get(f'/sitemap-memos-{n}.xml').get_data(as_text=True) for n in (1, 2, 3)]
+        assert [p.count('/detail/') for p in parts] == [2, 2, 1]
+        assert '/fixed/' not in client.get('/sitemap-pages.xml').get_data(as_text=True)
+        assert client.get('/sitemap-memos-4.xml').status_code == 404
+
+    def test_sitemap_refreshes_when_fixed_page_visibility_swapped(self, client, admin_client, test_user):
+        """管理画面で表示する固定ページを入れ替えると（件数が同じでも）ETag が変わる。"""
+        about = FixedPage(key='about', title='About', visible=True)
+        help_page = FixedPage(key='help', title='ヘルプ', visible=False)
+        db.session.add_all([about, help_page])
+        db.session.commit()
+
+        etag = client.get('/sitemap.xml').headers['ETag']
+        admin_client.post(f'/admin/fixed/toggle/{about.id}')
+        admin_client.post(f'/admin/fixed/toggle/{help_page.id}')
+
+        res = client.get('/sitemap.xml', headers={'If-None-Match': etag})
+        xml = res.get_data(as_text=True)
+        assert res.status_code == 200
+        assert '/fixed/help' in xml
+        assert '/fixed/about' not in xml
@@ -0,0 +1,80 @@
+import os
+from models import ThumbnailConfig
+from utils.storage import LocalStorage, cache_control, get_storage, list_files, upload_url
+from utils.thumbnails import sync_thumbnail_configs
+
+DIGEST = 'ab' * 32
+
+
+class TestLocalStorage:
+    def test_save_list_delete(self, app, tmp_path, monkeypatch):
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'fixed', str(tmp_path))
+        with app.app_context():
+            storage = get_storage()
+            assert isinstance(storage, LocalStorage)
+            storage.save_bytes('fixed', 'b.png', b'1')
+            storage.save_bytes('fixed', 'a.jpg', b'2')
+            (tmp_path / '.upload-tmp').write_bytes(b'')
+            assert storage.list('fixed') == ['a.jpg', 'b.png']
+            assert storage.exists('fixed', 'a.jpg')
+            storage.delete('fixed', 'a.jpg')
+            storage.delete('fixed', 'a.jpg')
+            assert storage.list('fixed') == ['b.png']
+            # リクエスト外（バックグラウンドジョブ）でも URL を組み立てられる
+            assert upload_url('fixed', 'b.png') == '/static/images/fixed/b.png'
+
+    def test_cache_headers(self, app, client, tmp_path, monkeypatch):
+        """内容アドレスの画像は1年 immutable、それ以外の名前は短いキャッシュで配信する。"""
+        (tmp_path / 'images' / 'memo').mkdir(parents=True)
+        (tmp_path / 'images' / 'memo' / f'{DIGEST}.png').write_bytes(b'x')
+        (tmp_path / 'images' / 'memo' / f'{DIGEST}-320.webp').write_bytes(b'x')
+        (tmp_path / 'images' / 'memo' / '01.jpg').write_bytes(b'x')
+        monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+
+        for name in (f'{DIGEST}.png', f'{DIGEST}-320.webp'):
+            res = client.get(f'/static/images/memo/{name}')
+            assert res.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert client.get('/static/images/memo/01.jpg').headers['Cache-Control'] == 'public, max-age=3600'
+        with app.app_context():
+            assert cache_control('keyvisual.jpg') == 'public, max-age=3600'
+
+
+class TestListing:
+    def test_list_files_cached_until_directory_changes(self, app, tmp_path, monkeypatch):
+        """一覧はディレクトリの mtime が変わるまで再走査しない。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'fixed', str(tmp_path))
+        (tmp_path / 'a.jpg').write_bytes(b'')
+        with app.app_context():
+            storage = get_storage()
+            calls = []
+            original = LocalStorage.list
+            monkeypatch.setattr(LocalStorage, 'list', lambda self, *a: calls.append(a) or original(self, *a))
+
+            assert list_files('fixed')[1] == ['a.jpg']
+            assert list_files('fixed')[1] == ['a.jpg']
+            assert len(calls) == 1
+
+            storage.save_bytes('fixed', 'b.jpg', b'')
+            os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 1))
+            assert list_files('fixed')[1] == ['a.jpg', 'b.jpg']
+            assert len(calls) == 2
+
+    def test_thumbnail_sync_is_incremental(self, app, tmp_path, monkeypatch):
+        """ThumbnailConfig は一覧が変わったときだけ差分を反映する（自分でアップロードした画像は対象外）。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'user', str(tmp_path))
+        for name in ('001.png', '011.png', 'default.png', f'{DIGEST}.png'):
+            (tmp_path / name).write_bytes(b'')
+        with app.app_context():
+            assert sync_thumbnail_configs() == {'001.png', '011.png'}
+            assert {tc.filename: tc.visible for tc in ThumbnailConfig.query} == {'001.png': True, '011.png': False}
+
+            # 一覧が変わっていなければ DB に触れない
+            with monkeypatch.context() as m:
+                m.setattr('utils.thumbnails.db', None)
+                assert sync_thumbnail_configs() == {'001.png', '011.png'}
+
+            (tmp_path / '011.png').unlink()
+            (tmp_path / '002.png').write_bytes(b'')
+            os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 1))
+            assert sync_thumbnail_configs() == {'001.png', '002.png'}
+            assert sorted(tc.filename for tc in ThumbnailConfig.query) == ['001.png', '002.png']
@@ -0,0 +1,113 @@
+import io
+import os
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from models import db, Memo, StoredFile
+from utils.upload import detect_image_type, save_upload, release_upload
+
+
+def _png(color=(10, 20, 30)) -> bytes:
+    buf = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def _file(data: bytes, name='image.png') -> FileStorage:
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+class TestUploadStore:
+    def test_detect_image_type(self):
+        assert detect_image_type(_png()[:16]) == 'png'
+        assert detect_image_type(b'\xff\xd8\xff\xe0\x00\x10JFIF') == 'jpeg'
+        assert detect_image_type(b'GIF89a\x01\x00') == 'gif'
+        assert detect_image_type(b'<?php echo 1; ?>') is None
+
+    def test_same_content_is_stored_once_and_released_by_refcount(self, app, tmp_path, monkeypatch):
+        """同じ内容は1ファイルにまとめ、参照が全て外れたらファイルと派生画像を削除する。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'user', str(tmp_path))
+        with app.test_request_context():
+            first = save_upload(_file(_png(), 'a.png'), 'user')
+            second = save_upload(_file(_png(), 'b.jpg'), 'user')
+            other = save_upload(_file(_png((200, 0, 0))), 'user')
+            db.session.commit()
+
+            assert first == second != other
+            assert first.endswith('.png') and len(first) == 64 + 4
+            assert StoredFile.query.filter_by(category='user', filename=first).one().ref_count == 2
+            (tmp_path / (first[:-4] + '-320.webp')).write_bytes(b'')
+
+            release_upload('user', first)
+            db.session.commit()
+            assert os.path.exists(tmp_path / first)
+
+            release_upload('user', first)
+            db.session.commit()
+            assert sorted(os.listdir(tmp_path)) == [other]
+            assert StoredFile.query.filter_by(filename=first).first() is None
+
+    def test_rejects_by_magic_bytes(self, app, tmp_path, monkeypatch):
+        """拡張子が画像でも中身が画像でなければ保存しない（一時ファイルも残さない）。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'user', str(tmp_path))
+        with app.test_request_context():
+            assert save_upload(_file(b'<script>alert(1)</script>', 'x.png'), 'user') is None
+        assert os.listdir(tmp_path) == []
+
+    def test_memo_delete_releases_image(self, app, auth_client, test_user, tmp_path, monkeypatch):
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'memo', str(tmp_path))
+        for title in ('一件目', '二件目'):
+            auth_client.post('/memo/create', data={
+                'title': title, 'content': '本文', 'image': (io.BytesIO(_png()), 'same.png'),
+            }, content_type='multipart/form-data')
+        memos = Memo.query.filter(Memo.title.in_(['一件目', '二件目'])).all()
+        assert len({m.image_filename for m in memos}) == 1
+        filename = memos[0].image_filename
+
+        auth_client.get(f'/memo/delete/{memos[0].id}')
+        assert os.path.exists(tmp_path / filename)
+        auth_client.get(f'/memo/delete/{memos[1].id}')
+        assert not os.path.exists(tmp_path / filename)
+
+    def test_release_does_not_overwrite_concurrent_reference(self, app, tmp_path, monkeypatch):
+        """読み込み後に別の処理が参照を足していても、解放で参照数を上書きしない。"""
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'user', str(tmp_path))
+        with app.test_request_context():
+            filename = save_upload(_file(_png()), 'user')
+            db.session.commit()
+            stored = StoredFile.query.filter_by(filename=filename).one()
+            assert stored.ref_count == 1
+
+            # 同じ内容のアップロードが並行してコミットした状態（セッション上の値は古いまま）
+            db.session.execute(
+                StoredFile.__table__.update().where(StoredFile.__table__.c.id == stored.id)
+                .values(ref_count=StoredFile.__table__.c.ref_count + 1)
+            )
+            release_upload('user', filename)
+            db.session.commit()
+
+            db.session.expire_all()
+            assert StoredFile.query.filter_by(filename=filename).one().ref_count == 1
+            assert os.path.exists(tmp_path / filename)
+
+    def test_concurrent_first_upload_joins_existing_row(self, app, tmp_path, monkeypatch):
+        """同じ内容の初回アップロードが競合したら、先に登録された行に参照を足す。"""
+        import utils.upload as upload_module
+
+        monkeypatch.setitem(app.config['UPLOAD_FOLDERS'], 'user', str(tmp_path))
+        real_increment = upload_module._increment
+
+        def racing_increment(category, digest):
+            if not StoredFile.query.count():
+                # 加算の直後に別リクエストが先に登録した
+                db.session.add(StoredFile(category=category, filename='winner.png', digest=digest,
+                                          content_type='image/png', size=1, ref_count=1))
+                db.session.commit()
+                return False
+            return real_increment(category, digest)
+
+        monkeypatch.setattr(upload_module, '_increment', racing_increment)
+        with app.test_request_context():
+            assert save_upload(_file(_png()), 'user') == 'winner.png'
+            db.session.commit()
+            assert StoredFile.query.one().ref_count == 2
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,203 @@
+"""
+Gemini API の一括実行（flask translate-memos 用）
+
+- TokenBucket: 秒間リクエスト数の上限。429 応答時は Retry-After の間、全ワーカーを止める
+- run_translate_job: 未翻訳記事を ID 順のチャンクに分け、スレッドプールで並列翻訳し、
+  チャンク単位でコミットしてチェックポイントを書き出す（中断後は続きから再開）
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from models import db, Memo
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット（rate 件/秒、最大 capacity 件まで貯められる）。"""
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """トークンを1つ取得できるまで待つ。"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """seconds 秒間トークンの払い出しを止め、再開時はバケットを空から始める。"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+def retry_after(exc, default: float = 30.0) -> float | None:
+    """
+    例外が 429（レート制限）なら待機秒数を返す。それ以外は None。
+
+    HTTP の Retry-After ヘッダ、Gemini のエラー詳細 RetryInfo.retryDelay（"12s"）の順に参照する。
+    """
+    code = getattr(exc, 'code', None) or getattr(exc, 'status_code', None)
+    if code != 429:
+        return None
+    response = getattr(exc, 'response', None)
+    header = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    match = re.search(r"retryDelay'?\"?:\s*'?\"?(\d+(?:\.\d+)?)s", str(getattr(exc, 'details', '')))
+    if match:
+        return float(match.group(1))
+    return default
+
+
+class JobStats:
+    """スループット集計。"""
+
+    def __init__(self):
+        self.ok = 0
+        self.ng = 0
+        self.rate_limited = 0
+        self.api_seconds = 0.0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            if ok:
+                self.ok += 1
+            else:
+                self.ng += 1
+            self.api_seconds += seconds
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate_limited += 1
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self.started
+        done = self.ok + self.ng
+        per_min = done / elapsed * 60 if elapsed else 0.0
+        avg = self.api_seconds / done if done else 0.0
+        return (
+            f'完了: 成功 {self.ok} 件 / 失敗 {self.ng} 件 / 429 {self.rate_limited} 回\n'
+            f'経過 {elapsed:.1f} 秒 / スループット {per_min:.1f} 件/分 / 平均応答 {avg:.2f} 秒'
+        )
+
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {'last_id': 0, 'failed': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)  # 書き込み途中で落ちても壊れたファイルを残さない
+
+
+def _call_with_retry(app, fn, args, bucket: TokenBucket, stats: JobStats, max_retries: int):
+    """トークン取得→API 呼び出し。429 はバケットを止めてリトライ、それ以外の例外は失敗扱い。"""
+    with app.app_context():
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                wait = retry_after(e)
+                if wait is not None and attempt < max_retries:
+                    stats.throttled()
+                    bucket.pause(wait)
+                    continue
+                stats.record(False, time.monotonic() - started)
+                print(f"######## 一括翻訳 API呼び出し失敗: {e} ########")
+                return None
+            stats.record(result is not None, time.monotonic() - started)
+            return result
+    return None
+
+
+def run_translate_job(app, translate, *, concurrency: int = 4, rate: float = 2.0,
+                      batch_size: int = 20, checkpoint_path: str | None = None,
+                      limit: int | None = None, retry_failed: bool = False,
+                      max_retries: int = 3, log=print) -> JobStats:
+    """
+    未翻訳の記事を並列で英語翻訳し、ai_score に保存する。
+
+    Args:
+        translate: (title, content) -> {"translated_title", "translated_body"} | None。
+                   例外は 429 判定のためそのまま送出すること
+        concurrency: 同時実行数
+        rate: 秒間リクエスト数の上限
+        batch_size: 1回のコミットにまとめる件数（= チェックポイントの単位）
+        checkpoint_path: 進捗ファイル。前回の続き（last_id より後）から処理する
+        limit: 処理件数の上限
+        retry_failed: チェックポイントに記録された失敗分だけを再実行する
+    """
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else {'last_id': 0, 'failed': []}
+    failed = set(checkpoint['failed'])
+    # 対象は ID のみ取得（本文は各チャンクで読み込む）
+    query = db.session.query(Memo.id).filter(Memo.is_translated.is_(False)).order_by(Memo.id)
+    if retry_failed:
+        query = query.filter(Memo.id.in_(failed))
+    else:
+        query = query.filter(Memo.id > checkpoint['last_id'])
+    if limit:
+        query = query.limit(limit)
+    target_ids = [memo_id for memo_id, in query]
+    stats = JobStats()
+    if not target_ids:
+        return stats
+    log(f'翻訳対象: {len(target_ids)} 件（同時 {concurrency} / {rate} 件/秒 / {batch_size} 件ごとにコミット）')
+
+    bucket = TokenBucket(rate, capacity=concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='translate') as pool:
+        for start in range(0, len(target_ids), batch_size):
+            chunk = Memo.query.filter(Memo.id.in_(target_ids[start:start + batch_size])).order_by(Memo.id).all()
+            # ワーカースレッドには ORM オブジェクトではなく値だけを渡す
+            args = [(memo.title, memo.content) for memo in chunk]
+            results = pool.map(
+                lambda a: _call_with_retry(app, translate, a, bucket, stats, max_retries),
+                args,
+            )
+            for memo, result in zip(chunk, results):
+                if result:
+                    updated = dict(memo.ai_score) if memo.ai_score else {}
+                    updated['translated_title'] = result['translated_title']
+                    updated['translated_body'] = result['translated_body']
+                    memo.ai_score = updated
+                    failed.discard(memo.id)
+                else:
+                    failed.add(memo.id)
+            db.session.commit()
+            checkpoint = {'last_id': max(checkpoint['last_id'], chunk[-1].id), 'failed': sorted(failed)}
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, checkpoint)
+            log(f'  ... {min(start + batch_size, len(target_ids))}/{len(target_ids)} 件 '
+                f'（成功 {stats.ok} / 失敗 {stats.ng}）')
+    return stats
@@ -0,0 +1,95 @@
+"""
+Gemini API 呼び出し結果のキャッシュ
+
+(関数名, モデル名, プロンプト版, 入力) の sha256 をキーに結果を ai_result_cache テーブルへ保存し、
+タイトル・本文が変わっていない記事の再解析・再翻訳では API を呼ばずに結果を返す。
+プロンプトを変更したときは各モジュールの PROMPT_VERSION を上げると古い結果は使われなくなる。
+対象は入力が同じなら同じ結果でよい解析・翻訳・採点のみ（固定ページ生成のような創作は対象外）。
+"""
+import functools
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from models import db, AiResultCache
+
+_table = AiResultCache.__table__
+
+
+def cache_key(function: str, model: str, version: int, inputs) -> str:
+    payload = json.dumps([function, model, version, inputs], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _get(key: str):
+    now = datetime.now(timezone.utc)
+    with db.engine.connect() as conn:
+        return conn.execute(
+            select(_table.c.value).where(_table.c.key == key, _table.c.expires_at > now)
+        ).scalar()
+
+
+def _set(key: str, function: str, value, ttl: int, max_entries: int) -> None:
+    now = datetime.now(timezone.utc)
+    # リクエストのセッション（未コミットの変更）を巻き込まないよう独立した接続で書き込む
+    with db.engine.begin() as conn:
+        conn.execute(delete(_table).where((_table.c.key == key) | (_table.c.expires_at <= now)))
+        conn.execute(insert(_table).values(
+            key=key, function=function, value=value,
+            created_at=now, expires_at=now + timedelta(seconds=ttl),
+        ))
+        # 上限を超えた分は古いものから削除
+        overflow = conn.execute(select(func.count()).select_from(_table)).scalar() - max_entries
+        if overflow > 0:
+            oldest = select(_table.c.key).order_by(_table.c.created_at).limit(overflow)
+            conn.execute(delete(_table).where(_table.c.key.in_(oldest.scalar_subquery())))
+
+
+def ai_cached(function: str, model: str, version: int, key_func=None):
+    """
+    AI 呼び出し関数の結果をキャッシュするデコレータ。
+
+    None（エラー）と例外はキャッシュしない。キャッシュの読み書きに失敗しても AI 呼び出しは行う。
+
+    Args:
+        function: キャッシュ上の関数名
+        model: 使用モデル名
+        version: プロンプト版（プロンプト・後処理を変えたら上げる）
+        key_func: 引数からキーに含める値を作る関数（省略時は全引数）
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('AI_CACHE_ENABLED', True):
+                return fn(*args, **kwargs)
+            inputs = key_func(*args, **kwargs) if key_func else [args, kwargs]
+            key = cache_key(function, model, version, inputs)
+            try:
+                cached = _get(key)
+            except Exception as e:
+                print(f"######## AIキャッシュ読み込み失敗: {e} ########")
+                cached = None
+            if cached is not None:
+                return cached
+
+            result = fn(*args, **kwargs)
+            if result is not None:
+                try:
+                    _set(key, function, result,
+                         ttl=current_app.config.get('AI_CACHE_TTL', 30 * 24 * 3600),
+                         max_entries=current_app.config.get('AI_CACHE_MAX_ENTRIES', 5000))
+                except Exception as e:
+                    print(f"######## AIキャッシュ書き込み失敗: {e} ########")
+            return result
+        return wrapper
+    return decorator
+
+
+def purge_ai_cache(function: str | None = None) -> int:
+    """キャッシュを削除する。function 指定時はその関数の分のみ。Returns: 削除件数"""
+    stmt = delete(_table)
+    if function:
+        stmt = stmt.where(_table.c.function == function)
+    with db.engine.begin() as conn:
+        return conn.execute(stmt).rowcount
@@ -0,0 +1,94 @@
+"""
+Gemini API クライアントの共有
+
+genai.Client をプロセスごとに1つだけ作って使い回し、HTTP 接続（keep-alive）を再利用する。
+呼び出しごとのタイムアウト指定と、モデル別の呼び出し回数・エラー数・応答時間の集計も行う。
+"""
+import os
+import threading
+import time
+from flask import current_app
+
+_lock = threading.Lock()
+_clients = {}   # (pid, api_key) -> genai.Client
+_metrics = {}   # model -> {"calls", "errors", "total_seconds", "max_seconds"}
+
+
+def get_client():
+    """
+    共有の genai.Client を返す。GOOGLE_API_KEY 未設定時は None。
+
+    fork 後の子プロセス（gunicorn ワーカー）では親の接続を引き継がないよう PID ごとに作り直す。
+    """
+    api_key = current_app.config.get('GOOGLE_API_KEY', '')
+    if not api_key:
+        return None
+    key = (os.getpid(), api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import httpx
+            from google import genai
+            from google.genai.types import HttpOptions
+
+            max_connections = current_app.config.get('AI_MAX_CONNECTIONS', 10)
+            client = genai.Client(
+                api_key=api_key,
+                http_options=HttpOptions(
+                    timeout=int(current_app.config.get('AI_TIMEOUT', 60) * 1000),  # ミリ秒指定
+                    client_args={'limits': httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=60,
+                    )},
+                ),
+            )
+            _clients[key] = client
+    return client
+
+
+def _record(model: str, seconds: float, error: bool) -> None:
+    with _lock:
+        m = _metrics.setdefault(model, {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        m['calls'] += 1
+        m['errors'] += int(error)
+        m['total_seconds'] += seconds
+        m['max_seconds'] = max(m['max_seconds'], seconds)
+
+
+def generate_content(model: str, contents, config=None, timeout: float | None = None):
+    """
+    共有クライアントで generate_content を呼び出す。
+
+    Args:
+        timeout: この呼び出しのタイムアウト秒数（省略時は AI_TIMEOUT）
+    Raises:
+        RuntimeError: GOOGLE_API_KEY 未設定
+        その他 API 呼び出しの例外はそのまま送出する
+    """
+    client = get_client()
+    if client is None:
+        raise RuntimeError('GOOGLE_API_KEY が未設定です')
+    if timeout is not None:
+        from google.genai.types import GenerateContentConfig, HttpOptions
+
+        config = config.model_copy() if config is not None else GenerateContentConfig()
+        config.http_options = HttpOptions(timeout=int(timeout * 1000))
+
+    started = time.monotonic()
+    try:
+        response = client.models.generate_content(model=model, contents=contents, config=config)
+    except Exception:
+        _record(model, time.monotonic() - started, error=True)
+        raise
+    _record(model, time.monotonic() - started, error=False)
+    return response
+
+
+def get_metrics() -> dict:
+    """モデル別の呼び出し回数・エラー数・平均/最大応答秒数を返す。"""
+    with _lock:
+        return {
+            model: dict(m, avg_seconds=m['total_seconds'] / m['calls'] if m['calls'] else 0.0)
+            for model, m in _metrics.items()
+        }
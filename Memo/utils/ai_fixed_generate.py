@@ -4,6 +4,11 @@ Gemini AI による固定ページコンテンツ生成
 import json
 import re
 from flask import current_app
+from google.genai.types import GenerateContentConfig
+from utils.ai_client import generate_content
+
+# 再生成のたびに別の文章を出したいので AI 結果キャッシュ（utils.ai_cache）は使わない
+MODEL_NAME = "gemini-2.5-flash-lite"
 
 
 def generate_fixed_page(title: str, existing_keys: list) -> dict | None:
@@ -19,11 +24,6 @@ def generate_fixed_page(title: str, existing_keys: list) -> dict | None:
         return None
 
     try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-
-        client = genai.Client(api_key=api_key)
-        MODEL_NAME = "gemini-2.5-flash-lite"
         config = GenerateContentConfig(
             max_output_tokens=2048,
             temperature=0.7,
@@ -55,10 +55,11 @@ def generate_fixed_page(title: str, existing_keys: list) -> dict | None:
 必ず以下のJSONのみを出力してください（説明文は不要）:
 {{"key": "スラッグ", "content": "Markdown本文", "summary": "要約文"}}"""
 
-        response = client.models.generate_content(
+        response = generate_content(
             model=MODEL_NAME,
             contents=prompt,
             config=config,
+            timeout=60,
         )
 
         text = response.text.strip()
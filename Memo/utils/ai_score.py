@@ -4,8 +4,15 @@ Gemini AI による記事品質スコアリング
 import json
 import re
 from flask import current_app
+from google.genai.types import GenerateContentConfig
+from utils.ai_client import generate_content
+from utils.ai_cache import ai_cached
 
+MODEL_NAME = "gemini-2.5-flash-lite"
+PROMPT_VERSION = 1  # プロンプト・後処理を変更したら上げる（AI 結果キャッシュの無効化）
 
+
+@ai_cached('analyze_memo_quality', MODEL_NAME, PROMPT_VERSION)
 def analyze_memo_quality(title: str, content: str) -> dict | None:
     """
     Gemini APIで記事品質をスコアリングする。
@@ -19,11 +26,6 @@ def analyze_memo_quality(title: str, content: str) -> dict | None:
         return None
 
     try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-
-        client = genai.Client(api_key=api_key)
-        MODEL_NAME = "gemini-2.5-flash-lite"
         config = GenerateContentConfig(
             max_output_tokens=256,
             temperature=0.3,
@@ -46,10 +48,11 @@ def analyze_memo_quality(title: str, content: str) -> dict | None:
 必ず以下のJSON形式のみを出力してください。説明文は不要です。
 {{"information": 数値, "writing": 数値, "readability": 数値}}"""
 
-        response = client.models.generate_content(
+        response = generate_content(
             model=MODEL_NAME,
             contents=prompt,
             config=config,
+            timeout=30,
         )
 
         text = response.text.strip()
@@ -4,6 +4,8 @@ Gemini 2.0 Flash (image generation) によるユーザーサムネイル画像
 """
 import io
 from flask import current_app
+from google.genai.types import GenerateContentConfig
+from utils.ai_client import generate_content
 
 
 def _apply_circular_mask(image_bytes: bytes) -> bytes:
@@ -49,10 +51,6 @@ def generate_thumb_image() -> bytes | None:
         return None
 
     try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-
-        client = genai.Client(api_key=api_key)
         MODEL_NAME = "gemini-2.0-flash-exp-image-generation"
 
         prompt = (
@@ -66,12 +64,13 @@ def generate_thumb_image() -> bytes | None:
             "Python and Flask code is written in various places in the background as decoration."
         )
 
-        response = client.models.generate_content(
+        response = generate_content(
             model=MODEL_NAME,
             contents=prompt,
             config=GenerateContentConfig(
                 response_modalities=["IMAGE", "TEXT"],
             ),
+            timeout=90,
         )
 
         for part in response.candidates[0].content.parts:
@@ -3,6 +3,12 @@ Gemini AI による記事英語翻訳（SEO最適化翻訳）
 """
 import re
 from flask import current_app
+from google.genai.types import GenerateContentConfig
+from utils.ai_client import generate_content
+from utils.ai_cache import ai_cached
+
+MODEL_NAME = "gemini-2.5-flash-lite"
+PROMPT_VERSION = 1  # プロンプト・後処理を変更したら上げる（AI 結果キャッシュの無効化）
 
 
 def translate_memo_to_english(title: str, content: str) -> dict | None:
@@ -16,23 +22,32 @@ def translate_memo_to_english(title: str, content: str) -> dict | None:
         }
         or None（エラー時）
     """
+    try:
+        return request_translation(title, content)
+    except Exception as e:
+        print(f"######## Gemini翻訳 API呼び出し失敗: {e} ########")
+        return None
+
+
+@ai_cached('translate_memo_to_english', MODEL_NAME, PROMPT_VERSION)
+def request_translation(title: str, content: str) -> dict | None:
+    """
+    translate_memo_to_english の本体。API 呼び出しの例外はそのまま送出する。
+
+    一括翻訳（utils/ai_batch.py）で 429 を判別してリトライするために分けている。
+    APIキー未設定・応答のパース失敗は None を返す。
+    """
     api_key = current_app.config.get('GOOGLE_API_KEY', '')
     if not api_key:
         print("######## GOOGLE_API_KEY が未設定です ########")
         return None
 
-    try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-
-        client = genai.Client(api_key=api_key)
-        MODEL_NAME = "gemini-2.5-flash-lite"
-        config = GenerateContentConfig(
-            max_output_tokens=4096,
-            temperature=0.3,
-        )
+    config = GenerateContentConfig(
+        max_output_tokens=4096,
+        temperature=0.3,
+    )
 
-        prompt = f"""あなたは「テック系コンテンツのSEO最適化英語翻訳者」です。
+    prompt = f"""あなたは「テック系コンテンツのSEO最適化英語翻訳者」です。
 
 以下の日本語技術ブログ記事を英語に翻訳してください。
 
@@ -56,34 +71,31 @@ TITLE: （英語SEOタイトルをここに1行で）
 ---BODY---
 （英語Markdown本文をここに。Markdownの書式はそのまま維持）"""
 
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt,
-            config=config,
-        )
-
-        text = response.text.strip()
+    response = generate_content(
+        model=MODEL_NAME,
+        contents=prompt,
+        config=config,
+        timeout=120,
+    )
 
-        # TITLE: と ---BODY（末尾の---は省略されることがある）で分割
-        title_match = re.search(r'^TITLE:\s*(.+)$', text, re.MULTILINE)
-        body_match  = re.search(r'---BODY-*\s*([\s\S]+)', text)
+    text = response.text.strip()
 
-        if not title_match or not body_match:
-            print(f"######## Gemini翻訳: パース失敗: {text[:200]} ########")
-            return None
+    # TITLE: と ---BODY（末尾の---は省略されることがある）で分割
+    title_match = re.search(r'^TITLE:\s*(.+)$', text, re.MULTILINE)
+    body_match  = re.search(r'---BODY-*\s*([\s\S]+)', text)
 
-        translated_title = title_match.group(1).strip()
-        translated_body  = body_match.group(1).strip()
+    if not title_match or not body_match:
+        print(f"######## Gemini翻訳: パース失敗: {text[:200]} ########")
+        return None
 
-        if not translated_title or not translated_body:
-            print(f"######## Gemini翻訳: 翻訳結果が空です ########")
-            return None
+    translated_title = title_match.group(1).strip()
+    translated_body  = body_match.group(1).strip()
 
-        return {
-            "translated_title": translated_title,
-            "translated_body": translated_body,
-        }
-
-    except Exception as e:
-        print(f"######## Gemini翻訳 API呼び出し失敗: {e} ########")
+    if not translated_title or not translated_body:
+        print(f"######## Gemini翻訳: 翻訳結果が空です ########")
         return None
+
+    return {
+        "translated_title": translated_title,
+        "translated_body": translated_body,
+    }
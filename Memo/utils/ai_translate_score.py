@@ -5,8 +5,20 @@ CLAUDE.translate.md の評価モデルに基づく100点満点スコアリング
 import json
 import re
 from flask import current_app
+from google.genai.types import GenerateContentConfig
+from utils.ai_client import generate_content
+from utils.ai_cache import ai_cached
 
+MODEL_NAME = "gemini-2.5-flash-lite"
+PROMPT_VERSION = 1  # プロンプト・後処理を変更したら上げる（AI 結果キャッシュの無効化）
 
+
+def _score_key(title, content, like_count=0, view_count=0):
+    """キャッシュキー用の入力。いいね数・閲覧数は桁数で丸め、閲覧のたびにキャッシュが外れないようにする。"""
+    return [title, content, len(str(like_count or 0)), len(str(view_count or 0))]
+
+
+@ai_cached('score_translate_value', MODEL_NAME, PROMPT_VERSION, key_func=_score_key)
 def score_translate_value(
     title: str,
     content: str,
@@ -37,11 +49,6 @@ def score_translate_value(
         return None
 
     try:
-        from google import genai
-        from google.genai.types import GenerateContentConfig
-
-        client = genai.Client(api_key=api_key)
-        MODEL_NAME = "gemini-2.5-flash-lite"
         config = GenerateContentConfig(
             max_output_tokens=512,
             temperature=0.3,
@@ -101,10 +108,11 @@ def score_translate_value(
     "translate_reason": "判定理由（80文字以内）"
 }}"""
 
-        response = client.models.generate_content(
+        response = generate_content(
             model=MODEL_NAME,
             contents=prompt,
             config=config,
+            timeout=30,
         )
 
         text = response.text.strip()
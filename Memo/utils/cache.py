@@ -0,0 +1,140 @@
+"""
+アプリ共通のキー・バリューキャッシュ
+- MemoryCache: プロセス内 TTL キャッシュ（デフォルト）
+- RedisCache: CACHE_REDIS_URL 設定時の共有キャッシュ（gunicorn 複数ワーカー間で無効化を共有）
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class MemoryCache:
+    """
+    スレッドセーフなプロセス内 TTL + LRU キャッシュ。
+
+    maxbytes を指定すると、sizeof(value) の合計がそれを超えないよう古いものから追い出す
+    （ページ本文のような大きな値用）。
+    """
+
+    def __init__(self, maxsize: int = 1024, maxbytes: int | None = None, sizeof=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._sizes = {}             # key -> sizeof(value)（maxbytes 指定時のみ）
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _pop(self, key):
+        self._data.pop(key, None)
+        self._total -= self._sizes.pop(key, 0)
+
+    def _evict(self):
+        while len(self._data) > self.maxsize or (self.maxbytes is not None and self._total > self.maxbytes):
+            self._pop(next(iter(self._data)))
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: int | None = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self._sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._pop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = (expires_at, value)
+            if size:
+                self._sizes[key] = size
+                self._total += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                self._pop(key)
+
+    def incr(self, key) -> int:
+        with self._lock:
+            expires_at, value = self._data.get(key, (None, 0))
+            self._data[key] = (expires_at, value + 1)
+            self._data.move_to_end(key)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._total = 0
+
+
+class RedisCache:
+    """Redis をバックエンドにした共有キャッシュ（値は pickle で保存）。"""
+
+    def __init__(self, url: str, prefix: str = 'memo:'):
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return default
+        if raw.isdigit():
+            return int(raw)  # incr() で保存したカウンタ
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl: int | None = None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix: str):
+        keys = list(self._client.scan_iter(match=f'{self.prefix}{prefix}*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def incr(self, key) -> int:
+        return int(self._client.incr(self.prefix + key))
+
+    def clear(self):
+        self.delete_prefix('')
+
+
+def init_cache(app):
+    """アプリにキャッシュを登録する。CACHE_REDIS_URL 未設定・redis 未導入時はプロセス内キャッシュ。"""
+    url = app.config.get('CACHE_REDIS_URL', '')
+    if url and REDIS_AVAILABLE:
+        cache = RedisCache(url)
+    else:
+        if url:
+            app.logger.warning('redis 未インストールのため CACHE_REDIS_URL を無視してプロセス内キャッシュを使用')
+        cache = MemoryCache(maxsize=app.config.get('CACHE_MAXSIZE', 1024))
+    app.extensions['memo_cache'] = cache
+    return cache
+
+
+def get_cache():
+    """現在のアプリに登録されたキャッシュを返す。"""
+    return current_app.extensions['memo_cache']
@@ -0,0 +1,70 @@
+"""
+Jinja テンプレートの部分キャッシュ（{% cache %} タグ）
+
+    {% cache 'public/aside', 300, tags=['ranking'] %} ... {% endcache %}
+
+- ブロック内の描画結果をキャッシュに保存し、次回からは描画せずに返す
+- キーには表示言語（is_english）を自動で含める
+- tags に指定した名前ごとにバージョンを持ち、invalidate_fragments(tag) で一括無効化する
+- 保存先は get/set/incr を持つオブジェクト（既定は utils.cache の共有キャッシュ）。
+  init_fragment_cache(app, store=...) で差し替えられる
+"""
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from utils.cache import get_cache
+
+_TAG_KEY = 'frag:tag:{}'
+
+
+def _store():
+    store = current_app.extensions.get('fragment_cache_store')
+    return store() if callable(store) else store
+
+
+def invalidate_fragments(*tags: str) -> None:
+    """タグの付いた部分キャッシュを無効化する（タグのバージョンを進める）。"""
+    store = _store()
+    for tag in tags:
+        store.incr(_TAG_KEY.format(tag))
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache キー[, 秒数][, tags=[...]] %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = nodes.Const(None)
+        tags = nodes.List([])
+        while parser.stream.skip_if('comma'):
+            if parser.stream.current.test('name:tags') and parser.stream.look().test('assign'):
+                next(parser.stream)
+                next(parser.stream)
+                tags = parser.parse_expression()
+            else:
+                ttl = parser.parse_expression()
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        args = [key, ttl, tags, nodes.ContextReference()]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, tags, context, caller):
+        if not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+            return caller()
+        store = _store()
+        lang = 'en' if context.get('is_english') else 'ja'
+        versions = ':'.join(f'{tag}{store.get(_TAG_KEY.format(tag), 0)}' for tag in tags)
+        cache_key = f'frag:{lang}:{key}:{versions}'
+        html = store.get(cache_key)
+        if html is None:
+            html = caller()
+            store.set(cache_key, html, ttl=ttl or current_app.config.get('FRAGMENT_CACHE_TTL', 600))
+        return html
+
+
+def init_fragment_cache(app, store=None):
+    """アプリのテンプレート環境に {% cache %} タグを登録する。store 省略時は共有キャッシュ。"""
+    app.extensions['fragment_cache_store'] = store or get_cache
+    app.jinja_env.add_extension(FragmentCacheExtension)
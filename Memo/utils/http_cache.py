@@ -0,0 +1,140 @@
+"""
+未ログインユーザー向けの公開ページのレスポンスキャッシュ（ETag / 条件付き GET）
+
+- 対象は HTTP_CACHE_POLICIES に載っているエンドポイント・ブループリントへの未ログインの GET のみ
+- キャッシュキーはパスと HTTP_CACHE_QUERY_PARAMS に載っているクエリ、htmx 要求かどうか
+  （それ以外のクエリ文字列は描画に使われないので無視し、?utm_... などでエントリを増やさない）
+- 描画済みの本文は、ランキングなどの小さな値と追い出し合わないよう専用のキャッシュ
+  （プロセス内では件数 HTTP_CACHE_MAXSIZE・合計サイズ HTTP_CACHE_MAX_BYTES で上限）に保存する
+- 本文から弱い ETag を作り、If-None-Match が一致すれば 304 を返す
+- Cache-Control は対象ごとの max-age（Vary: Cookie でログイン後は使い回されない）
+- 記事・いいね・固定ページ・カテゴリーの変更がコミットされたらバージョンを進めて一括で無効化する
+"""
+import hashlib
+from itertools import chain
+from urllib.parse import urlencode
+from flask import Response, current_app, g, has_app_context, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Memo, Favorite, FixedPage, Category
+from utils.cache import REDIS_AVAILABLE, MemoryCache, RedisCache, get_cache
+
+HTTP_CACHE_VERSION_KEY = 'http:version'
+
+# 変更されたらページキャッシュを無効化するモデル
+_WATCHED_MODELS = (Memo, Favorite, FixedPage, Category)
+_HIT_HOOKS = {}  # endpoint -> [hook(view_args)]
+
+
+def on_cache_hit(*endpoints):
+    """キャッシュから返したときにも行う処理（閲覧数の加算など）を登録するデコレータ。"""
+    def decorator(fn):
+        for endpoint in endpoints:
+            _HIT_HOOKS.setdefault(endpoint, []).append(fn)
+        return fn
+    return decorator
+
+
+def invalidate_http_cache() -> None:
+    """ページキャッシュのバージョンを進める（古いキーは TTL で消える）。"""
+    get_cache().incr(HTTP_CACHE_VERSION_KEY)
+
+
+def _policy() -> int | None:
+    """このリクエストの max-age 秒数。キャッシュ対象外なら None。"""
+    if not current_app.config.get('HTTP_CACHE_ENABLED', True) or request.method not in ('GET', 'HEAD'):
+        return None
+    policies = current_app.config.get('HTTP_CACHE_POLICIES', {})
+    max_age = policies.get(request.endpoint, policies.get(request.blueprint))
+    if max_age is None:
+        return None
+    # ログイン中・フラッシュメッセージ表示待ちのページは人ごとに内容が違う
+    if current_user.is_authenticated or '_flashes' in session:
+        return None
+    return max_age
+
+
+def get_page_cache():
+    """ページ本文用のキャッシュを返す。"""
+    return current_app.extensions['http_page_cache']
+
+
+def _cache_key() -> str:
+    version = get_cache().get(HTTP_CACHE_VERSION_KEY, 0)
+    hx = '1' if request.headers.get('HX-Request') else '0'
+    allowed = current_app.config.get('HTTP_CACHE_QUERY_PARAMS', ())
+    query = urlencode(sorted((k, v) for k, v in request.args.items(multi=True) if k in allowed))
+    return f'http:page:{version}:{hx}:{request.path}?{query}'
+
+
+def _finalize(response: Response, etag: str, max_age: int) -> Response:
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.vary.update(('Cookie', 'HX-Request'))
+    return response.make_conditional(request)
+
+
+def _serve_from_cache():
+    max_age = _policy()
+    if max_age is None:
+        return None
+    key = _cache_key()
+    g.http_cache = (key, max_age)
+    entry = get_page_cache().get(key)
+    if entry is None:
+        return None
+    for hook in _HIT_HOOKS.get(request.endpoint, []):
+        hook(request.view_args or {})
+    g.http_cache = None
+    response = Response(entry['body'], status=200, mimetype=entry['mimetype'])
+    return _finalize(response, entry['etag'], max_age)
+
+
+def _store_response(response: Response) -> Response:
+    state = g.pop('http_cache', None)
+    if not state or response.status_code != 200 or response.is_streamed:
+        return response
+    # 描画中にセッションが変わった（CSRF トークン発行など）ページは共有しない
+    if session.modified:
+        return response
+    key, max_age = state
+    body = response.get_data()
+    etag = hashlib.sha1(body).hexdigest()[:20]
+    get_page_cache().set(key, {'body': body, 'mimetype': response.mimetype, 'etag': etag},
+                    ttl=current_app.config.get('HTTP_CACHE_TTL', 600))
+    return _finalize(response, etag, max_age)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_changes(session_, flush_context):
+    if any(isinstance(obj, _WATCHED_MODELS) for obj in chain(session_.new, session_.dirty, session_.deleted)):
+        session_.info['http_cache_stale'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session_):
+    if session_.info.pop('http_cache_stale', False) and has_app_context():
+        invalidate_http_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(session_):
+    session_.info.pop('http_cache_stale', None)
+
+
+def init_http_cache(app):
+    """アプリにページキャッシュのフックを登録する。CACHE_REDIS_URL 設定時は本文も Redis に保存する。"""
+    url = app.config.get('CACHE_REDIS_URL', '')
+    if url and REDIS_AVAILABLE:
+        store = RedisCache(url, prefix='memo:http:')
+    else:
+        store = MemoryCache(
+            maxsize=app.config.get('HTTP_CACHE_MAXSIZE', 256),
+            maxbytes=app.config.get('HTTP_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+            sizeof=lambda entry: len(entry['body']),
+        )
+    app.extensions['http_page_cache'] = store
+    app.before_request(_serve_from_cache)
+    app.after_request(_store_response)
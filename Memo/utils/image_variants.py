@@ -0,0 +1,145 @@
+"""
+記事画像の派生画像（リサイズ・WebP / AVIF）
+
+- アップロード画像は向きを補正して EXIF（撮影位置など）を除き、最大幅に縮めて保存する
+- 幅ごとの縮小版を WebP / AVIF で作り、Memo.image_variants に記録する
+- テンプレートは layout/_picture.j2 の memo_picture マクロで <picture> + srcset を出力し、
+  ブラウザが表示幅と対応形式に合うファイルを選ぶ（派生画像が無い記事は元画像のまま）
+
+縮小版の生成（特に AVIF）は重いため、記事保存後にバックグラウンドジョブで行う。
+"""
+import io
+import os
+from flask import current_app
+from PIL import Image, ImageOps, features
+from models import db, Memo
+from utils.job_queue import JobError, enqueue, job_handler, on_job_committed
+from utils.ranking import invalidate_ranking
+from utils.storage import get_storage, upload_url
+from utils.upload import save_upload
+
+# <source> の出力順（ブラウザは先頭から対応している形式を選ぶ）
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+_SAVE_OPTIONS = {
+    'avif': {'quality': 60},
+    'webp': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 88, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+
+def variant_formats() -> list[str]:
+    """設定された形式のうち、この環境の Pillow でエンコードできるもの。"""
+    return [
+        fmt for fmt in current_app.config.get('IMAGE_VARIANT_FORMATS', ['avif', 'webp'])
+        if fmt in MIME_TYPES and features.check(fmt)
+    ]
+
+
+def _strip_and_resize(src: str, dest: str, kind: str) -> None:
+    """向きを補正して EXIF を除き、IMAGE_MAX_WIDTH に縮めて保存する（GIF はそのまま）。"""
+    if kind == 'gif':
+        # GIF アニメーションは再エンコードするとコマが落ちるためそのまま保存する（EXIF は持たない）
+        os.replace(src, dest)
+        return
+    with Image.open(src) as original:
+        fmt = 'PNG' if kind == 'png' else 'JPEG'
+        icc_profile = original.info.get('icc_profile')
+        img = ImageOps.exif_transpose(original)
+        max_width = current_app.config.get('IMAGE_MAX_WIDTH', 1920)
+        img.thumbnail((max_width, max_width * 4))
+        if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        # exif を渡さずに保存することで位置情報などのメタデータを落とす
+        img.save(dest, fmt, icc_profile=icc_profile, **_SAVE_OPTIONS[fmt])
+
+
+def save_memo_image(file) -> str | None:
+    """
+    記事画像を EXIF を除いて保存する（同じ画像は utils.upload で重複排除）。
+
+    Returns: 保存名。画像として読めないファイルは保存せず None
+    """
+    return save_upload(file, 'memo', process=_strip_and_resize)
+
+
+def supports_variants(filename: str | None) -> bool:
+    """縮小版を作る対象か（既定画像・GIF は対象外。GIF の縮小版は1コマ目だけになりアニメーションが止まる）。"""
+    return bool(filename) and filename != 'nofile.jpg' and not filename.lower().endswith('.gif')
+
+
+def build_variants(filename: str) -> dict | None:
+    """
+    記事画像の縮小版を幅・形式ごとに作る（同名ファイルが既にあれば作り直さない）。
+
+    Returns: {"width", "height", "sources": {形式: [[幅, ファイル名], ...]}}。元画像が無い・対象外なら None
+    """
+    storage = get_storage()
+    if not supports_variants(filename) or not storage.exists('memo', filename):
+        return None
+    stem = os.path.splitext(filename)[0]
+    existing = set(storage.list('memo', prefix=stem + '-'))
+    with storage.open('memo', filename) as fp, Image.open(fp) as original:
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        width, height = img.size
+        # 元画像の幅（IMAGE_MAX_WIDTH まで）を最大の候補にし、それより小さい設定幅を加える
+        largest = min(width, current_app.config.get('IMAGE_MAX_WIDTH', 1920))
+        configured = current_app.config.get('IMAGE_VARIANT_WIDTHS', [320, 640, 1280])
+        widths = sorted({w for w in configured if w < largest} | {largest})
+        sources = {}
+        for fmt in variant_formats():
+            sources[fmt] = []
+            for w in widths:
+                name = f"{stem}-{w}.{fmt}"
+                if name not in existing:
+                    resized = img if w == width else img.resize((w, round(height * w / width)), Image.LANCZOS)
+                    buf = io.BytesIO()
+                    resized.save(buf, fmt.upper(), **_SAVE_OPTIONS[fmt])
+                    storage.save_bytes('memo', name, buf.getvalue())
+                sources[fmt].append([w, name])
+    return {'width': width, 'height': height, 'sources': sources}
+
+
+def image_sources(variants: dict | None) -> list[tuple[str, str]]:
+    """テンプレート用: image_variants を (MIME タイプ, srcset) の並びにする。"""
+    if not variants:
+        return []
+    return [
+        (MIME_TYPES[fmt], ', '.join(
+            f"{upload_url('memo', name)} {w}w" for w, name in variants['sources'][fmt]
+        ))
+        for fmt in MIME_TYPES
+        if variants['sources'].get(fmt)
+    ]
+
+
+def request_variants(memo: Memo) -> None:
+    """記事画像の縮小版の生成をジョブに積む（既定画像・GIF の記事は対象外）。"""
+    if supports_variants(memo.image_filename):
+        enqueue('image_variants', {'memo_id': memo.id, 'filename': memo.image_filename}, user_id=memo.user_id)
+
+
+@job_handler('image_variants')
+def _build_memo_variants(job):
+    memo = db.session.get(Memo, job.payload.get('memo_id'))
+    if memo is None:
+        raise JobError('記事が見つかりません', 404)
+    # 積んでから実行までの間に画像が差し替えられていたら何もしない（新しい画像のジョブが別にある）
+    if memo.image_filename != job.payload.get('filename'):
+        return {'skipped': True}
+    memo.image_variants = build_variants(memo.image_filename)
+    return {'image_variants': memo.image_variants}
+
+
+@on_job_committed
+def _refresh_ranking(job):
+    """サイドバーのランキング（キャッシュ済みスナップショット）にも srcset を反映する。"""
+    if job.kind == 'image_variants':
+        invalidate_ranking()
+
+
+def init_image_variants(app):
+    """テンプレートフィルタ image_sources を登録する。"""
+    app.add_template_filter(image_sources)
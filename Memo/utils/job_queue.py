@@ -0,0 +1,243 @@
+"""
+DB をキューにしたバックグラウンドジョブ（外部ブローカー不要）
+
+時間のかかる処理（Gemini API 呼び出しなど）を background_jobs テーブルに積み、
+リクエストスレッドの外で実行する。呼び出し側はジョブ ID でステータスをポーリングする。
+
+実行方式（JOB_QUEUE_MODE）:
+- thread: 各プロセス内のデーモンスレッドが実行（デフォルト。追加プロセス不要）
+          最初のリクエストで起動し、デプロイ・クラッシュで取り残された分も拾い直す
+- worker: `flask run-jobs` で起動した専用ワーカープロセスが実行（Web プロセスは積むだけ）
+- eager:  enqueue() の中で即時実行（テスト用）
+"""
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, update
+from models import db, BackgroundJob
+
+_HANDLERS = {}      # kind -> handler(job) -> dict
+_DONE_HOOKS = []    # ジョブ成功時（コミット前）に呼ぶ hook(job)
+_FAILED_HOOKS = []  # ジョブ失敗時（コミット前）に呼ぶ hook(job)
+_COMMITTED_HOOKS = []  # ジョブ成功のコミット後に呼ぶ hook(job)
+
+
+class JobError(Exception):
+    """ジョブの失敗（message はそのまま利用者に返す）。"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def job_handler(kind: str):
+    """ジョブ種別のハンドラを登録するデコレータ。ハンドラは結果の dict を返すか JobError を送出する。"""
+    def decorator(fn):
+        _HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def on_job_done(fn):
+    """ジョブ成功時（結果保存前・同一トランザクション）に呼ぶ処理を登録する。"""
+    _DONE_HOOKS.append(fn)
+    return fn
+
+
+def on_job_failed(fn):
+    """ジョブ失敗時（エラー保存と同一トランザクション）に呼ぶ処理（確保したポイントの返却など）を登録する。"""
+    _FAILED_HOOKS.append(fn)
+    return fn
+
+
+def on_job_committed(fn):
+    """ジョブ成功のコミット後に呼ぶ処理（キャッシュ無効化など）を登録する。"""
+    _COMMITTED_HOOKS.append(fn)
+    return fn
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def claim_next() -> BackgroundJob | None:
+    """
+    待機中のジョブを1件取り出して running にする。
+
+    複数ワーカーで同じジョブを取り合わないよう、status='queued' を条件にした UPDATE の
+    更新件数で取得できたかを判定する（SQLite / PostgreSQL 共通）。
+    """
+    while True:
+        job_id = db.session.execute(
+            select(BackgroundJob.id)
+            .where(BackgroundJob.status == 'queued')
+            .order_by(BackgroundJob.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = db.session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, BackgroundJob.status == 'queued')
+            .values(status='running', started_at=_now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(BackgroundJob, job_id)
+
+
+def run_job(job: BackgroundJob) -> BackgroundJob:
+    """ジョブを実行して結果（done / error）を保存する。"""
+    handler = _HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise JobError(f'未登録のジョブ種別です: {job.kind}')
+        result = handler(job)
+        for hook in _DONE_HOOKS:
+            hook(job)
+        job.result = result
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job.id)
+        job.status = 'error'
+        if isinstance(e, JobError):
+            job.error = e.message
+            job.result = {'status_code': e.status_code}
+        else:
+            print(f"######## バックグラウンドジョブ失敗: [{job.kind}#{job.id}] {e} ########")
+            job.error = '処理中にエラーが発生しました'
+            job.result = {'status_code': 500}
+        for hook in _FAILED_HOOKS:
+            hook(job)
+    job.finished_at = _now()
+    db.session.commit()
+    if job.status == 'done':
+        for hook in _COMMITTED_HOOKS:
+            hook(job)
+    return job
+
+
+def run_pending(limit: int | None = None) -> int:
+    """待機中のジョブを順に実行する。Returns: 実行件数"""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        job = run_job(job)
+        count += 1
+    return count
+
+
+def requeue_stale(seconds: int) -> int:
+    """running のまま seconds 秒以上経過したジョブ（ワーカー停止で取り残された分）を待機に戻す。"""
+    count = db.session.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.status == 'running', BackgroundJob.started_at < _now() - timedelta(seconds=seconds))
+        .values(status='queued', started_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+class JobWorker:
+    """プロセス内でジョブを実行するデーモンスレッド（thread モード用）。"""
+
+    def __init__(self, app, poll_interval: float = 2.0, stale_seconds: int = 600):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        atexit.register(self.stop)
+
+    def _ensure_thread(self):
+        """現在のプロセスでスレッドが動いていなければ起動する（fork 後は作り直す）。"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, name='job-worker', daemon=True).start()
+
+    def notify(self):
+        """新しいジョブを積んだことをスレッドに知らせる。"""
+        self._ensure_thread()
+        self._wake.set()
+
+    def _run(self):
+        # 起動時に、前回のプロセスが running のまま残したジョブを待機に戻す（待機中の分は下のループで実行）
+        try:
+            with self.app.app_context():
+                requeue_stale(self.stale_seconds)
+        except Exception as e:
+            print(f"######## ジョブワーカーエラー: {e} ########")
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    run_pending()
+            except Exception as e:
+                print(f"######## ジョブワーカーエラー: {e} ########")
+            self._wake.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+def init_job_queue(app):
+    """アプリにジョブキューを登録する。"""
+    worker = JobWorker(
+        app,
+        poll_interval=app.config.get('JOB_POLL_INTERVAL', 2.0),
+        stale_seconds=app.config.get('JOB_STALE_SECONDS', 600),
+    )
+    app.extensions['job_worker'] = worker
+
+    @app.before_request
+    def _start_job_worker():
+        # enqueue() を待たずに、再起動前から待機しているジョブの実行を始める
+        if current_app.config.get('JOB_QUEUE_MODE', 'thread') == 'thread':
+            worker._ensure_thread()
+
+    return worker
+
+
+def enqueue(kind: str, payload: dict | None = None, user_id: int | None = None, cost: int = 0) -> BackgroundJob:
+    """ジョブを積む（コミットする）。eager モードではその場で実行して結果まで保存する。"""
+    job = BackgroundJob(kind=kind, payload=payload or {}, user_id=user_id, cost=cost, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    mode = current_app.config.get('JOB_QUEUE_MODE', 'thread')
+    if mode == 'eager':
+        job.status = 'running'
+        job.started_at = _now()
+        job = run_job(job)
+    elif mode == 'thread':
+        current_app.extensions['job_worker'].notify()
+    return job
+
+
+def work(app, poll_interval: float = 2.0, stale_seconds: int = 600, once: bool = False) -> None:
+    """専用ワーカープロセスのメインループ（flask run-jobs）。"""
+    with app.app_context():
+        requeue_stale(stale_seconds)
+        while True:
+            count = run_pending()
+            if once:
+                return
+            if not count:
+                time.sleep(poll_interval)
@@ -0,0 +1,50 @@
+"""
+Memo.like_count（favorites 件数の非正規化カラム）の増減・再集計
+"""
+from sqlalchemy import case, func, update
+from models import db, Memo, Favorite
+
+
+def adjust_like_count(memo_ids, delta: int) -> None:
+    """
+    指定記事の like_count を delta だけ増減する。
+
+    SQL 側で `like_count = like_count + :delta` を発行するため、
+    同時リクエストでも読み取り→書き戻しの競合が起きない。コミットは呼び出し側で行う。
+    """
+    if isinstance(memo_ids, int):
+        memo_ids = [memo_ids]
+    memo_ids = list(memo_ids)
+    if not memo_ids or not delta:
+        return
+    db.session.execute(
+        update(Memo)
+        .where(Memo.id.in_(memo_ids))
+        # 負数にはしない（SQLite/PostgreSQL 共通で使える CASE で下限 0 にクランプ）
+        .values(like_count=case((Memo.like_count + delta < 0, 0), else_=Memo.like_count + delta))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_like_counts() -> int:
+    """
+    favorites テーブルを集計し直して like_count のズレを補正する。
+
+    Returns:
+        補正した記事件数
+    """
+    actual = dict(
+        db.session.query(Favorite.memo_id, func.count(Favorite.id))
+        .group_by(Favorite.memo_id)
+        .all()
+    )
+    fixed = 0
+    for memo_id, like_count in db.session.query(Memo.id, Memo.like_count).all():
+        expected = actual.get(memo_id, 0)
+        if like_count != expected:
+            db.session.execute(
+                update(Memo).where(Memo.id == memo_id).values(like_count=expected)
+            )
+            fixed += 1
+    db.session.commit()
+    return fixed
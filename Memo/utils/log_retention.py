@@ -0,0 +1,113 @@
+"""
+app_logs の保持期間管理（flask rollup-logs）
+
+保持期間より古いログを古い順にチャンク単位で読み、1時間・レベル・モジュールごとの件数を
+app_log_rollups に加算してから元の行を削除する。加算と削除は同じトランザクションで行うため、
+途中で止まっても二重に数えることはなく、再実行すれば続きから処理される。
+"""
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from models import db, AppLog, AppLogRollup
+
+
+class RetentionResult:
+    """処理結果の集計。"""
+
+    def __init__(self):
+        self.deleted = 0
+        self.reclaimed_bytes = 0
+        self.rollups = 0
+        self.archived = 0
+
+    def report(self) -> str:
+        return (
+            f'削除: {self.deleted} 件（約 {self.reclaimed_bytes / 1024:,.1f} KB）/ '
+            f'集計行の更新: {self.rollups} 件 / アーカイブ: {self.archived} 件'
+        )
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLiteはnaive datetimeで返すことがあるため、aware化して統一
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _hour(dt: datetime) -> datetime:
+    return _aware(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def _add_rollups(counts: dict) -> int:
+    """{(hour, level, module): 件数} を app_log_rollups に加算する（コミットは呼び出し側）。"""
+    for (hour, level, module), n in counts.items():
+        rollup = AppLogRollup.query.filter_by(hour=hour, level=level, module=module).first()
+        if rollup:
+            rollup.count += n
+        else:
+            db.session.add(AppLogRollup(hour=hour, level=level, module=module, count=n))
+    return len(counts)
+
+
+def rollup_logs(retention_days: int, chunk_size: int = 5000, archive_path: str | None = None,
+                log=print) -> RetentionResult:
+    """
+    retention_days より古い app_logs を集計テーブルに畳み込んで削除する。
+
+    Args:
+        retention_days: 生ログを残す日数
+        chunk_size: 1トランザクションで処理する行数（削除時のロック時間を抑える）
+        archive_path: 指定時は削除前の行を JSON Lines（gzip）で追記保存する
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = RetentionResult()
+    archive = gzip.open(archive_path, 'at', encoding='utf-8') if archive_path else None
+    try:
+        while True:
+            columns = [AppLog.id, AppLog.created_at, AppLog.level, AppLog.module,
+                       func.length(AppLog.message).label('size')]
+            if archive:
+                columns.append(AppLog.message)
+            rows = (
+                db.session.query(*columns)
+                .filter(AppLog.created_at < cutoff)
+                .order_by(AppLog.created_at, AppLog.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            counts = {}
+            for row in rows:
+                key = (_hour(row.created_at), row.level, row.module)
+                counts[key] = counts.get(key, 0) + 1
+                result.reclaimed_bytes += (row.size or 0) + len(row.module) + len(row.level)
+                if archive:
+                    archive.write(json.dumps({
+                        'id': row.id, 'created_at': _aware(row.created_at).isoformat(),
+                        'level': row.level, 'module': row.module, 'message': row.message,
+                    }, ensure_ascii=False) + '\n')
+            if archive:
+                archive.flush()  # 削除をコミットする前にアーカイブを書き出しておく
+                result.archived += len(rows)
+
+            result.rollups += _add_rollups(counts)
+            ids = [row.id for row in rows]
+            db.session.query(AppLog).filter(AppLog.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            result.deleted += len(rows)
+            log(f'  ... {result.deleted} 件処理（{_aware(rows[-1].created_at):%Y-%m-%d %H:%M} まで）')
+    finally:
+        if archive:
+            archive.close()
+    return result
+
+
+def rollup_level_counts(since: datetime, module: str = '') -> dict:
+    """since 以降の集計済みログのレベル別件数 {level: 件数}（ログ可視化の長期間表示用）。"""
+    query = db.session.query(AppLogRollup.level, func.sum(AppLogRollup.count)).filter(
+        AppLogRollup.hour >= _hour(since)
+    )
+    if module:
+        query = query.filter(AppLogRollup.module.startswith(module, autoescape=True))
+    return {level: int(n or 0) for level, n in query.group_by(AppLogRollup.level).all()}
@@ -1,81 +1,288 @@
+import atexit
+import hashlib
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from collections import deque
+from html import escape
+from logging.handlers import QueueHandler, RotatingFileHandler
 from datetime import datetime, timezone
 
+_STOP = object()  # 書き込みスレッドの終了指示
+
+
+class ResendTransport:
+    """エラー通知メールの送信手段（Resend API）。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def send(self, subject: str, text: str, html: str) -> bool:
+        import resend as _resend
+        api_key   = self.app.config.get('RESEND_API_KEY', '')
+        from_addr = self.app.config.get('RESEND_FROM_EMAIL', '')
+        to_addr   = self.app.config.get('MAIL_USERNAME', '')  # 管理者メールアドレス
+        if not (api_key and from_addr and to_addr):
+            return False
+
+        _resend.api_key = api_key
+        _resend.Emails.send({
+            'from': from_addr,
+            'to': [to_addr],
+            'subject': subject,
+            'text': text,
+            'html': html,
+        })
+        return True
+
+
+class MemoryTransport:
+    """送信せずに outbox に溜める送信手段（テスト・ローカル確認用）。"""
+
+    def __init__(self, app=None):
+        self.outbox = []
+
+    def send(self, subject: str, text: str, html: str) -> bool:
+        self.outbox.append({'subject': subject, 'text': text, 'html': html})
+        return True
+
+
+ERROR_MAIL_TRANSPORTS = {
+    'resend': ResendTransport,
+    'memory': MemoryTransport,
+}
+
 
 class ResendErrorHandler(logging.Handler):
-    """ERROR 以上のログを Resend API でメール通知するハンドラー。
+    """ERROR 以上のログを管理者にメール通知するハンドラー。
     本番環境（non-debug / non-testing）でのみ登録される。
+
+    emit() はメモリ上の集計に加えるだけで送信しない。同じ箇所・同じ種類のエラーは
+    フィンガープリントでまとめて件数を数え、バックグラウンドスレッドが window 秒ごとに
+    1通のダイジェストとして送る。1時間あたりの送信数が max_per_hour に達したら
+    次に送れるようになるまで集計を続ける（エラーが続いてもメールは増えない）。
     """
 
-    def emit(self, record):
-        try:
-            from flask import current_app
-            app = current_app._get_current_object()
-        except RuntimeError:
+    MAX_GROUPS = 50  # 1通にまとめる種類の上限（超えた分は件数のみ数える）
+
+    def __init__(self, app, transport=None, window: float = 60.0, max_per_hour: int = 6):
+        super().__init__()
+        self.app = app
+        self.transport = transport or ResendTransport(app)
+        self.window = window
+        self.max_per_hour = max_per_hour
+        self._groups = {}      # fingerprint -> {count, first, last, title, sample}
+        self._overflow = 0
+        self._sent = deque()   # 直近1時間の送信時刻
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    @staticmethod
+    def fingerprint(record) -> str:
+        """発生箇所・メッセージの書式・例外の型が同じエラーを同一とみなすキー。"""
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ''
+        raw = f'{record.name}|{record.pathname}|{record.lineno}|{record.msg}|{exc_type}'
+        return hashlib.sha1(raw.encode('utf-8', 'replace')).hexdigest()[:12]
+
+    def _ensure_thread(self):
+        """現在のプロセスで送信スレッドが動いていなければ起動する（fork 後は作り直す）。"""
+        if self._pid == os.getpid():
             return
+        self._pid = os.getpid()
+        self._groups = {}
+        self._overflow = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='error-mail', daemon=True)
+        self._thread.start()
 
+    def emit(self, record):
         try:
-            import resend as _resend
-            api_key   = app.config.get('RESEND_API_KEY', '')
-            from_addr = app.config.get('RESEND_FROM_EMAIL', '')
-            to_addr   = app.config.get('MAIL_USERNAME', '')  # 管理者メールアドレス
+            fp = self.fingerprint(record)
+            now = datetime.now(timezone.utc)
+            with self._lock:
+                self._ensure_thread()
+                group = self._groups.get(fp)
+                if group:
+                    group['count'] += 1
+                    group['last'] = now
+                elif len(self._groups) >= self.MAX_GROUPS:
+                    self._overflow += 1
+                else:
+                    self._groups[fp] = {
+                        'count': 1, 'first': now, 'last': now,
+                        'title': f'{record.levelname} [{record.name}:{record.lineno}] {record.getMessage()}'[:200],
+                        'sample': self.format(record),
+                    }
+        except Exception:
+            self.handleError(record)
 
-            if not (api_key and from_addr and to_addr):
-                return
+    def _run(self):
+        while not self._stop.wait(self.window):
+            self.flush()
 
-            _resend.api_key = api_key
-            body = self.format(record)
-            _resend.Emails.send({
-                'from': from_addr,
-                'to': [to_addr],
-                'subject': f'[Flask tech blog] {record.levelname}: サーバーエラー発生',
-                'text': body,
-                'html': f'<pre style="font-family:monospace;font-size:13px">{body}</pre>',
-            })
+    def flush(self) -> bool:
+        """集計中のエラーをダイジェスト1通で送る。送信上限中・対象なしなら False。"""
+        with self._lock:
+            if not self._groups and not self._overflow:
+                return False
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] > 3600:
+                self._sent.popleft()
+            if len(self._sent) >= self.max_per_hour:
+                return False  # 上限中は送らずに集計を続ける
+            groups, overflow = self._groups, self._overflow
+            self._groups, self._overflow = {}, 0
+            self._sent.append(now)
+
+        total = sum(g['count'] for g in groups.values()) + overflow
+        subject = f'[Flask tech blog] ERROR: サーバーエラー {total} 件（{len(groups)} 種類）'
+        sections = [
+            f"■ {g['count']} 件  {g['first']:%Y-%m-%d %H:%M:%S} 〜 {g['last']:%H:%M:%S} UTC\n"
+            f"{g['title']}\n\n{g['sample']}"
+            for g in sorted(groups.values(), key=lambda g: -g['count'])
+        ]
+        if overflow:
+            sections.append(f'■ ほか {overflow} 件（種類数の上限を超えたため省略）')
+        text = ('\n\n' + '-' * 60 + '\n\n').join(sections)
+        try:
+            return self.transport.send(
+                subject, text,
+                f'<pre style="font-family:monospace;font-size:13px">{escape(text)}</pre>',
+            )
         except Exception:
             # 通知失敗はサイレントに無視（ロギング自体を止めない）
-            pass
+            return False
+
+    def close(self):
+        """送信スレッドを止め、残りの集計を送る。"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+            self.flush()
+        self._thread = None
+        super().close()
 
 
-class DBLogHandler(logging.Handler):
+class DBLogHandler(QueueHandler):
     """ログをDBの app_logs テーブルに書き込むハンドラー。
+
+    emit() は整形済みの行を有界キューに積むだけで、書き込みはバックグラウンドスレッドが
+    batch_size 件ごと、または flush_interval 秒ごとに bulk_insert_mappings でまとめて行う。
+    キューが満杯のときは破棄して件数を数え、次の書き込み時に WARNING 行として記録する。
+    プロセス終了時（atexit / close）には残りを書き込んでから止まる。
+    flush_interval が 0 のときは emit() の中で1件ずつ同期的に書き込む（テスト用）。
     リクエストのスコープセッションを汚染しないよう独立セッションを使用する。
     """
 
-    def emit(self, record):
-        # アプリコンテキスト外（起動時など）では無視
-        try:
-            from flask import current_app
-            current_app._get_current_object()
-        except RuntimeError:
+    def __init__(self, app, capacity: int = 10000, batch_size: int = 100, flush_interval: float = 0.5):
+        super().__init__(queue.Queue(maxsize=capacity))
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        """キューには LogRecord ではなく app_logs の1行分の dict を積む（整形は呼び出し元スレッドで行う）。"""
+        return {
+            'level': record.levelname,
+            'module': f'{record.name}:{record.lineno}'[:100],
+            'message': self.format(record),
+            'created_at': datetime.fromtimestamp(record.created, timezone.utc),
+        }
+
+    def _ensure_thread(self):
+        """現在のプロセスで書き込みスレッドが動いていなければ起動する（fork 後は作り直す）。"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)  # fork 元の未書き込み分は親側で書き込む
+            self._thread = threading.Thread(target=self._run, name='db-log-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, entry):
+        if not self.flush_interval:
+            self._write([entry])
             return
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
 
+    def _run(self):
+        stopping = False
+        while not stopping:
+            entry = self.queue.get()
+            if entry is _STOP:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+
+    def _write(self, batch):
+        """まとめて INSERT する。破棄が発生していればその件数も1行記録する。"""
+        with self._lock:
+            dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if dropped:
+            batch.append({
+                'level': 'WARNING',
+                'module': f'{__name__}:DBLogHandler',
+                'message': f'ログキューが満杯のため {dropped} 件のログを破棄しました',
+                'created_at': datetime.now(timezone.utc),
+            })
         try:
             from sqlalchemy.orm import Session
             from models import db, AppLog
-            # db.session（スコープセッション）とは独立した新規セッションで書き込む
-            with Session(db.engine) as session:
-                entry = AppLog(
-                    level=record.levelname,
-                    module=f'{record.name}:{record.lineno}',
-                    message=self.format(record),
-                    created_at=datetime.now(timezone.utc),
-                )
-                session.add(entry)
-                session.commit()
+            with self.app.app_context():
+                # db.session（スコープセッション）とは独立した新規セッションで書き込む
+                with Session(db.engine) as session:
+                    session.bulk_insert_mappings(AppLog, batch)
+                    session.commit()
         except Exception:
             # DB書き込み失敗時はサイレントに無視（ロギング自体を止めない）
             pass
 
+    def close(self):
+        """残りのログを書き込んでから書き込みスレッドを止める。"""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self.queue.put(_STOP, timeout=1)
+            except queue.Full:
+                pass
+            thread.join(timeout=5)
+        self._thread = None
+        super().close()
+
 
 def init_logger(app):
     """アプリケーションロガーを初期化する。
     - RotatingFileHandler: logs/app.log（10MB × 最大5世代）
     - StreamHandler: コンソール（DEBUGモード時のみ）
-    - DBLogHandler: app_logs テーブル（INFO以上）
-    - ResendErrorHandler: 管理者メール通知（本番かつERROR以上のみ）
+    - DBLogHandler: app_logs テーブル（INFO以上・バックグラウンドでまとめて書き込み）
+    - ResendErrorHandler: 管理者メール通知（本番かつERROR以上のみ・同種のエラーをまとめて送信）
     """
     log_level = logging.DEBUG if app.debug else logging.INFO
     formatter = logging.Formatter(
@@ -106,7 +313,12 @@ def init_logger(app):
     app.logger.addHandler(file_handler)
 
     # DBハンドラー（INFO以上をDBに書き込み）
-    db_handler = DBLogHandler()
+    db_handler = DBLogHandler(
+        app,
+        capacity=app.config.get('LOG_DB_QUEUE_SIZE', 10000),
+        batch_size=app.config.get('LOG_DB_BATCH_SIZE', 100),
+        flush_interval=app.config.get('LOG_DB_FLUSH_INTERVAL', 0.5),
+    )
     db_handler.setFormatter(formatter)
     db_handler.setLevel(logging.INFO)
     app.logger.addHandler(db_handler)
@@ -115,7 +327,13 @@ def init_logger(app):
 
     # Resendエラーハンドラー（本番環境かつテストでない場合のみ）
     if not app.debug and not app.testing:
-        resend_handler = ResendErrorHandler()
+        transport = ERROR_MAIL_TRANSPORTS[app.config.get('ERROR_MAIL_TRANSPORT', 'resend')](app)
+        resend_handler = ResendErrorHandler(
+            app,
+            transport=transport,
+            window=app.config.get('ERROR_MAIL_WINDOW', 60),
+            max_per_hour=app.config.get('ERROR_MAIL_MAX_PER_HOUR', 6),
+        )
         resend_handler.setFormatter(formatter)
         resend_handler.setLevel(logging.ERROR)
         app.logger.addHandler(resend_handler)
@@ -0,0 +1,60 @@
+"""
+Markdown → HTML 変換（テンプレートの markdown フィルター・記事の事前描画で共用）
+
+拡張（fenced_code / tables）を組み込んだ Markdown インスタンスはスレッドごとに1つ作って
+reset() して使い回す（インスタンスはスレッドセーフではないため共有しない）。
+変換結果は本文の sha256 をキーにした件数上限付きの LRU に保持する。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+import markdown
+
+EXTENSIONS = ["fenced_code", "tables"]
+DEFAULT_CACHE_SIZE = 256
+
+_local = threading.local()
+_cache = OrderedDict()  # sha256(text) -> html
+_lock = threading.Lock()
+
+
+def _converter() -> markdown.Markdown:
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = _local.md = markdown.Markdown(extensions=EXTENSIONS)
+    return md
+
+
+def _max_entries() -> int:
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app.config.get('MARKDOWN_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+    return DEFAULT_CACHE_SIZE
+
+
+def convert_markdown(text: str | None) -> str:
+    """キャッシュを使わずに変換する（事前描画用）。"""
+    return _converter().reset().convert(text or '')
+
+
+def render_markdown(text: str | None) -> str:
+    """Markdown を HTML に変換する（同じ本文は LRU キャッシュから返す）。"""
+    if not text:
+        return ''
+    key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with _lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            return html
+    html = convert_markdown(text)
+    with _lock:
+        _cache[key] = html
+        while len(_cache) > _max_entries():
+            _cache.popitem(last=False)
+    return html
+
+
+def clear_markdown_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,46 @@
+"""
+グローバルナビ・フッターナビ（固定ページ一覧）のキャッシュ
+"""
+from flask import current_app, g
+from models import FixedPage
+from utils.cache import get_cache
+from utils.fragment_cache import invalidate_fragments
+
+NAV_VERSION_KEY = 'nav:version'
+
+
+def _build_nav_pages() -> dict:
+    pages = FixedPage.query.filter_by(visible=True).order_by(FixedPage.order).all()
+    return {
+        'GLOBAL_NAV_PAGES':    {p.key: p.title for p in pages if p.nav_type == 'global'},
+        'FOOTER_NAV_PAGES':    {p.key: p.title for p in pages if p.nav_type == 'footer'},
+        'EN_GLOBAL_NAV_PAGES': {p.key: (p.en_title or p.title) for p in pages if p.nav_type == 'global' and p.en_visible},
+        'EN_FOOTER_NAV_PAGES': {p.key: (p.en_title or p.title) for p in pages if p.nav_type == 'footer' and p.en_visible},
+    }
+
+
+def get_nav_pages() -> dict:
+    """
+    ナビ用の固定ページ辞書を返す。
+
+    同一リクエスト内は g に保持し、リクエスト間はバージョン付きキーでキャッシュする。
+    固定ページ更新時に invalidate_nav() でバージョンを進めると次回から再構築される。
+    """
+    if 'nav_pages' in g:
+        return g.nav_pages
+    cache = get_cache()
+    version = cache.get(NAV_VERSION_KEY, 0)
+    key = f'nav:pages:{version}'
+    nav_pages = cache.get(key)
+    if nav_pages is None:
+        nav_pages = _build_nav_pages()
+        cache.set(key, nav_pages, ttl=current_app.config.get('NAV_CACHE_TTL', 3600))
+    g.nav_pages = nav_pages
+    return nav_pages
+
+
+def invalidate_nav() -> None:
+    """固定ページの表示・順序・タイトル変更時にナビキャッシュのバージョンを進める。"""
+    get_cache().incr(NAV_VERSION_KEY)
+    invalidate_fragments('nav')
+    g.pop('nav_pages', None)
@@ -0,0 +1,125 @@
+"""
+キーセット（カーソル）ページング
+
+OFFSET は読み飛ばす行数に比例して遅くなるため、直前ページ最終行のソートキーを
+カーソルとして受け取り「そのキーより後ろ」を WHERE 条件で取得する。
+カーソルは SECRET_KEY で署名した不透明なトークンとして URL に載せる。
+"""
+from datetime import datetime
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, or_, func, literal, text
+from models import db
+
+
+class KeysetPage:
+    """1ページ分の取得結果。"""
+
+    def __init__(self, rows, next_cursor):
+        self.rows = rows
+        self.items = [row[0] for row in rows]
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='memo-cursor')
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values) -> str:
+    """ソートキーの値の並びをカーソルトークンにする。"""
+    return _serializer().dumps([_dump_value(v) for v in values])
+
+
+def decode_cursor(token: str | None, size: int):
+    """
+    カーソルトークンをソートキーの値の並びに戻す。
+
+    改ざん・形式違いのトークンは None（= 先頭ページ）として扱う。
+    """
+    if not token:
+        return None
+    try:
+        values = _serializer().loads(token)
+    except BadSignature:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return [_load_value(v) for v in values]
+
+
+def _after(keys, values):
+    """
+    (k1, k2, ...) がカーソル位置より後ろにある条件を組み立てる。
+
+    行値比較 (a, b) < (x, y) は昇順・降順が混在すると使えないため、
+    k1 > x1 OR (k1 = x1 AND k2 > x2) OR ... の形に展開する。
+    """
+    # True/False は比較演算子に直接渡せないため、列の型を付けたバインド値にする
+    values = [literal(v, type_=expr.type) for (expr, _), v in zip(keys, values)]
+    clauses = []
+    for i, ((expr, direction), value) in enumerate(zip(keys, values)):
+        step = expr < value if direction == 'desc' else expr > value
+        clauses.append(and_(*[k == v for (k, _), v in zip(keys[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys, cursor: str | None, per_page: int, offset: int = 0) -> KeysetPage:
+    """
+    キーセット方式で1ページ分を取得する。
+
+    Args:
+        query: エンティティを先頭列に持つクエリ
+        keys: [(式, 'asc' | 'desc'), ...] 一意になるよう最後は主キーにすること
+        cursor: 前ページの next_cursor（None なら先頭ページ）
+        per_page: 1ページの件数
+        offset: カーソルがない場合の読み飛ばし件数（ページ番号指定との併用向け）
+    """
+    values = decode_cursor(cursor, len(keys))
+    labeled = [expr.label(f'_k{i}') for i, (expr, _) in enumerate(keys)]
+    query = query.add_columns(*labeled)
+    if values is not None:
+        query = query.filter(_after(keys, values))
+    elif offset:
+        query = query.offset(offset)
+    order_by = [expr.desc() if direction == 'desc' else expr.asc() for expr, direction in keys]
+    # 1件多く取得して次ページの有無を判定する
+    rows = query.order_by(*order_by).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, f'_k{i}') for i in range(len(keys))])
+    return KeysetPage(rows, next_cursor)
+
+
+def approximate_count(model) -> int:
+    """
+    テーブルのおおよその行数を返す。
+
+    PostgreSQL では統計情報（pg_class.reltuples）を参照して全件スキャンを避け、
+    それ以外の DB や統計未収集の場合は COUNT(*) を実行する。
+    """
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class WHERE relname = :name'),
+            {'name': model.__tablename__},
+        ).scalar()
+        if estimate is not None and estimate > 0:
+            return int(estimate)
+    return db.session.query(func.count()).select_from(model).scalar()
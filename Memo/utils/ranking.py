@@ -0,0 +1,57 @@
+"""
+いいねランキング TOP10（サイドバー共通）の集計とキャッシュ
+"""
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from models import Memo
+from utils.cache import get_cache
+from utils.fragment_cache import invalidate_fragments
+
+RANKING_CACHE_KEY = 'ranking:top10'
+
+
+def _build_top10() -> list[dict]:
+    """
+    like_count 上位10件をテンプレート描画に必要な値だけのスナップショットにする。
+
+    ORM インスタンスはセッション終了後に遅延ロードできないため、
+    キャッシュ（共有バックエンド含む）に載せられる素の dict に変換して返す。
+    """
+    memos = (
+        Memo.query
+        .options(selectinload(Memo.categories))
+        .order_by(Memo.like_count.desc(), Memo.id.desc())
+        .limit(10)
+        .all()
+    )
+    return [
+        {
+            "memo": {
+                "id": memo.id,
+                "title": memo.title,
+                "image_filename": memo.image_filename,
+                "image_variants": memo.image_variants,
+                "created_at": memo.created_at,
+                "ai_score": {"translated_title": (memo.ai_score or {}).get('translated_title')},
+                "categories": [{"name": c.name, "color": c.color} for c in memo.categories],
+            },
+            "like_count": memo.like_count,
+        }
+        for memo in memos
+    ]
+
+
+def get_top10() -> list[dict]:
+    """キャッシュ済みのランキングを返す（未キャッシュ・期限切れ時のみ集計）。"""
+    cache = get_cache()
+    top10 = cache.get(RANKING_CACHE_KEY)
+    if top10 is None:
+        top10 = _build_top10()
+        cache.set(RANKING_CACHE_KEY, top10, ttl=current_app.config.get('RANKING_CACHE_TTL', 300))
+    return top10
+
+
+def invalidate_ranking() -> None:
+    """いいね増減・記事削除・カテゴリー変更時にランキングキャッシュを破棄する。"""
+    get_cache().delete(RANKING_CACHE_KEY)
+    invalidate_fragments('ranking')
@@ -0,0 +1,88 @@
+"""
+カテゴリー一致によるオススメ記事（トップページ「あなたの興味の近いオススメ記事」）
+"""
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from models import db, Memo, memo_categories
+from utils.cache import get_cache
+
+RECOMMEND_CACHE_PREFIX = 'recommend:'
+RECOMMEND_LIMIT = 3
+
+
+def _my_category_ids(user_id: int) -> list[int]:
+    """ユーザー自身の投稿に付与されたカテゴリーID（昇順・重複なし）"""
+    rows = (
+        db.session.query(memo_categories.c.category_id)
+        .join(Memo, Memo.id == memo_categories.c.memo_id)
+        .filter(Memo.user_id == user_id)
+        .distinct()
+        .order_by(memo_categories.c.category_id)
+        .all()
+    )
+    return [category_id for (category_id,) in rows]
+
+
+def _build_recommendations(user_id: int, category_ids: list[int]) -> list[dict]:
+    """
+    他者の投稿をカテゴリー一致数で集計し、上位 RECOMMEND_LIMIT 件をスナップショットで返す。
+
+    一致数の算出は memo_categories 上の GROUP BY 1本で行い、全記事の読み込みはしない。
+    """
+    match_count = func.count(memo_categories.c.category_id).label('match_count')
+    ranked = (
+        db.session.query(memo_categories.c.memo_id, match_count)
+        .join(Memo, Memo.id == memo_categories.c.memo_id)
+        .filter(memo_categories.c.category_id.in_(category_ids))
+        .filter(Memo.user_id != user_id)
+        .group_by(memo_categories.c.memo_id)
+        .order_by(match_count.desc(), memo_categories.c.memo_id)
+        .limit(RECOMMEND_LIMIT)
+        .all()
+    )
+    memo_ids = [memo_id for memo_id, _ in ranked]
+    if not memo_ids:
+        return []
+    memos = {
+        memo.id: memo
+        for memo in Memo.query.options(selectinload(Memo.categories)).filter(Memo.id.in_(memo_ids))
+    }
+    return [
+        {
+            "id": memo.id,
+            "title": memo.title,
+            "image_filename": memo.image_filename,
+            "image_variants": memo.image_variants,
+            "created_at": memo.created_at,
+            "like_count": memo.like_count,
+            "ai_score": {"translated_title": (memo.ai_score or {}).get('translated_title')},
+            "categories": [{"name": c.name, "color": c.color} for c in memo.categories],
+        }
+        for memo in (memos[memo_id] for memo_id in memo_ids if memo_id in memos)
+    ]
+
+
+def get_recommendations(user_id: int) -> list[dict]:
+    """
+    ユーザー向けオススメ記事を返す。
+
+    キャッシュキーに自身のカテゴリー構成を含めるため、
+    自分の投稿のカテゴリーが変われば自動的に再計算される。
+    """
+    category_ids = _my_category_ids(user_id)
+    if not category_ids:
+        return []
+    signature = '-'.join(str(c) for c in category_ids)
+    key = f'{RECOMMEND_CACHE_PREFIX}{user_id}:{signature}'
+    cache = get_cache()
+    recommended = cache.get(key)
+    if recommended is None:
+        recommended = _build_recommendations(user_id, category_ids)
+        cache.set(key, recommended, ttl=current_app.config.get('RECOMMEND_CACHE_TTL', 600))
+    return recommended
+
+
+def invalidate_recommendations() -> None:
+    """記事削除時など、全ユーザーのオススメキャッシュを破棄する。"""
+    get_cache().delete_prefix(RECOMMEND_CACHE_PREFIX)
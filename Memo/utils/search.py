@@ -0,0 +1,271 @@
+"""
+記事の全文検索インデックス（/memo 検索用）
+
+日本語は形態素解析なしで扱えるよう bi-gram、英数字は単語単位（前方一致）でトークン化し、
+DB ごとのバックエンドに保存する。
+- fts5:     SQLite FTS5 仮想テーブル memo_fts（bm25 でランキング）
+- postgres: memo_search.tokens（tsvector + GIN インデックス、ts_rank でランキング）
+- like:     インデックスなしの ILIKE 検索（FTS5 が使えない環境のフォールバック）
+
+3 文字以上の英数字の検索語は単語の途中にも一致させるため、正規化した本文を trigram の
+インデックス（SQLite: tokenize='trigram' の memo_fts_trigram / PostgreSQL: pg_trgm の
+memo_search.body）で部分一致検索する。1〜2 文字の英数字は前方一致のみ。
+日本語 1 文字の検索語だけはどちらのインデックスでも引けないため ILIKE 検索に切り替える。
+"""
+import re
+import unicodedata
+from flask import current_app
+from sqlalchemy import Float, Integer, literal, or_, select, text
+from models import db, Memo
+
+# 日本語（ひらがな・カタカナ・漢字・半角カナ）の連続と英数字の単語
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿ｦ-ﾟ々〆ー]+')
+_WORD = re.compile(r'[a-z0-9_]+')
+
+
+def normalize(value: str) -> str:
+    """検索用の正規化（NFKC・小文字化）。"""
+    return unicodedata.normalize('NFKC', value or '').lower()
+
+
+def tokenize(value: str) -> list[str]:
+    """
+    検索用トークン列を返す。
+
+    NFKC 正規化・小文字化のうえ、日本語の連続は 2 文字ずつずらした bi-gram
+    （1 文字だけの連続はその 1 文字）、英数字は単語ごとに切り出す。
+    """
+    value = normalize(value)
+    tokens = []
+    for run in _CJK_RUN.findall(value):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD.findall(value))
+    return tokens
+
+
+def _query_terms(q: str) -> list[tuple[str, bool]]:
+    """検索語を (トークン, 前方一致するか) の組にする。英数字の単語は途中までの入力でもヒットさせる。"""
+    terms = []
+    for token in dict.fromkeys(tokenize(q)):
+        terms.append((token, bool(_WORD.fullmatch(token))))
+    return terms
+
+
+def _split_infix(terms):
+    """trigram で部分一致させる英数字の語（3 文字以上）と、それ以外の語に分ける。"""
+    infix = [token for token, prefix in terms if prefix and len(token) >= 3]
+    rest = [(token, prefix) for token, prefix in terms if not (prefix and len(token) >= 3)]
+    return infix, rest
+
+
+def _single_cjk(terms) -> bool:
+    """日本語 1 文字の検索語があるか（bi-gram のインデックスでは 1 文字の語に含まれる場合しか引けない）。"""
+    return any(len(token) == 1 and _CJK_RUN.fullmatch(token) for token, _ in terms)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class LikeSearchBackend:
+    """インデックスなしの ILIKE 検索（従来動作）。"""
+    name = 'like'
+
+    def ensure(self, conn):
+        pass
+
+    def index(self, memo):
+        pass
+
+    def remove(self, memo_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def matches(self, q: str):
+        like_expr = f"%{q}%"
+        return (
+            select(Memo.id.label('memo_id'), literal(0.0).label('rank'))
+            .where(or_(Memo.title.ilike(like_expr), Memo.content.ilike(like_expr)))
+            .subquery('search')
+        )
+
+
+class SQLiteFTSBackend(LikeSearchBackend):
+    """SQLite FTS5 仮想テーブルによる検索。"""
+    name = 'fts5'
+
+    def index(self, memo):
+        self.remove(memo.id)
+        body = f'{memo.title}\n{memo.content}'
+        db.session.execute(
+            text('INSERT INTO memo_fts (memo_id, tokens) VALUES (:memo_id, :tokens)'),
+            {'memo_id': memo.id, 'tokens': ' '.join(tokenize(body))},
+        )
+        db.session.execute(
+            text('INSERT INTO memo_fts_trigram (memo_id, body) VALUES (:memo_id, :body)'),
+            {'memo_id': memo.id, 'body': normalize(body)},
+        )
+
+    def remove(self, memo_id):
+        db.session.execute(text('DELETE FROM memo_fts WHERE memo_id = :memo_id'), {'memo_id': memo_id})
+        db.session.execute(text('DELETE FROM memo_fts_trigram WHERE memo_id = :memo_id'), {'memo_id': memo_id})
+
+    def rebuild(self):
+        db.session.execute(text('DELETE FROM memo_fts'))
+        db.session.execute(text('DELETE FROM memo_fts_trigram'))
+        memos = db.session.query(Memo.id, Memo.title, Memo.content).all()
+        for memo in memos:
+            self.index(memo)
+        return len(memos)
+
+    def ensure(self, conn):
+        conn.execute(text(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS memo_fts '
+            'USING fts5(memo_id UNINDEXED, tokens)'
+        ))
+        conn.execute(text(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS memo_fts_trigram '
+            "USING fts5(memo_id UNINDEXED, body, tokenize='trigram')"
+        ))
+
+    def matches(self, q: str):
+        terms = _query_terms(q)
+        if not terms or _single_cjk(terms):
+            return super().matches(q)
+        infix, rest = _split_infix(terms)
+        # trigram テーブルの MATCH は語の部分一致（英数字のトークンなので引用符のエスケープは不要）
+        trigram = ' AND '.join(f'"{token}"' for token in infix)
+        match = ' AND '.join(f'"{token}"*' if prefix else f'"{token}"' for token, prefix in rest)
+        if not rest:
+            sql = (
+                'SELECT memo_id, bm25(memo_fts_trigram) AS rank FROM memo_fts_trigram '
+                'WHERE memo_fts_trigram MATCH :trigram'
+            )
+        elif infix:
+            sql = (
+                'SELECT memo_id, bm25(memo_fts) AS rank FROM memo_fts WHERE memo_fts MATCH :match '
+                'AND memo_id IN (SELECT memo_id FROM memo_fts_trigram WHERE memo_fts_trigram MATCH :trigram)'
+            )
+        else:
+            sql = 'SELECT memo_id, bm25(memo_fts) AS rank FROM memo_fts WHERE memo_fts MATCH :match'
+        params = {name: value for name, value in (('match', match), ('trigram', trigram)) if value}
+        return (
+            text(sql)
+            .bindparams(**params)
+            .columns(memo_id=Integer, rank=Float)
+            .subquery('search')
+        )
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """PostgreSQL tsvector（'simple' 辞書に bi-gram を格納）と pg_trgm（本文の部分一致）による検索。"""
+    name = 'postgres'
+
+    def ensure(self, conn):
+        conn.execute(text('SELECT tokens, body FROM memo_search LIMIT 1'))  # テーブルはマイグレーションで作成
+
+    def index(self, memo):
+        body = f'{memo.title}\n{memo.content}'
+        db.session.execute(
+            text(
+                'INSERT INTO memo_search (memo_id, tokens, body) '
+                "VALUES (:memo_id, to_tsvector('simple', :tokens), :body) "
+                'ON CONFLICT (memo_id) DO UPDATE SET tokens = EXCLUDED.tokens, body = EXCLUDED.body'
+            ),
+            {'memo_id': memo.id, 'tokens': ' '.join(tokenize(body)), 'body': normalize(body)},
+        )
+
+    def remove(self, memo_id):
+        db.session.execute(text('DELETE FROM memo_search WHERE memo_id = :memo_id'), {'memo_id': memo_id})
+
+    def rebuild(self):
+        db.session.execute(text('DELETE FROM memo_search'))
+        memos = db.session.query(Memo.id, Memo.title, Memo.content).all()
+        for memo in memos:
+            self.index(memo)
+        return len(memos)
+
+    def matches(self, q: str):
+        terms = _query_terms(q)
+        if not terms or _single_cjk(terms):
+            return super().matches(q)
+        infix, rest = _split_infix(terms)
+        # 部分一致は body の LIKE（pg_trgm の GIN インデックスを使う）
+        params = {f'infix{i}': f'%{_like_escape(token)}%' for i, token in enumerate(infix)}
+        if rest:
+            params['tsquery'] = ' & '.join(f"'{token}':*" if prefix else f"'{token}'" for token, prefix in rest)
+            sql = (
+                'SELECT memo_id, -ts_rank(tokens, query) AS rank '
+                "FROM memo_search, to_tsquery('simple', :tsquery) AS query "
+                'WHERE tokens @@ query'
+            )
+        else:
+            sql = 'SELECT memo_id, 0.0 AS rank FROM memo_search WHERE TRUE'
+        sql += ''.join(f' AND body LIKE :infix{i}' for i in range(len(infix)))
+        return (
+            text(sql)
+            .bindparams(**params)
+            .columns(memo_id=Integer, rank=Float)
+            .subquery('search')
+        )
+
+
+_BACKENDS = {
+    'like': LikeSearchBackend,
+    'fts5': SQLiteFTSBackend,
+    'postgres': PostgresSearchBackend,
+}
+
+
+def init_search(app):
+    """
+    設定 SEARCH_BACKEND（auto/fts5/postgres/like）に応じたバックエンドをアプリに登録する。
+
+    auto の場合は接続先 DB から判定し、FTS5 が使えない・DB に接続できない場合は like にフォールバックする。
+    """
+    name = app.config.get('SEARCH_BACKEND', 'auto')
+    with app.app_context():
+        if name == 'auto':
+            dialect = db.engine.dialect.name
+            name = {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(dialect, 'like')
+        backend = _BACKENDS[name]()
+        try:
+            with db.engine.begin() as conn:
+                backend.ensure(conn)
+        except Exception as e:
+            app.logger.warning('全文検索インデックスを利用できないため LIKE 検索を使用: %s', e)
+            backend = LikeSearchBackend()
+    app.extensions['memo_search'] = backend
+    return backend
+
+
+def get_search_backend():
+    """現在のアプリに登録された検索バックエンドを返す。"""
+    return current_app.extensions['memo_search']
+
+
+def index_memo(memo) -> None:
+    """記事の作成・更新時にインデックスを更新する（コミットは呼び出し側）。"""
+    get_search_backend().index(memo)
+
+
+def remove_memo(memo_id: int) -> None:
+    """記事の削除時にインデックスから除去する（コミットは呼び出し側）。"""
+    get_search_backend().remove(memo_id)
+
+
+def search_subquery(q: str):
+    """検索語にヒットした (memo_id, rank) のサブクエリを返す。rank は小さいほど関連度が高い。"""
+    return get_search_backend().matches(q)
+
+
+def rebuild_search_index() -> int:
+    """インデックスを全件作り直す。Returns: 登録した記事件数"""
+    count = get_search_backend().rebuild()
+    db.session.commit()
+    return count
@@ -0,0 +1,155 @@
+"""
+sitemap.xml のストリーミング生成
+
+記事は (id, created_at) の2列だけを yield_per で少しずつ読み出しながら XML を書き出し、
+全件をメモリに載せない。URL 数が 50,000 件（サイトマップ1ファイルの上限）を超える場合は
+/sitemap.xml をサイトマップインデックスにして、固定ページ分と記事分（5万件ずつ）に分割する。
+
+ETag / Last-Modified は記事・固定ページの件数、表示中の固定ページキー、最終作成日時から作り、短時間キャッシュする。
+内容が変わっていなければ 304 を返し、記事のクエリ自体を実行しない。
+"""
+import hashlib
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import func, select
+from models import db, Memo, FixedPage
+from utils.cache import get_cache
+
+SITEMAP_MAX_URLS = 50000
+SITEMAP_STATE_CACHE_KEY = 'sitemap:state'
+
+_URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_URLSET_CLOSE = '</urlset>'
+
+
+def _aware(dt: datetime | None) -> datetime | None:
+    # SQLiteはnaive datetimeで返すことがあるため、aware化して統一
+    if dt is None:
+        return None
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def sitemap_state() -> dict:
+    """記事数・固定ページ数・表示中の固定ページキーのハッシュ・最終作成日時（キャッシュ済み）。"""
+    cache = get_cache()
+    state = cache.get(SITEMAP_STATE_CACHE_KEY)
+    if state is None:
+        memo_count, memo_latest = db.session.execute(
+            select(func.count(Memo.id), func.max(Memo.created_at))
+        ).one()
+        page_count, page_latest = db.session.execute(
+            select(func.count(FixedPage.id), func.max(FixedPage.created_at)).where(FixedPage.visible.is_(True))
+        ).one()
+        # 表示切替やキー変更は件数・作成日時に表れないため、表示中のキー自体を ETag に含める
+        page_keys = db.session.execute(
+            select(FixedPage.key).where(FixedPage.visible.is_(True)).order_by(FixedPage.key)
+        ).scalars()
+        latest = max((d for d in (_aware(memo_latest), _aware(page_latest)) if d), default=None)
+        state = {
+            'memo_count': memo_count,
+            'page_count': page_count,
+            'page_keys': hashlib.sha1('\n'.join(page_keys).encode()).hexdigest(),
+            'last_modified': latest,
+        }
+        cache.set(SITEMAP_STATE_CACHE_KEY, state, ttl=current_app.config.get('SITEMAP_CACHE_TTL', 300))
+    return state
+
+
+def invalidate_sitemap() -> None:
+    """記事・固定ページの追加・削除時に呼び、次回アクセスで状態を取り直させる。"""
+    get_cache().delete(SITEMAP_STATE_CACHE_KEY)
+
+
+def memo_part_count(state: dict) -> int:
+    """記事サイトマップの分割数（0 なら分割せず /sitemap.xml 1ファイル）。"""
+    if state['memo_count'] + state['page_count'] + 1 <= SITEMAP_MAX_URLS:
+        return 0
+    return -(-state['memo_count'] // SITEMAP_MAX_URLS)
+
+
+def _site_url() -> str:
+    return escape(current_app.config['SITE_URL'].rstrip('/'))
+
+
+def _page_urls():
+    site_url = _site_url()
+    # トップページ
+    yield f'<url><loc>{site_url}/</loc><changefreq>daily</changefreq><priority>1.0</priority></url>\n'
+    # 固定ページ（表示中のみ）
+    keys = db.session.execute(
+        select(FixedPage.key).where(FixedPage.visible.is_(True)).order_by(FixedPage.order)
+    ).scalars()
+    for key in keys:
+        yield (
+            f'<url><loc>{site_url}/fixed/{escape(key)}</loc>'
+            f'<changefreq>monthly</changefreq><priority>0.5</priority></url>\n'
+        )
+
+
+def _memo_urls(offset: int = 0, limit: int | None = None):
+    """記事の <url> を yield_per で読みながら1000件ずつまとめて返す。"""
+    site_url = _site_url()
+    stmt = select(Memo.id, Memo.created_at).order_by(Memo.id.desc()).offset(offset)
+    if limit:
+        stmt = stmt.limit(limit)
+    result = db.session.execute(stmt.execution_options(yield_per=1000))
+    for rows in result.partitions():
+        yield ''.join(
+            f'<url><loc>{site_url}/detail/{memo_id}</loc>'
+            f'<lastmod>{created_at:%Y-%m-%d}</lastmod>'
+            f'<changefreq>weekly</changefreq><priority>0.8</priority></url>\n'
+            for memo_id, created_at in rows
+        )
+
+
+def _urlset(*parts):
+    yield _URLSET_OPEN
+    for part in parts:
+        yield from part
+    yield _URLSET_CLOSE
+
+
+def _sitemap_index(state: dict, parts: int):
+    site_url = _site_url()
+    lastmod = f"<lastmod>{state['last_modified']:%Y-%m-%d}</lastmod>" if state['last_modified'] else ''
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    yield f'<sitemap><loc>{site_url}/sitemap-pages.xml</loc>{lastmod}</sitemap>\n'
+    for part in range(1, parts + 1):
+        yield f'<sitemap><loc>{site_url}/sitemap-memos-{part}.xml</loc>{lastmod}</sitemap>\n'
+    yield '</sitemapindex>'
+
+
+def sitemap_response(name: str, part: int | None = None):
+    """
+    サイトマップのレスポンス（条件付き GET 対応のストリーミング）。
+
+    Args:
+        name: 'index'（/sitemap.xml）/ 'pages' / 'memos'
+        part: 'memos' の分割番号（1始まり）
+    Returns:
+        Response。存在しない分割番号は None
+    """
+    state = sitemap_state()
+    parts = memo_part_count(state)
+    if name == 'index':
+        body = _sitemap_index(state, parts) if parts else _urlset(_page_urls(), _memo_urls())
+    elif name == 'pages' and parts:
+        body = _urlset(_page_urls())
+    elif name == 'memos' and parts and 1 <= (part or 0) <= parts:
+        body = _urlset(_memo_urls(offset=(part - 1) * SITEMAP_MAX_URLS, limit=SITEMAP_MAX_URLS))
+    else:
+        return None
+
+    last_modified = state['last_modified']
+    etag = hashlib.sha1(
+        f"{name}:{part}:{state['memo_count']}:{state['page_count']}:{state['page_keys']}:{last_modified}".encode()
+    ).hexdigest()
+    response = Response(stream_with_context(body), mimetype='application/xml')
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('SITEMAP_CACHE_TTL', 300)
+    # 一致すれば 304（本文のジェネレータは実行されない）
+    return response.make_conditional(request)
@@ -0,0 +1,246 @@
+"""
+アップロード画像の保存先（ストレージバックエンド）
+
+- LocalStorage: UPLOAD_FOLDERS のディレクトリ（static/images/...）に保存し、Flask の static で配信（デフォルト）
+- S3Storage: S3 互換ストレージ（AWS S3 / Cloudflare R2 / MinIO など）。STORAGE_BACKEND=s3 で使用。
+  Render のようにディスクが揮発する環境や、複数インスタンスで同じ画像を参照する場合に使う
+
+どちらも category（UPLOAD_FOLDERS のキー: memo / user / fixed）と filename で指定する。
+テンプレートでは upload_url(category, filename) で配信 URL を得る。
+
+ディレクトリ一覧は list_files() でキャッシュする（ローカルはディレクトリの mtime、
+S3 はこのアプリからの保存・削除で進むバージョンで無効化。他からの変更は STORAGE_LIST_CACHE_TTL 秒で反映）。
+
+内容のハッシュをファイル名にした画像（utils.upload の保存名・その縮小版）は中身が変わらないため、
+1年間キャッシュさせる（Cache-Control: immutable）。連番などそれ以外の名前は STORAGE_MUTABLE_MAX_AGE 秒。
+"""
+import io
+import os
+import re
+import shutil
+from flask import current_app, request
+from utils.cache import get_cache
+
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+# "<sha256>.<拡張子>" または縮小版の "<sha256>-<幅>.<拡張子>"
+_CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}(-\d+)?\.[a-z0-9]+$')
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif',
+    'webp': 'image/webp', 'avif': 'image/avif', 'svg': 'image/svg+xml',
+}
+
+
+_LIST_KEY = 'storage:list:{}'
+_VERSION_KEY = 'storage:version:{}'
+
+
+def is_content_addressed(filename: str) -> bool:
+    """utils.upload が内容の sha256 で付けた名前（またはその縮小版）か。"""
+    return bool(_CONTENT_ADDRESSED.match(filename))
+
+
+def cache_control(filename: str) -> str:
+    """配信時の Cache-Control（内容アドレスの名前なら immutable）。"""
+    if is_content_addressed(filename):
+        return f"public, max-age={current_app.config.get('STORAGE_CACHE_MAX_AGE', 31536000)}, immutable"
+    return f"public, max-age={current_app.config.get('STORAGE_MUTABLE_MAX_AGE', 3600)}"
+
+
+def content_type(filename: str) -> str:
+    return CONTENT_TYPES.get(filename.rsplit('.', 1)[-1].lower(), 'application/octet-stream')
+
+
+class LocalStorage:
+    """アプリのディスク（UPLOAD_FOLDERS）に保存するバックエンド。"""
+
+    def _dir(self, category: str) -> str:
+        return os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDERS'][category])
+
+    def _path(self, category: str, filename: str) -> str:
+        return os.path.join(self._dir(category), filename)
+
+    def save(self, category: str, filename: str, src_path: str) -> None:
+        """ローカルのファイル src_path を移動して保存する。"""
+        os.makedirs(self._dir(category), exist_ok=True)
+        shutil.move(src_path, self._path(category, filename))
+
+    def save_bytes(self, category: str, filename: str, data: bytes) -> None:
+        os.makedirs(self._dir(category), exist_ok=True)
+        with open(self._path(category, filename), 'wb') as fp:
+            fp.write(data)
+
+    def open(self, category: str, filename: str):
+        return open(self._path(category, filename), 'rb')
+
+    def exists(self, category: str, filename: str) -> bool:
+        return os.path.isfile(self._path(category, filename))
+
+    def delete(self, category: str, filename: str) -> None:
+        try:
+            os.remove(self._path(category, filename))
+        except FileNotFoundError:
+            pass
+
+    def list(self, category: str, prefix: str = '') -> list[str]:
+        """ファイル名の一覧（隠しファイル・アップロード中の一時ファイルは除く）。"""
+        directory = self._dir(category)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            f for f in os.listdir(directory)
+            if f.startswith(prefix) and not f.startswith('.') and os.path.isfile(os.path.join(directory, f))
+        )
+
+    def stamp(self, category: str):
+        """一覧の変更検知用の値（ファイルの追加・削除で変わるディレクトリの mtime）。"""
+        try:
+            return os.stat(self._dir(category)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def url(self, category: str, filename: str, expires_in: int | None = None) -> str:
+        """
+        配信 URL。static 配下は公開ファイルのため expires_in（署名付き URL）は使わない。
+
+        バックグラウンドジョブ（リクエスト外）からも呼ぶため url_for ではなく static_url_path から組み立てる。
+        """
+        return f'{current_app.static_url_path}/images/{category}/{filename}'
+
+
+class S3Storage:
+    """S3 互換ストレージに保存するバックエンド（boto3 が必要）。"""
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: str | None = None,
+                 region: str | None = None, public_url: str = '', signed: bool = False, url_ttl: int = 3600):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.public_url = public_url.rstrip('/')
+        self.signed = signed or not public_url
+        self.url_ttl = url_ttl
+        # 認証情報は boto3 の標準（AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY 環境変数など）から読む
+        self._client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def _key(self, category: str, filename: str) -> str:
+        return '/'.join(p for p in (self.prefix, category, filename) if p)
+
+    def _extra_args(self, filename: str) -> dict:
+        return {'ContentType': content_type(filename), 'CacheControl': cache_control(filename)}
+
+    def _touch(self, category: str) -> None:
+        get_cache().incr(_VERSION_KEY.format(category))
+
+    def save(self, category: str, filename: str, src_path: str) -> None:
+        self._client.upload_file(src_path, self.bucket, self._key(category, filename),
+                                 ExtraArgs=self._extra_args(filename))
+        os.remove(src_path)
+        self._touch(category)
+
+    def save_bytes(self, category: str, filename: str, data: bytes) -> None:
+        self._client.put_object(Bucket=self.bucket, Key=self._key(category, filename), Body=data,
+                                **self._extra_args(filename))
+        self._touch(category)
+
+    def open(self, category: str, filename: str):
+        body = self._client.get_object(Bucket=self.bucket, Key=self._key(category, filename))['Body']
+        return io.BytesIO(body.read())
+
+    def exists(self, category: str, filename: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(category, filename))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, category: str, filename: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(category, filename))
+        self._touch(category)
+
+    def list(self, category: str, prefix: str = '') -> list[str]:
+        base = self._key(category, '') + '/'
+        names = []
+        for page in self._client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=base + prefix):
+            names.extend(obj['Key'][len(base):] for obj in page.get('Contents', []))
+        return sorted(n for n in names if n and '/' not in n)
+
+    def stamp(self, category: str):
+        """一覧の変更検知用の値（このアプリからの保存・削除で進むバージョン）。"""
+        return get_cache().get(_VERSION_KEY.format(category), 0)
+
+    def url(self, category: str, filename: str, expires_in: int | None = None) -> str:
+        """配信 URL。公開 URL 未設定・署名指定時・expires_in 指定時は署名付き URL（期限付き）。"""
+        key = self._key(category, filename)
+        if self.signed or expires_in:
+            return self._client.generate_presigned_url(
+                'get_object', Params={'Bucket': self.bucket, 'Key': key}, ExpiresIn=expires_in or self.url_ttl,
+            )
+        return f'{self.public_url}/{key}'
+
+
+def _set_upload_cache_headers(response):
+    """ローカル配信のアップロード画像に長期キャッシュ用の Cache-Control を付ける。"""
+    if request.endpoint == 'static' and response.status_code in (200, 304):
+        path = (request.view_args or {}).get('filename', '')
+        category, _, filename = path.removeprefix('images/').partition('/')
+        if path.startswith('images/') and category in current_app.config['UPLOAD_FOLDERS'] and '/' not in filename:
+            response.headers['Cache-Control'] = cache_control(filename)
+    return response
+
+
+def init_storage(app):
+    """アプリにストレージを登録する。STORAGE_BACKEND=s3 でも boto3 未導入・バケット未設定ならローカル。"""
+    backend = app.config.get('STORAGE_BACKEND', 'local')
+    if backend == 's3' and BOTO3_AVAILABLE and app.config.get('STORAGE_S3_BUCKET'):
+        storage = S3Storage(
+            bucket=app.config['STORAGE_S3_BUCKET'],
+            prefix=app.config.get('STORAGE_S3_PREFIX', ''),
+            endpoint_url=app.config.get('STORAGE_S3_ENDPOINT_URL'),
+            region=app.config.get('STORAGE_S3_REGION'),
+            public_url=app.config.get('STORAGE_S3_PUBLIC_URL', ''),
+            signed=app.config.get('STORAGE_S3_SIGNED_URLS', False),
+            url_ttl=app.config.get('STORAGE_SIGNED_URL_TTL', 3600),
+        )
+    else:
+        if backend == 's3':
+            app.logger.warning('boto3 未インストールまたは STORAGE_S3_BUCKET 未設定のためローカルストレージを使用')
+        storage = LocalStorage()
+        app.after_request(_set_upload_cache_headers)
+    app.extensions['upload_storage'] = storage
+    app.add_template_global(upload_url)
+    return storage
+
+
+def get_storage():
+    """現在のアプリに登録されたストレージを返す。"""
+    return current_app.extensions['upload_storage']
+
+
+def list_files(category: str) -> tuple[object, list[str]]:
+    """
+    キャッシュしたファイル名一覧を返す（stamp が変わっていなければストレージを走査しない）。
+
+    Returns: (stamp, ファイル名の一覧)。stamp は一覧が変わったかの比較に使える
+    """
+    storage = get_storage()
+    stamp = storage.stamp(category)
+    key = _LIST_KEY.format(category)
+    cached = get_cache().get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached
+    names = storage.list(category)
+    get_cache().set(key, (stamp, names), ttl=current_app.config.get('STORAGE_LIST_CACHE_TTL', 300))
+    return stamp, names
+
+
+def upload_url(category: str, filename: str, expires_in: int | None = None) -> str:
+    """テンプレート用: アップロード画像の配信 URL。"""
+    return get_storage().url(category, filename, expires_in)
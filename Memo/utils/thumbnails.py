@@ -0,0 +1,50 @@
+"""
+ユーザーサムネイル（プリセット画像）と ThumbnailConfig の同期
+
+ユーザー画像フォルダの一覧（utils.storage.list_files のキャッシュ）が前回の同期から変わったときだけ、
+増えたファイルの追加・消えたファイルの削除を行う（毎回の全件突き合わせはしない）。
+"""
+import re
+from models import db, ThumbnailConfig
+from utils.cache import get_cache
+from utils.storage import is_content_addressed, list_files
+
+SYNC_KEY = 'thumbs:synced'
+# プリセットとして扱わないファイル（未設定時の既定画像など）
+EXCLUDE = {'default.png', 'images.png'}
+
+
+def _is_preset(filename: str) -> bool:
+    # ユーザーが自分でアップロードした画像（内容アドレス名）はプリセットにしない
+    return filename not in EXCLUDE and not is_content_addressed(filename)
+
+
+def sync_thumbnail_configs() -> set[str]:
+    """
+    ThumbnailConfig をユーザー画像フォルダに合わせる（新ファイルは 001〜010 のみ visible=True）。
+
+    Returns: プリセット画像のファイル名
+    """
+    stamp, names = list_files('user')
+    current = {f for f in names if _is_preset(f)}
+    cache = get_cache()
+    synced = cache.get(SYNC_KEY)
+    if synced is not None and synced[0] == stamp:
+        return current
+
+    # 前回の同期結果が無ければ DB の登録内容を前回分とみなす
+    previous = synced[1] if synced is not None else {f for f, in db.session.query(ThumbnailConfig.filename)}
+    added, removed = current - previous, previous - current
+    if added:
+        # 別プロセス・アップロード処理で登録済みの分は除く
+        registered = {f for f, in db.session.query(ThumbnailConfig.filename).filter(ThumbnailConfig.filename.in_(added))}
+        for filename in sorted(added - registered):
+            m = re.match(r'^(\d+)\.', filename)
+            num = int(m.group(1)) if m else None
+            db.session.add(ThumbnailConfig(filename=filename, visible=num is not None and 1 <= num <= 10))
+    if removed:
+        ThumbnailConfig.query.filter(ThumbnailConfig.filename.in_(removed)).delete(synchronize_session=False)
+    if added or removed:
+        db.session.commit()
+    cache.set(SYNC_KEY, (stamp, current))
+    return current
@@ -1,21 +1,178 @@
+"""
+アップロードファイルの保存（内容アドレス方式の重複排除）
+
+- アップロードはチャンク単位で一時ファイルに書き出しながら sha256 を計算する（全体をメモリに載せない）
+- 先頭バイト（マジックナンバー）で画像形式を判定し、拡張子は判定結果から付ける（申告名は使わない）
+- 同じ内容のファイルは stored_files の参照数を増やすだけで、既存のファイル名を返す
+- 参照が無くなったら release_upload() でファイルと派生画像（<名前>-*.webp など）を削除する
+- 保存先は utils.storage のバックエンド（ローカルディスク / S3 互換ストレージ）
+"""
+import hashlib
 import os
-import uuid
-from werkzeug.utils import secure_filename
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, NamedTuple
 from flask import current_app
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, StoredFile
+from utils.storage import get_storage
+
+CHUNK_SIZE = 64 * 1024
+
+# 形式 -> (先頭バイトの判定, 拡張子, Content-Type)
+IMAGE_TYPES = {
+    'jpeg': (lambda head: head.startswith(b'\xff\xd8\xff'), 'jpg', 'image/jpeg'),
+    'png': (lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'), 'png', 'image/png'),
+    'gif': (lambda head: head[:6] in (b'GIF87a', b'GIF89a'), 'gif', 'image/gif'),
+    'webp': (lambda head: head[:4] == b'RIFF' and head[8:12] == b'WEBP', 'webp', 'image/webp'),
+}
+
+
+class SpooledUpload(NamedTuple):
+    path: str      # 一時ファイルのパス
+    digest: str    # sha256（16進）
+    kind: str      # IMAGE_TYPES のキー
+    size: int
+
+
+def detect_image_type(head: bytes) -> str | None:
+    """先頭バイトから画像形式を判定する。対応外なら None。"""
+    for kind, (matches, _, _) in IMAGE_TYPES.items():
+        if matches(head):
+            return kind
+    return None
+
+
+@contextmanager
+def _temp_path(suffix: str = ''):
+    """UPLOAD_TMP_DIR（未設定時は OS の一時ディレクトリ）の一時ファイルパス。抜けるときに削除する。"""
+    fd, path = tempfile.mkstemp(dir=current_app.config.get('UPLOAD_TMP_DIR') or None, prefix='upload-', suffix=suffix)
+    os.close(fd)
+    try:
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@contextmanager
+def spool_upload(file, kinds=('jpeg', 'png', 'gif')):
+    """
+    アップロードを一時ファイルへチャンク単位で書き出す。
 
-def save_upload(file, category: str) -> str:
+    Yields: SpooledUpload。空・対応外の形式なら None。一時ファイルは抜けるときに削除する
+    """
+    with _temp_path() as tmp_path:
+        sha256 = hashlib.sha256()
+        size = 0
+        kind = None
+        with open(tmp_path, 'wb') as out:
+            while chunk := file.stream.read(CHUNK_SIZE):
+                if size == 0:
+                    kind = detect_image_type(chunk[:16])
+                    if kind not in kinds:
+                        break
+                sha256.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        yield SpooledUpload(tmp_path, sha256.hexdigest(), kind, size) if size and kind in kinds else None
+
+
+def _increment(category: str, digest: str) -> bool:
+    # 同時に同じファイルを参照しても数え漏れないよう UPDATE 文で加算する
+    return db.session.execute(
+        update(StoredFile).where(StoredFile.category == category, StoredFile.digest == digest)
+        .values(ref_count=StoredFile.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount > 0
+
+
+def _add_reference(category: str, spooled: SpooledUpload, filename: str) -> str:
+    """参照を1つ追加し、登録されているファイル名を返す。"""
+    if not _increment(category, spooled.digest):
+        try:
+            with db.session.begin_nested():
+                db.session.add(StoredFile(
+                    category=category, filename=filename, digest=spooled.digest,
+                    content_type=IMAGE_TYPES[spooled.kind][2], size=spooled.size, ref_count=1,
+                ))
+            return filename
+        except IntegrityError:
+            # 同じ内容の初回アップロードが同時に行われ、先に登録された行に参照を足す
+            if not _increment(category, spooled.digest):
+                raise
+    return db.session.execute(
+        select(StoredFile.filename).where(StoredFile.category == category, StoredFile.digest == spooled.digest)
+    ).scalar_one()
+
+
+def save_upload(file, category: str, kinds=('jpeg', 'png', 'gif'),
+                process: Callable[[str, str, str], None] | None = None,
+                name: Callable[[str, str], str] | None = None) -> str | None:
+    """
+    アップロード画像を保存して参照を1つ追加する（コミットは呼び出し側）。
+
+    Args:
+        category: UPLOAD_FOLDERS のキー
+        kinds: 受け付ける画像形式
+        process: (一時ファイル, 保存先, 形式) を受け取り保存先へ書き出す変換処理（省略時はそのまま移動）
+        name: (sha256, 拡張子) から保存名を作る関数（省略時は "<sha256>.<拡張子>"）
+    Returns: 保存名（同じ内容が保存済みならそのファイル名）。画像として受け付けない場合は None
+    """
     if not file or file.filename == '':
         return None
-    original = secure_filename(file.filename)
-    ext = os.path.splitext(original)[1]
-    filename = f"{uuid.uuid4().hex}{ext}"
-    upload_dir = os.path.join(
-        current_app.root_path,
-        'static',
-        'images',
-        category
-    )
-    os.makedirs(upload_dir, exist_ok=True)
-    save_path = os.path.join(upload_dir, filename)
-    file.save(save_path)
-    return filename
+    storage = get_storage()
+    with spool_upload(file, kinds) as spooled:
+        if spooled is None:
+            print(f"######## 対応していないファイル形式のアップロード: {file.filename} ########")
+            return None
+        stored = StoredFile.query.filter_by(category=category, digest=spooled.digest).first()
+        filename = stored.filename if stored else (name or '{}.{}'.format)(spooled.digest, IMAGE_TYPES[spooled.kind][1])
+        saved = False
+        if not storage.exists(category, filename):
+            try:
+                if process:
+                    with _temp_path(os.path.splitext(filename)[1]) as processed:
+                        process(spooled.path, processed, spooled.kind)
+                        storage.save(category, filename, processed)
+                else:
+                    storage.save(category, filename, spooled.path)
+                saved = True
+            except Exception as e:
+                print(f"######## アップロード画像の保存失敗: {e} ########")
+                return None
+        registered = _add_reference(category, spooled, filename)
+        if registered != filename and saved:
+            # 同時アップロードに先を越され別名で登録済み。こちらで書いたファイルは使わない
+            storage.delete(category, filename)
+    return registered
+
+
+def release_upload(category: str, filename: str | None) -> None:
+    """
+    参照を1つ外し、0 になったらファイルと派生画像を削除する（コミットは呼び出し側）。
+
+    stored_files に無いファイル（シード画像・プリセットなど）は何もしない。
+    """
+    if not filename:
+        return
+    where = (StoredFile.category == category, StoredFile.filename == filename)
+    # 読んだ値で上書きすると同時に足された参照を消してしまうため、減算・削除とも UPDATE / DELETE 文で行う
+    released = db.session.execute(
+        update(StoredFile).where(*where)
+        .values(ref_count=StoredFile.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not released:
+        return
+    removed = db.session.execute(
+        delete(StoredFile).where(*where, StoredFile.ref_count <= 0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not removed:
+        return
+    storage = get_storage()
+    stem = os.path.splitext(filename)[0]
+    for name in [filename, *storage.list(category, prefix=stem + '-')]:
+        storage.delete(category, name)
@@ -0,0 +1,118 @@
+"""
+記事詳細ページの閲覧数（Memo.view_count）をメモリ上で集計し、バックグラウンドでまとめて DB に反映する
+"""
+import atexit
+import os
+import threading
+from collections import Counter
+from flask import current_app
+from sqlalchemy import bindparam, update
+from models import db, Memo
+
+
+class ViewCounter:
+    """
+    閲覧数のバッファ。
+
+    - hit(): リクエスト中はメモリ上のカウンタを加算するだけ（DB 書き込みなし）
+    - flush(): `UPDATE memos SET view_count = view_count + :n` を記事ごとに一括実行
+    - interval 秒ごとにデーモンスレッドが flush() し、プロセス終了時（atexit）にも flush() する
+
+    加算は差分 UPDATE なので、gunicorn の複数ワーカーがそれぞれ独自のバッファを
+    持っていても取りこぼしは起きない。fork 後に親プロセスのバッファ・スレッドを
+    引き継がないよう PID を見て初期化し直す。
+    """
+
+    def __init__(self, app, interval: float = 10.0):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        atexit.register(self.stop)
+
+    def _ensure_worker(self):
+        """現在のプロセスでフラッシュ用スレッドが動いていなければ起動する。"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._counts = Counter()  # fork 元から複製されたバッファは破棄（親側で反映される）
+        self._stop = threading.Event()
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def hit(self, memo_id: int) -> None:
+        """閲覧数を1加算する（DB への反映は次回の flush 時）。"""
+        with self._lock:
+            self._ensure_worker()
+            self._counts[memo_id] += 1
+
+    def pending(self, memo_id: int) -> int:
+        """まだ DB に反映していない閲覧数を返す。"""
+        with self._lock:
+            return self._counts.get(memo_id, 0)
+
+    def flush(self) -> int:
+        """
+        溜まった閲覧数を DB に一括反映する。
+
+        Returns:
+            反映した閲覧数の合計
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+
+        stmt = (
+            update(Memo.__table__)
+            .where(Memo.__table__.c.id == bindparam('memo_id'))
+            .values(view_count=Memo.__table__.c.view_count + bindparam('n'))
+        )
+        params = [{'memo_id': memo_id, 'n': n} for memo_id, n in counts.items()]
+        try:
+            with self.app.app_context():
+                # リクエストのスコープセッションとは独立した接続で書き込む
+                with db.engine.begin() as conn:
+                    conn.execute(stmt, params)
+        except Exception as e:
+            # 反映失敗分はバッファに戻して次回に再試行
+            with self._lock:
+                self._counts.update(counts)
+            print(f"######## 閲覧数の一括反映失敗: {e} ########")
+            return 0
+        return sum(counts.values())
+
+    def stop(self) -> None:
+        """フラッシュ用スレッドを止めて残りを反映する（シャットダウンフック）。"""
+        self._stop.set()
+        self.flush()
+
+
+def init_view_counter(app):
+    """アプリに閲覧数バッファを登録する。"""
+    counter = ViewCounter(app, interval=app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 10))
+    app.extensions['view_counter'] = counter
+    return counter
+
+
+def count_view(memo_id: int) -> None:
+    """記事の閲覧を記録する。"""
+    current_app.extensions['view_counter'].hit(memo_id)
+
+
+def flush_view_counts() -> int:
+    """
+    バッファ中の閲覧数を即時反映する。
+
+    gunicorn の worker_exit フック等から呼び出せるシャットダウン用エントリポイント。
+    """
+    return current_app.extensions['view_counter'].flush()